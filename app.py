@@ -1,22 +1,279 @@
-from flask import Flask, request, jsonify
-from flasgger import Swagger, swag_from
+from flask import Blueprint, Flask, Response, request, jsonify
 from flask_cors import CORS
-import asyncio
 import logging
+import os
+import threading
+import time
 
-from scraper import get_instagram_data, get_reel_data
+import config
+from browser_pool import get_pool
+from batch import clamp_concurrency, dedupe, run_batch, stream_batch
+from capture_store import get_capture_store
+from http_encoding import (FastJSONProvider, body_etag, compress_response, dumps_bytes, etag_matches,
+                           representation_etag)
+from job_queue import JOB_TYPES, get_queue
+import metrics
+from rate_limiter import get_limiter, limiter_stats
+from request_blocking import blocking_stats
+from result_cache import ResultCache, get_cache
+from retry_policy import CircuitOpenError, breaker_states, get_breaker
+from singleflight import scrape_flights
+from snapshot_store import SNAPSHOT_TYPES, get_snapshot_store
+import scraper
+from scraper import get_instagram_data_async, get_reel_data_async
+import tiktok_scraper
 from tiktok_scraper import scrape_tiktok_profile
+from watchlist import WATCH_TYPES, get_watchlist
 
-app = Flask(__name__)
-swagger = Swagger(app)
-CORS(app)  # Enable CORS for frontend API calls
+api = Blueprint('api', __name__)
 
 # Setup basic logging
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
 
 
-@app.route('/api/profile', methods=['GET'])
+def swag_from(specs):
+    """Attach a Swagger spec to a view without importing Flasgger.
+
+    Flasgger reads ``specs_dict`` when it builds the docs, so it only has to
+    be imported by ``create_app`` when the docs are enabled.
+    """
+    def decorator(function):
+        function.specs_dict = specs
+        return function
+    return decorator
+
+CACHE_PARAMETERS = [
+    {
+        'name': 'max_age',
+        'in': 'query',
+        'type': 'integer',
+        'required': False,
+        'description': 'Only accept a cached result younger than this many seconds (0 forces a fresh scrape)'
+    },
+    {
+        'name': 'no_cache',
+        'in': 'query',
+        'type': 'boolean',
+        'required': False,
+        'description': 'Bypass the result cache and scrape fresh data'
+    },
+    {
+        'name': 'stale',
+        'in': 'query',
+        'type': 'boolean',
+        'required': False,
+        'description': 'Serve an expired cached result immediately and refresh it in the background (default from CACHE_SERVE_STALE)'
+    }
+]
+
+
+def cache_max_age():
+    """Read the max_age / no_cache query parameters (None means use the TTL)."""
+    if request.args.get('no_cache', 'false').lower() not in ('0', 'false', 'no'):
+        return 0
+    max_age = request.args.get('max_age')
+    if max_age is None:
+        return None
+    try:
+        return max(0, int(max_age))
+    except ValueError:
+        return None
+
+
+def cache_allow_stale():
+    """Read the stale query parameter (stale-while-revalidate mode)."""
+    stale = request.args.get('stale')
+    if stale is None:
+        return config.CACHE_SERVE_STALE
+    return stale.lower() not in ('0', 'false', 'no')
+
+
+def with_cache_headers(response, cache_info):
+    response.headers['X-Cache'] = cache_info['status']
+    response.headers['Age'] = str(int(cache_info['age']))
+    return response
+
+
+def scrape_response(endpoint, data, cache_info):
+    """Scrape result with a content ETag and a Cache-Control matching its remaining freshness.
+
+    Empty results are negative-cached here only, so they go out as
+    ``no-store``. Answers 304 without a body when ``If-None-Match`` names
+    the same content.
+    """
+    body = dumps_bytes(data)
+    etag = body_etag(body)
+    if etag_matches(request.if_none_match, etag):
+        response = Response(status=304)
+        if config.COMPRESS_ENABLED:
+            # Same validators as the 200 compress_large_responses would send
+            response.vary.add('Accept-Encoding')
+            etag = representation_etag(etag, len(body), request.accept_encodings)
+    else:
+        response = Response(body, mimetype='application/json')
+    response.set_etag(etag)
+    if not data:
+        response.headers['Cache-Control'] = 'no-store'
+    else:
+        if cache_info['status'] == 'STALE':
+            max_age = 0
+        else:
+            ttl = cache_info.get('ttl', get_cache().ttls.get(endpoint, config.CACHE_TTL_PROFILE))
+            max_age = max(0, int(ttl - cache_info['age']))
+        response.headers['Cache-Control'] = f"public, max-age={max_age}, stale-while-revalidate={int(config.CACHE_STALE_TTL)}"
+    return with_cache_headers(response, cache_info)
+
+
+def error_response(error, cache_info):
+    """Scrape failure response: 503 with Retry-After while a breaker is open, else 500."""
+    response = with_cache_headers(jsonify({'error': error}), cache_info)
+    response.headers['Cache-Control'] = 'no-store'
+    if cache_info['status'] == 'CIRCUIT_OPEN':
+        response.headers['Retry-After'] = str(int(cache_info['retry_after']) + 1)
+        return response, 503
+    return response, 500
+
+
+# Async scrapers, run on the browser pool's long-lived event loop
+SCRAPERS = {
+    'profile': get_instagram_data_async,
+    'reel': get_reel_data_async,
+    'tiktok_profile': scrape_tiktok_profile,
+}
+
+
+def run_scrape(endpoint, identifier):
+    """Submit a scrape coroutine to the shared event loop and wait for it."""
+    try:
+        data, error = get_pool().run(SCRAPERS[endpoint](identifier))
+    except Exception:
+        metrics.SCRAPE_RESULTS.inc(endpoint, 'error')
+        raise
+    metrics.SCRAPE_RESULTS.inc(endpoint, 'error' if error else 'success')
+    return data, error
+
+
+def cached_scrape(endpoint, identifier, max_age=None, allow_stale=False):
+    """Scrape through the result cache; returns ``((data, error), cache_info)``.
+
+    While the platform's circuit breaker is open, any cached success is
+    served as STALE whatever its age; otherwise the status is CIRCUIT_OPEN.
+    """
+    try:
+        result, cache_info = get_cache().lookup(
+            endpoint, identifier, lambda: run_scrape(endpoint, identifier),
+            max_age=max_age, allow_stale=allow_stale
+        )
+    except CircuitOpenError as e:
+        entry = get_cache().peek(ResultCache.make_key(endpoint, identifier))
+        if entry is not None and entry.data is not None and not entry.error:
+            result, cache_info = (entry.data, None), {'status': 'STALE', 'age': entry.age, 'ttl': entry.ttl}
+        else:
+            result, cache_info = (None, str(e)), {'status': 'CIRCUIT_OPEN', 'age': 0, 'retry_after': e.retry_after}
+    metrics.CACHE_REQUESTS.inc(endpoint, cache_info['status'])
+    return result, cache_info
+
+
+def batch_spec(tag, field, description):
+    """Swagger spec shared by the batch endpoints."""
+    return {
+        'tags': [tag],
+        'produces': ['application/json', 'application/x-ndjson', 'text/event-stream'],
+        'parameters': [
+            {
+                'name': 'body',
+                'in': 'body',
+                'required': True,
+                'schema': {
+                    'type': 'object',
+                    'required': [field],
+                    'properties': {
+                        field: {'type': 'array', 'items': {'type': 'string'}, 'description': description},
+                        'concurrency': {
+                            'type': 'integer',
+                            'description': 'Scrapes to run in parallel (capped by BATCH_MAX_CONCURRENCY)'
+                        }
+                    }
+                }
+            }
+        ] + CACHE_PARAMETERS,
+        'responses': {
+            200: {
+                'description': 'Per-item results; failed items carry an error instead of data. '
+                               'With Accept: application/x-ndjson or text/event-stream each result is '
+                               'streamed as it finishes, followed by a summary record.',
+                'schema': {
+                    'type': 'object',
+                    'properties': {
+                        'results': {
+                            'type': 'array',
+                            'items': {
+                                'type': 'object',
+                                'properties': {
+                                    'id': {'type': 'string'},
+                                    'data': {'type': 'object'},
+                                    'error': {'type': 'string'},
+                                    'duration_ms': {'type': 'integer'}
+                                }
+                            }
+                        },
+                        'summary': {'type': 'object'}
+                    }
+                }
+            },
+            400: {
+                'description': f'Missing or invalid {field} list'
+            }
+        }
+    }
+
+
+def batch_stream_format():
+    """Pick a streaming format from the Accept header, or None for plain JSON."""
+    best = request.accept_mimetypes.best_match(['application/json', 'application/x-ndjson', 'text/event-stream'])
+    if best == 'application/x-ndjson':
+        return 'ndjson'
+    if best == 'text/event-stream':
+        return 'sse'
+    return None
+
+
+def batch_scrape(endpoint, field):
+    """Run a batch request for ``endpoint`` with identifiers from the JSON ``field``."""
+    payload = request.get_json(silent=True) or {}
+    identifiers = payload.get(field)
+    if not isinstance(identifiers, list) or not identifiers:
+        return jsonify({'error': f'Missing {field} list'}), 400
+
+    unique = dedupe(identifiers, lambda identifier: ResultCache.make_key(endpoint, identifier))
+    if len(unique) > config.BATCH_MAX_ITEMS:
+        return jsonify({'error': f'Too many items: {len(unique)} (max {config.BATCH_MAX_ITEMS})'}), 400
+
+    concurrency = clamp_concurrency(payload.get('concurrency'))
+    max_age, allow_stale = cache_max_age(), cache_allow_stale()
+
+    def scrape(identifier):
+        result, _ = cached_scrape(endpoint, identifier, max_age, allow_stale)
+        return result
+
+    logger.info(f"Batch {endpoint}: {len(unique)} items, concurrency {concurrency}")
+    stream_format = batch_stream_format()
+    if stream_format:
+        extra = {'requested': len(identifiers), 'unique': len(unique), 'concurrency': concurrency}
+        mimetype = 'text/event-stream' if stream_format == 'sse' else 'application/x-ndjson'
+        return Response(
+            stream_batch(unique, scrape, concurrency, stream_format, extra),
+            mimetype=mimetype,
+            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+        )
+
+    results, summary = run_batch(unique, scrape, concurrency)
+    summary.update(requested=len(identifiers), unique=len(unique), concurrency=concurrency)
+    return jsonify({'results': results, 'summary': summary}), 200
+
+
+@api.route('/api/profile', methods=['GET'])
 @swag_from({
     'tags': ['Instagram Profile Scraper'],
     'parameters': [
@@ -27,7 +284,7 @@ logging.basicConfig(level=logging.INFO)
             'required': True,
             'description': 'The Instagram username to scrape (e.g., sufitramp)'
         }
-    ],
+    ] + CACHE_PARAMETERS,
     'responses': {
         200: {
             'description': 'Successfully scraped profile data',
@@ -37,7 +294,8 @@ logging.basicConfig(level=logging.INFO)
                     'ID': {'type': 'string'},
                     'Followers': {'type': 'integer'},
                     'Following': {'type': 'integer'},
-                    'Posts': {'type': 'integer'}
+                    'Posts': {'type': 'integer'},
+                    'Source': {'type': 'string', 'description': 'Path that served the data: http or browser'}
                 }
             }
         },
@@ -46,6 +304,9 @@ logging.basicConfig(level=logging.INFO)
         },
         500: {
             'description': 'Failed to scrape profile data'
+        },
+        503: {
+            'description': 'Instagram circuit breaker is open and nothing is cached; see Retry-After'
         }
     }
 })
@@ -55,14 +316,14 @@ def scrape_instagram_profile():
     if not username:
         return jsonify({'error': 'Missing username parameter'}), 400
 
-    data, error = get_instagram_data(username)
+    (data, error), cache_info = cached_scrape('profile', username, cache_max_age(), cache_allow_stale())
     if error:
-        return jsonify({'error': error}), 500
+        return error_response(error, cache_info)
 
-    return jsonify(data), 200
+    return scrape_response('profile', data, cache_info)
 
 
-@app.route('/api/reel', methods=['GET'])
+@api.route('/api/reel', methods=['GET'])
 @swag_from({
     'tags': ['Instagram Reel Scraper'],
     'parameters': [
@@ -71,9 +332,10 @@ def scrape_instagram_profile():
             'in': 'query',
             'type': 'string',
             'required': True,
-            'description': 'The URL of the Instagram reel to scrape (e.g., https://www.instagram.com/reel/DKjwPKyPo0d/)'
+            'description': 'The URL of the Instagram reel to scrape (e.g., https://www.instagram.com/reel/DKjwPKyPo0d/); '
+                           '/p/ links, tracking parameters and bare shortcodes are accepted'
         }
-    ],
+    ] + CACHE_PARAMETERS,
     'responses': {
         200: {
             'description': 'Successfully scraped reel data',
@@ -83,7 +345,8 @@ def scrape_instagram_profile():
                     'Reel_URL': {'type': 'string'},
                     'Likes': {'type': 'integer'},
                     'Comments': {'type': 'integer'},
-                    'Upload_Date': {'type': 'string', 'format': 'date'}
+                    'Upload_Date': {'type': 'string', 'format': 'date'},
+                    'Source': {'type': 'string', 'description': 'Path that served the data: http or browser'}
                 }
             }
         },
@@ -92,6 +355,9 @@ def scrape_instagram_profile():
         },
         500: {
             'description': 'Failed to scrape reel data'
+        },
+        503: {
+            'description': 'Instagram circuit breaker is open and nothing is cached; see Retry-After'
         }
     }
 })
@@ -101,14 +367,14 @@ def scrape_instagram_reel():
     if not reel_url:
         return jsonify({'error': 'Missing reel_url parameter'}), 400
 
-    data, error = get_reel_data(reel_url)
+    (data, error), cache_info = cached_scrape('reel', reel_url, cache_max_age(), cache_allow_stale())
     if error:
-        return jsonify({'error': error}), 500
+        return error_response(error, cache_info)
 
-    return jsonify(data), 200
+    return scrape_response('reel', data, cache_info)
 
 
-@app.route('/api/tiktok_profile', methods=['GET'])
+@api.route('/api/tiktok_profile', methods=['GET'])
 @swag_from({
     'tags': ['TikTok Profile Scraper'],
     'parameters': [
@@ -119,7 +385,7 @@ def scrape_instagram_reel():
             'required': True,
             'description': 'The TikTok username to scrape (e.g., marylou.sidibe)'
         }
-    ],
+    ] + CACHE_PARAMETERS,
     'responses': {
         200: {
             'description': 'Successfully scraped profile data',
@@ -131,7 +397,10 @@ def scrape_instagram_reel():
                     'following': {'type': 'integer', 'description': 'Number of accounts followed'},
                     'likes': {'type': 'integer', 'description': 'Total likes on posts'},
                     'bio': {'type': 'string', 'description': 'Profile biography'},
-                    'link': {'type': 'string', 'description': 'External link in bio'}
+                    'link': {'type': 'string', 'description': 'External link in bio'},
+                    'videos': {'type': 'integer', 'description': 'Number of videos (from embedded page data only)'},
+                    'verified': {'type': 'boolean', 'description': 'Verified badge (from embedded page data only)'},
+                    'private': {'type': 'boolean', 'description': 'Private account (from embedded page data only)'}
                 }
             }
         },
@@ -152,6 +421,9 @@ def scrape_instagram_reel():
                     'error': {'type': 'string'}
                 }
             }
+        },
+        503: {
+            'description': 'TikTok circuit breaker is open and nothing is cached; see Retry-After'
         }
     }
 })
@@ -164,15 +436,853 @@ def scrape_tiktok_profile_data():
 
     try:
         logger.info(f"Scraping TikTok profile for username: {username}")
-        data = asyncio.run(scrape_tiktok_profile(username))
-        if 'error' in data:
-            logger.error(f"Scraper error: {data['error']}")
-            return jsonify({'error': data['error']}), 500
-        return jsonify(data), 200
+        (data, error), cache_info = cached_scrape('tiktok_profile', username, cache_max_age(), cache_allow_stale())
+        if error:
+            logger.error(f"Scraper error: {error}")
+            return error_response(error, cache_info)
+        return scrape_response('tiktok_profile', data, cache_info)
     except Exception as e:
         logger.error(f"API error: {str(e)}")
         return jsonify({'error': f"Failed to scrape profile: {str(e)}"}), 500
 
 
+@api.route('/api/profiles', methods=['POST'])
+@swag_from(batch_spec('Instagram Profile Scraper', 'usernames', 'Instagram usernames to scrape'))
+def scrape_instagram_profiles():
+    """Scrape many Instagram profiles concurrently."""
+    return batch_scrape('profile', 'usernames')
+
+
+@api.route('/api/reels', methods=['POST'])
+@swag_from(batch_spec('Instagram Reel Scraper', 'reel_urls', 'Instagram reel URLs to scrape'))
+def scrape_instagram_reels():
+    """Scrape many Instagram reels concurrently."""
+    return batch_scrape('reel', 'reel_urls')
+
+
+@api.route('/api/tiktok_profiles', methods=['POST'])
+@swag_from(batch_spec('TikTok Profile Scraper', 'usernames', 'TikTok usernames to scrape'))
+def scrape_tiktok_profiles_data():
+    """Scrape many TikTok profiles concurrently."""
+    return batch_scrape('tiktok_profile', 'usernames')
+
+
+def run_job(job_type, identifier):
+    """Job queue runner: scrape through the result cache."""
+    result, _ = cached_scrape(job_type, identifier)
+    return result
+
+
+def refresh_watched(watch_type, identifier):
+    """Watchlist runner: scrape fresh data and store it in the result cache."""
+    result, _ = cached_scrape(watch_type, identifier, max_age=0)
+    return result
+
+
+@api.before_app_request
+def start_request_timings():
+    """Collect per-phase timings for this request (see add_timing_headers)."""
+    request.started_at = time.perf_counter()
+    metrics.start_timings()
+
+
+@api.after_app_request
+def add_timing_headers(response):
+    """Record request latency and expose the phase breakdown as Server-Timing."""
+    elapsed = time.perf_counter() - getattr(request, 'started_at', time.perf_counter())
+    endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+    metrics.HTTP_REQUEST_SECONDS.observe(endpoint, response.status_code, value=elapsed)
+    timings = metrics.current_timings()
+    server_timing = timings.server_timing() if timings else ''
+    total = f"total;dur={elapsed * 1000:.1f}"
+    response.headers['Server-Timing'] = f"{server_timing}, {total}" if server_timing else total
+    return response
+
+
+@api.after_app_request
+def compress_large_responses(response):
+    """gzip or brotli large JSON and text bodies for clients that accept it."""
+    if config.COMPRESS_ENABLED:
+        compress_response(response, request.accept_encodings)
+    return response
+
+
+@api.before_app_request
+def start_job_workers():
+    """Start draining the durable job queue once this process serves traffic."""
+    if config.JOB_AUTOSTART:
+        get_queue(run_job).start()
+
+
+@api.before_app_request
+def start_watchlist():
+    """Start refreshing the watchlist once this process serves traffic."""
+    if config.WATCHLIST_AUTOSTART:
+        get_watchlist(refresh_watched).start()
+
+
+@api.route('/api/jobs', methods=['POST'])
+@swag_from({
+    'tags': ['Jobs'],
+    'parameters': [
+        {
+            'name': 'body',
+            'in': 'body',
+            'required': True,
+            'schema': {
+                'type': 'object',
+                'required': ['type'],
+                'properties': {
+                    'type': {'type': 'string', 'enum': list(JOB_TYPES)},
+                    'identifier': {'type': 'string', 'description': 'Username or reel URL'},
+                    'identifiers': {'type': 'array', 'items': {'type': 'string'},
+                                    'description': 'Several usernames or reel URLs (one job each)'},
+                    'priority': {'type': 'integer', 'description': 'Higher runs first (default 0)'}
+                }
+            }
+        }
+    ],
+    'responses': {
+        202: {
+            'description': 'Job(s) queued',
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'job_id': {'type': 'string'},
+                    'job_ids': {'type': 'array', 'items': {'type': 'string'}}
+                }
+            }
+        },
+        400: {
+            'description': 'Invalid job type, missing identifier or too many identifiers'
+        }
+    }
+})
+def create_jobs():
+    """Queue profile, reel or TikTok scrapes and return their job ids immediately."""
+    payload = request.get_json(silent=True) or {}
+    job_type = payload.get('type')
+    if job_type not in JOB_TYPES:
+        return jsonify({'error': f"Invalid job type, expected one of {', '.join(JOB_TYPES)}"}), 400
+    try:
+        priority = int(payload.get('priority', 0))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'Invalid priority'}), 400
+
+    queue = get_queue(run_job)
+    identifiers = payload.get('identifiers')
+    if isinstance(identifiers, list) and identifiers:
+        unique = dedupe(identifiers, lambda identifier: ResultCache.make_key(job_type, identifier))
+        if len(unique) > config.BATCH_MAX_ITEMS:
+            return jsonify({'error': f'Too many items: {len(unique)} (max {config.BATCH_MAX_ITEMS})'}), 400
+        job_ids = [queue.enqueue(job_type, identifier, priority) for identifier in unique]
+        return jsonify({'job_ids': job_ids}), 202
+
+    identifier = payload.get('identifier')
+    if not isinstance(identifier, str) or not identifier.strip():
+        return jsonify({'error': 'Missing identifier'}), 400
+    return jsonify({'job_id': queue.enqueue(job_type, identifier.strip(), priority)}), 202
+
+
+@api.route('/api/jobs/<job_id>', methods=['GET'])
+@swag_from({
+    'tags': ['Jobs'],
+    'parameters': [
+        {
+            'name': 'job_id',
+            'in': 'path',
+            'type': 'string',
+            'required': True
+        }
+    ],
+    'responses': {
+        200: {
+            'description': 'Job status (queued, running, done or failed) with result or error',
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'id': {'type': 'string'},
+                    'type': {'type': 'string'},
+                    'identifier': {'type': 'string'},
+                    'priority': {'type': 'integer'},
+                    'status': {'type': 'string'},
+                    'attempts': {'type': 'integer'},
+                    'result': {'type': 'object'},
+                    'error': {'type': 'string'},
+                    'created_at': {'type': 'number'},
+                    'started_at': {'type': 'number'},
+                    'finished_at': {'type': 'number'}
+                }
+            }
+        },
+        404: {
+            'description': 'Unknown job id'
+        }
+    }
+})
+def get_job(job_id):
+    """Return the status and result of a queued scrape."""
+    job = get_queue(run_job).get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job), 200
+
+
+SNAPSHOT_PARAMETERS = [
+    {
+        'name': 'type',
+        'in': 'query',
+        'type': 'string',
+        'enum': list(SNAPSHOT_TYPES),
+        'required': True
+    },
+    {
+        'name': 'identifier',
+        'in': 'query',
+        'type': 'string',
+        'required': True,
+        'description': 'Username or reel URL'
+    }
+]
+
+
+def snapshot_query():
+    """Read and validate the type / identifier query parameters.
+
+    Returns ``(snapshot_type, identifier, None)`` or ``(None, None, error_response)``.
+    """
+    snapshot_type = request.args.get('type')
+    identifier = request.args.get('identifier')
+    if snapshot_type not in SNAPSHOT_TYPES:
+        return None, None, (jsonify({'error': f"Invalid type, expected one of {', '.join(SNAPSHOT_TYPES)}"}), 400)
+    if not identifier:
+        return None, None, (jsonify({'error': 'Missing identifier parameter'}), 400)
+    return snapshot_type, identifier, None
+
+
+def float_arg(name, default=None):
+    value = request.args.get(name)
+    if value is None:
+        return default
+    return float(value)
+
+
+@api.route('/api/history', methods=['GET'])
+@swag_from({
+    'tags': ['History'],
+    'parameters': SNAPSHOT_PARAMETERS + [
+        {'name': 'since', 'in': 'query', 'type': 'number', 'required': False,
+         'description': 'Unix timestamp of the oldest snapshot to return'},
+        {'name': 'until', 'in': 'query', 'type': 'number', 'required': False,
+         'description': 'Unix timestamp of the newest snapshot to return'},
+        {'name': 'limit', 'in': 'query', 'type': 'integer', 'required': False,
+         'description': 'Most recent snapshots to return (default 500)'}
+    ],
+    'responses': {
+        200: {
+            'description': 'Stored scrape results, oldest first',
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'snapshots': {
+                        'type': 'array',
+                        'items': {
+                            'type': 'object',
+                            'properties': {'ts': {'type': 'number'}, 'data': {'type': 'object'}}
+                        }
+                    }
+                }
+            }
+        },
+        400: {
+            'description': 'Invalid parameters'
+        }
+    }
+})
+def snapshot_history():
+    """Return the stored history of an account or reel without scraping."""
+    snapshot_type, identifier, error = snapshot_query()
+    if error:
+        return error
+    try:
+        since, until = float_arg('since'), float_arg('until')
+        limit = max(1, min(int(request.args.get('limit', 500)), 10000))
+    except ValueError:
+        return jsonify({'error': 'Invalid since, until or limit'}), 400
+    snapshots = get_snapshot_store().history(snapshot_type, identifier, since, until, limit)
+    return jsonify({'type': snapshot_type, 'identifier': identifier, 'snapshots': snapshots}), 200
+
+
+@api.route('/api/growth', methods=['GET'])
+@swag_from({
+    'tags': ['History'],
+    'parameters': SNAPSHOT_PARAMETERS + [
+        {'name': 'window', 'in': 'query', 'type': 'number', 'required': False,
+         'description': 'Look-back window in seconds (default 7 days)'}
+    ],
+    'responses': {
+        200: {
+            'description': 'Change of each numeric field between the first and last snapshot in the window',
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'from_ts': {'type': 'number'},
+                    'to_ts': {'type': 'number'},
+                    'fields': {'type': 'object'}
+                }
+            }
+        },
+        400: {
+            'description': 'Invalid parameters'
+        },
+        404: {
+            'description': 'No snapshots in the window'
+        }
+    }
+})
+def snapshot_growth():
+    """Return growth deltas over a time window from stored snapshots."""
+    snapshot_type, identifier, error = snapshot_query()
+    if error:
+        return error
+    try:
+        window = float_arg('window', 7 * 86400)
+    except ValueError:
+        return jsonify({'error': 'Invalid window'}), 400
+    growth = get_snapshot_store().growth(snapshot_type, identifier, window)
+    if growth is None:
+        return jsonify({'error': 'No snapshots in this window'}), 404
+    growth.update(type=snapshot_type, identifier=identifier)
+    return jsonify(growth), 200
+
+
+@api.route('/api/latest', methods=['POST'])
+@swag_from({
+    'tags': ['History'],
+    'parameters': [
+        {
+            'name': 'body',
+            'in': 'body',
+            'required': True,
+            'schema': {
+                'type': 'object',
+                'required': ['type', 'identifiers'],
+                'properties': {
+                    'type': {'type': 'string', 'enum': list(SNAPSHOT_TYPES)},
+                    'identifiers': {'type': 'array', 'items': {'type': 'string'}}
+                }
+            }
+        }
+    ],
+    'responses': {
+        200: {
+            'description': 'Newest stored snapshot per identifier, plus those with none',
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'results': {'type': 'object'},
+                    'missing': {'type': 'array', 'items': {'type': 'string'}}
+                }
+            }
+        },
+        400: {
+            'description': 'Invalid type or missing identifiers'
+        }
+    }
+})
+def snapshot_latest():
+    """Return the latest stored values for many accounts or reels in one query."""
+    payload = request.get_json(silent=True) or {}
+    snapshot_type = payload.get('type')
+    if snapshot_type not in SNAPSHOT_TYPES:
+        return jsonify({'error': f"Invalid type, expected one of {', '.join(SNAPSHOT_TYPES)}"}), 400
+    identifiers = payload.get('identifiers')
+    if not isinstance(identifiers, list) or not identifiers:
+        return jsonify({'error': 'Missing identifiers list'}), 400
+    unique = dedupe(identifiers, lambda identifier: ResultCache.make_key(snapshot_type, identifier))
+    if len(unique) > config.BATCH_MAX_ITEMS:
+        return jsonify({'error': f'Too many items: {len(unique)} (max {config.BATCH_MAX_ITEMS})'}), 400
+    latest = get_snapshot_store().latest(snapshot_type, unique)
+    return jsonify({'results': latest, 'missing': [i for i in unique if i not in latest]}), 200
+
+
+WATCHLIST_BODY = {
+    'name': 'body',
+    'in': 'body',
+    'required': True,
+    'schema': {
+        'type': 'object',
+        'required': ['type'],
+        'properties': {
+            'type': {'type': 'string', 'enum': list(WATCH_TYPES)},
+            'identifier': {'type': 'string', 'description': 'Username or reel URL'},
+            'identifiers': {'type': 'array', 'items': {'type': 'string'}},
+            'interval': {'type': 'number', 'description': 'Base refresh interval in seconds (POST only)'}
+        }
+    }
+}
+
+
+def watchlist_items(payload):
+    """Read ``(type, identifiers, error_response)`` from a watchlist request body."""
+    watch_type = payload.get('type')
+    if watch_type not in WATCH_TYPES:
+        return None, None, (jsonify({'error': f"Invalid type, expected one of {', '.join(WATCH_TYPES)}"}), 400)
+    identifiers = payload.get('identifiers')
+    if not isinstance(identifiers, list):
+        identifiers = [payload.get('identifier')]
+    unique = dedupe(identifiers, lambda identifier: ResultCache.make_key(watch_type, identifier))
+    if not unique:
+        return None, None, (jsonify({'error': 'Missing identifier or identifiers'}), 400)
+    if len(unique) > config.BATCH_MAX_ITEMS:
+        return None, None, (jsonify({'error': f'Too many items: {len(unique)} (max {config.BATCH_MAX_ITEMS})'}), 400)
+    return watch_type, unique, None
+
+
+@api.route('/api/watchlist', methods=['GET'])
+@swag_from({
+    'tags': ['Watchlist'],
+    'parameters': [
+        {'name': 'type', 'in': 'query', 'type': 'string', 'enum': list(WATCH_TYPES), 'required': False},
+        {'name': 'offset', 'in': 'query', 'type': 'integer', 'required': False},
+        {'name': 'limit', 'in': 'query', 'type': 'integer', 'required': False,
+         'description': 'Entries to return (default 100)'}
+    ],
+    'responses': {
+        200: {
+            'description': 'Tracked entries, next due first, with scheduler stats (lag, due queue depth, throughput cap)',
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'entries': {'type': 'array', 'items': {'type': 'object'}},
+                    'stats': {'type': 'object'}
+                }
+            }
+        }
+    }
+})
+def list_watchlist():
+    """List tracked accounts and reels in refresh order."""
+    try:
+        offset = max(0, int(request.args.get('offset', 0)))
+        limit = max(1, min(int(request.args.get('limit', 100)), 5000))
+    except ValueError:
+        return jsonify({'error': 'Invalid offset or limit'}), 400
+    watchlist = get_watchlist(refresh_watched)
+    return jsonify({
+        'entries': watchlist.list(request.args.get('type'), offset, limit),
+        'stats': watchlist.stats(),
+    }), 200
+
+
+@api.route('/api/watchlist', methods=['POST'])
+@swag_from({
+    'tags': ['Watchlist'],
+    'parameters': [WATCHLIST_BODY],
+    'responses': {
+        200: {
+            'description': 'Entries tracked (existing ones get the new interval)',
+            'schema': {
+                'type': 'object',
+                'properties': {'added': {'type': 'integer'}, 'tracked': {'type': 'integer'}}
+            }
+        },
+        400: {
+            'description': 'Invalid type, identifiers or interval'
+        }
+    }
+})
+def add_to_watchlist():
+    """Track accounts or reels for periodic refresh."""
+    payload = request.get_json(silent=True) or {}
+    watch_type, identifiers, error = watchlist_items(payload)
+    if error:
+        return error
+    interval = payload.get('interval')
+    if interval is not None and (isinstance(interval, bool) or not isinstance(interval, (int, float))
+                                 or interval < config.WATCHLIST_MIN_INTERVAL):
+        return jsonify({'error': f'interval must be a number of at least {config.WATCHLIST_MIN_INTERVAL} seconds'}), 400
+    added = get_watchlist(refresh_watched).add(watch_type, identifiers, interval)
+    return jsonify({'added': added, 'tracked': len(identifiers)}), 200
+
+
+@api.route('/api/watchlist', methods=['DELETE'])
+@swag_from({
+    'tags': ['Watchlist'],
+    'parameters': [WATCHLIST_BODY],
+    'responses': {
+        200: {
+            'description': 'Entries no longer tracked',
+            'schema': {'type': 'object', 'properties': {'removed': {'type': 'integer'}}}
+        },
+        400: {
+            'description': 'Invalid type or identifiers'
+        }
+    }
+})
+def remove_from_watchlist():
+    """Stop tracking accounts or reels."""
+    watch_type, identifiers, error = watchlist_items(request.get_json(silent=True) or {})
+    if error:
+        return error
+    return jsonify({'removed': get_watchlist(refresh_watched).remove(watch_type, identifiers)}), 200
+
+
+@api.route('/api/stats', methods=['GET'])
+@swag_from({
+    'tags': ['Service'],
+    'responses': {
+        200: {
+            'description': 'Runtime counters for the browser pool, request blocking, result cache, request coalescing, job queue, circuit breakers, rate limiters, failure captures, snapshot history and watchlist',
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'browser_pool': {'type': 'object'},
+                    'request_blocking': {'type': 'object'},
+                    'cache': {'type': 'object'},
+                    'coalescing': {'type': 'object'},
+                    'jobs': {'type': 'object'},
+                    'breakers': {'type': 'object'},
+                    'rate_limits': {'type': 'object'},
+                    'captures': {'type': 'object'},
+                    'snapshots': {'type': 'object'},
+                    'watchlist': {'type': 'object'}
+                }
+            }
+        }
+    }
+})
+def service_stats():
+    """Report runtime counters of the scraping layer."""
+    return jsonify({
+        'browser_pool': get_pool().stats(),
+        'request_blocking': blocking_stats(),
+        'cache': get_cache().stats(),
+        'coalescing': scrape_flights.stats(),
+        'jobs': get_queue(run_job).stats(),
+        'breakers': breaker_states(),
+        'rate_limits': limiter_stats(),
+        'captures': get_capture_store().stats(),
+        'snapshots': get_snapshot_store().stats(),
+        'watchlist': get_watchlist(refresh_watched).stats(),
+    }), 200
+
+
+@api.route('/api/breakers', methods=['GET'])
+@swag_from({
+    'tags': ['Service'],
+    'responses': {
+        200: {
+            'description': 'Circuit breaker state (closed, open or half_open), recent failures and retry budget per platform'
+        }
+    }
+})
+def list_breakers():
+    """Report the per-platform circuit breakers."""
+    return jsonify(breaker_states()), 200
+
+
+@api.route('/api/breakers/<platform>/reset', methods=['POST'])
+@swag_from({
+    'tags': ['Service'],
+    'parameters': [
+        {
+            'name': 'platform',
+            'in': 'path',
+            'type': 'string',
+            'required': True,
+            'description': 'instagram or tiktok'
+        }
+    ],
+    'responses': {
+        200: {
+            'description': 'Breaker closed'
+        },
+        404: {
+            'description': 'Unknown platform'
+        }
+    }
+})
+def reset_breaker(platform):
+    """Close a platform's circuit breaker, e.g. after rotating proxies."""
+    if platform not in ('instagram', 'tiktok'):
+        return jsonify({'error': 'Unknown platform'}), 404
+    breaker = get_breaker(platform)
+    breaker.reset()
+    return jsonify(breaker.snapshot()), 200
+
+
+
+@api.route('/api/limits', methods=['GET'])
+@swag_from({
+    'tags': ['Service'],
+    'responses': {
+        200: {
+            'description': 'Current rate, tokens, concurrency and adaptation counters per platform'
+        }
+    }
+})
+def list_limits():
+    """Report the per-platform rate limiters."""
+    for platform in ('instagram', 'tiktok'):
+        get_limiter(platform)
+    return jsonify(limiter_stats()), 200
+
+
+@api.route('/api/limits/<platform>', methods=['PUT'])
+@swag_from({
+    'tags': ['Service'],
+    'parameters': [
+        {
+            'name': 'platform',
+            'in': 'path',
+            'type': 'string',
+            'required': True,
+            'description': 'instagram or tiktok'
+        },
+        {
+            'name': 'body',
+            'in': 'body',
+            'required': True,
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'rate': {'type': 'number', 'description': 'Requests per second'},
+                    'burst': {'type': 'number', 'description': 'Requests allowed back to back'},
+                    'max_concurrency': {'type': 'integer', 'description': 'Requests in flight at once'},
+                    'min_rate': {'type': 'number', 'description': 'Floor for adaptive slow-downs'},
+                    'max_rate': {'type': 'number', 'description': 'Ceiling for adaptive speed-ups'},
+                    'adaptive': {'type': 'boolean', 'description': 'Adjust the rate from scrape outcomes'}
+                }
+            }
+        }
+    ],
+    'responses': {
+        200: {
+            'description': 'Updated limiter state'
+        },
+        400: {
+            'description': 'Invalid setting'
+        },
+        404: {
+            'description': 'Unknown platform'
+        }
+    }
+})
+def update_limits(platform):
+    """Change a platform's rate limit settings without restarting."""
+    if platform not in ('instagram', 'tiktok'):
+        return jsonify({'error': 'Unknown platform'}), 404
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict):
+        return jsonify({'error': 'Expected a JSON object of settings'}), 400
+    limiter = get_limiter(platform)
+    try:
+        limiter.configure(**payload)
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+    logger.info(f"Rate limits for {platform} updated: {payload}")
+    return jsonify(limiter.stats()), 200
+
+
+
+@api.route('/api/captures', methods=['GET'])
+@swag_from({
+    'tags': ['Service'],
+    'parameters': [
+        {
+            'name': 'platform',
+            'in': 'query',
+            'type': 'string',
+            'required': False,
+            'description': 'Only list captures for instagram or tiktok'
+        },
+        {
+            'name': 'limit',
+            'in': 'query',
+            'type': 'integer',
+            'required': False,
+            'description': 'Maximum number of captures to return (default 50)'
+        }
+    ],
+    'responses': {
+        200: {
+            'description': 'Captured pages of failed scrapes, newest first',
+            'schema': {
+                'type': 'object',
+                'properties': {
+                    'captures': {
+                        'type': 'array',
+                        'items': {
+                            'type': 'object',
+                            'properties': {
+                                'id': {'type': 'string'},
+                                'platform': {'type': 'string'},
+                                'identifier': {'type': 'string'},
+                                'url': {'type': 'string'},
+                                'reason': {'type': 'string'},
+                                'captured_at': {'type': 'number'},
+                                'bytes': {'type': 'integer'},
+                                'compressed_bytes': {'type': 'integer'}
+                            }
+                        }
+                    }
+                }
+            }
+        }
+    }
+})
+def list_captures():
+    """List the pages captured when a scrape found no data."""
+    try:
+        limit = max(1, int(request.args.get('limit', 50)))
+    except ValueError:
+        return jsonify({'error': 'Invalid limit'}), 400
+    captures = get_capture_store().list(request.args.get('platform'), limit)
+    return jsonify({'captures': captures}), 200
+
+
+@api.route('/api/captures/<capture_id>', methods=['GET'])
+@swag_from({
+    'tags': ['Service'],
+    'produces': ['text/html'],
+    'parameters': [
+        {
+            'name': 'capture_id',
+            'in': 'path',
+            'type': 'string',
+            'required': True
+        }
+    ],
+    'responses': {
+        200: {
+            'description': 'The captured HTML'
+        },
+        404: {
+            'description': 'Unknown or evicted capture'
+        }
+    }
+})
+def get_capture(capture_id):
+    """Return the HTML of a captured page."""
+    html = get_capture_store().read(capture_id)
+    if html is None:
+        return jsonify({'error': 'Capture not found'}), 404
+    # Served as plain text so captured scripts never run in the viewer's browser
+    return Response(html, mimetype='text/plain', headers={'X-Content-Type-Options': 'nosniff'})
+
+
+@api.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Prometheus scrape endpoint: phase histograms, counters and pool gauges."""
+    for stat, value in get_pool().stats().items():
+        if isinstance(value, (int, float)):
+            metrics.BROWSER_POOL.set(stat, value=int(value))
+    for platform, limiter in limiter_stats().items():
+        metrics.RATE_LIMIT_RPS.set(platform, value=limiter['rate'])
+    for platform, breaker in breaker_states().items():
+        metrics.BREAKER_OPEN.set(platform, value=int(breaker['state'] == 'open'))
+    watch_stats = get_watchlist(refresh_watched).stats()
+    for stat in ('entries', 'due', 'in_flight', 'lag_seconds'):
+        metrics.WATCHLIST.set(stat, value=watch_stats[stat])
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+
+# Browser warm-up progress, reported by /readyz
+warm_up_state = {'status': 'disabled', 'error': None, 'duration_ms': None}
+
+
+def warm_up():
+    """Launch the browser pool and open ready pages for each platform."""
+    warm_up_state['status'] = 'warming'
+    started = time.monotonic()
+    pool = get_pool()
+    try:
+        pool.warm()
+        pages = config.WARM_UP_PAGES or pool.size
+        pool.run(scraper.warm_up(pages))
+        pool.run(tiktok_scraper.warm_up(pages))
+    except Exception as e:
+        logger.error(f"Browser warm-up failed: {e}")
+        warm_up_state.update(status='failed', error=str(e))
+        return
+    warm_up_state.update(status='ready', duration_ms=int((time.monotonic() - started) * 1000))
+    logger.info(f"Browser warm-up finished in {warm_up_state['duration_ms']} ms")
+
+
+@api.route('/healthz', methods=['GET'])
+def healthz():
+    """Liveness: the process is up and serving requests."""
+    return jsonify({'status': 'ok'}), 200
+
+
+@api.route('/readyz', methods=['GET'])
+def readyz():
+    """Readiness: warm browser capacity is available for a new scrape.
+
+    The pool's health counts in every mode. Without BROWSER_PRELAUNCH the
+    browsers launch with the first scrape, so until then the worker is
+    reported ready with no browsers.
+    """
+    stats = get_pool().stats()
+    capacity = stats['healthy'] * stats['max_pages'] - stats['active_pages']
+    body = {'warm_up': warm_up_state, 'launched': stats['launched'], 'healthy_browsers': stats['healthy'],
+            'free_pages': max(0, capacity)}
+    if warm_up_state['status'] not in ('disabled', 'ready'):
+        reason = f"warm-up {warm_up_state['status']}"
+    elif not stats['launched'] and warm_up_state['status'] == 'disabled':
+        reason = None
+    elif stats['healthy'] == 0:
+        reason = 'no healthy browsers'
+    elif capacity <= 0:
+        reason = 'all pages busy'
+    else:
+        reason = None
+    body['ready'] = reason is None
+    if reason:
+        body['reason'] = reason
+        return jsonify(body), 503
+    return jsonify(body), 200
+
+
+def start_warm_up():
+    warm_up_state.update(status='pending', error=None, duration_ms=None)
+    threading.Thread(target=warm_up, name="browser-warm-up", daemon=True).start()
+
+
+def warm_up_after_fork():
+    """Pre-launch again in a forked worker (gunicorn --preload); the parent's threads don't survive the fork."""
+    if warm_up_state['status'] != 'disabled':
+        start_warm_up()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=warm_up_after_fork)
+
+
+def create_app(prelaunch=None):
+    """Build the Flask app.
+
+    With ``prelaunch`` (default BROWSER_PRELAUNCH) the browser pool is
+    launched and warmed in a background thread; /readyz reports 503 until
+    that finishes. Forked workers warm their own pool. Flasgger is only
+    imported when SWAGGER_ENABLED.
+    """
+    flask_app = Flask(__name__)
+    flask_app.json = FastJSONProvider(flask_app)
+    CORS(flask_app)  # Enable CORS for frontend API calls
+    flask_app.register_blueprint(api)
+    if config.SWAGGER_ENABLED:
+        from flasgger import Swagger
+        Swagger(flask_app)
+    if config.BROWSER_PRELAUNCH if prelaunch is None else prelaunch:
+        if warm_up_state['status'] in ('disabled', 'failed'):
+            start_warm_up()
+    return flask_app
+
+
+app = create_app()
+
+
 if __name__ == "__main__":
     app.run(debug=False, host='0.0.0.0', port=5000)
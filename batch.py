@@ -0,0 +1,127 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import config
+from http_encoding import dumps
+
+
+def dedupe(identifiers, key_fn):
+    """Drop blanks and duplicates (by ``key_fn``), keeping first-seen order."""
+    seen = set()
+    unique = []
+    for identifier in identifiers:
+        if not isinstance(identifier, str) or not identifier.strip():
+            continue
+        key = key_fn(identifier)
+        if key not in seen:
+            seen.add(key)
+            unique.append(identifier.strip())
+    return unique
+
+
+def clamp_concurrency(requested):
+    """Limit a client's requested parallelism to the server's cap."""
+    try:
+        requested = int(requested)
+    except (TypeError, ValueError):
+        requested = config.BATCH_DEFAULT_CONCURRENCY
+    return max(1, min(requested, config.BATCH_MAX_CONCURRENCY))
+
+
+def _run_one(fn, identifier):
+    started = time.monotonic()
+    try:
+        data, error = fn(identifier)
+    except Exception as e:
+        data, error = None, f"Failed to scrape {identifier}: {e}"
+    result = {"id": identifier, "duration_ms": int((time.monotonic() - started) * 1000)}
+    if error:
+        result["error"] = error
+    else:
+        result["data"] = data
+    return result
+
+
+def iter_batch(identifiers, fn, concurrency):
+    """Yield a result dict per identifier as soon as its scrape finishes.
+
+    ``fn(identifier)`` returns ``(data, error)``; exceptions become per-item
+    errors. At most ``concurrency`` scrapes run at once and only that many
+    are submitted ahead, so memory does not grow with the batch size.
+    """
+    items = iter(identifiers)
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="batch") as executor:
+        pending = set()
+        for identifier in items:
+            pending.add(executor.submit(_run_one, fn, identifier))
+            if len(pending) >= concurrency:
+                break
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+                next_identifier = next(items, None)
+                if next_identifier is not None:
+                    pending.add(executor.submit(_run_one, fn, next_identifier))
+
+
+def run_batch(identifiers, fn, concurrency):
+    """Run a batch and return ``(results, summary)`` with results in input order."""
+    summary = BatchSummary()
+    order = {identifier: i for i, identifier in enumerate(identifiers)}
+    results = []
+    for result in iter_batch(identifiers, fn, concurrency):
+        summary.add(result)
+        results.append(result)
+    results.sort(key=lambda r: order[r["id"]])
+    return results, summary.as_dict()
+
+
+def stream_batch(identifiers, fn, concurrency, fmt, extra_summary=None):
+    """Yield NDJSON lines or SSE events for a batch, ending with a summary.
+
+    ``fmt`` is ``"ndjson"`` or ``"sse"``. Results are emitted in completion
+    order and not retained, so memory stays flat however large the batch.
+    """
+    summary = BatchSummary()
+    for result in iter_batch(identifiers, fn, concurrency):
+        summary.add(result)
+        yield _encode(fmt, "result", result)
+    record = summary.as_dict()
+    record.update(extra_summary or {})
+    yield _encode(fmt, "summary", {"summary": record})
+
+
+def _encode(fmt, event, record):
+    payload = dumps(record)
+    if fmt == "sse":
+        return f"event: {event}\ndata: {payload}\n\n"
+    return payload + "\n"
+
+
+class BatchSummary:
+    """Running counts and timings for a batch."""
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.total = 0
+        self.succeeded = 0
+        self.item_ms_total = 0
+        self.item_ms_max = 0
+
+    def add(self, result):
+        self.total += 1
+        if "data" in result:
+            self.succeeded += 1
+        self.item_ms_total += result["duration_ms"]
+        self.item_ms_max = max(self.item_ms_max, result["duration_ms"])
+
+    def as_dict(self):
+        return {
+            "total": self.total,
+            "succeeded": self.succeeded,
+            "failed": self.total - self.succeeded,
+            "duration_ms": int((time.monotonic() - self.started) * 1000),
+            "item_avg_ms": int(self.item_ms_total / self.total) if self.total else 0,
+            "item_max_ms": self.item_ms_max,
+        }
@@ -0,0 +1,383 @@
+"""Offline benchmark against a local stand-in for Instagram and TikTok.
+
+Serves the HTML in ``benchmark_fixtures/`` from a local HTTP server (with
+optional document and subresource latency), points the scrapers at it and
+reports throughput, latency percentiles, memory and browser launches.
+
+    python benchmark.py single --iterations 20
+    python benchmark.py load --requests 300 --concurrency 16 --output before.json
+    python benchmark.py load --no-fast-path --latency-ms 150 --subresource-latency-ms 500
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import quote
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_fixtures")
+KINDS = ("profile", "reel", "tiktok_profile")
+
+_STATIC_TYPES = {
+    ".css": "text/css",
+    ".js": "application/javascript",
+    ".jpg": "image/jpeg",
+    ".mp4": "video/mp4",
+    ".woff2": "font/woff2",
+}
+
+
+class FixtureServer:
+    """Threaded HTTP server rendering the fixtures for any username or reel.
+
+    ``/<username>/`` is an Instagram profile, ``/reel/<shortcode>/`` a reel,
+    ``/@<username>`` a TikTok profile and ``/static/*`` a subresource.
+    """
+
+    def __init__(self, latency_ms=0, subresource_latency_ms=0, padding_kb=0):
+        self.latency = latency_ms / 1000
+        self.subresource_latency = subresource_latency_ms / 1000
+        self.padding = self._padding(padding_kb)
+        self.templates = {}
+        for kind, filename in (("profile", "instagram_profile.html"), ("reel", "instagram_reel.html"),
+                               ("tiktok_profile", "tiktok_profile.html")):
+            with open(os.path.join(FIXTURES_DIR, filename), encoding="utf-8") as f:
+                self.templates[kind] = f.read()
+        self.hits = {kind: 0 for kind in KINDS + ("static", "not_found")}
+        self._lock = threading.Lock()
+        self._server = None
+
+    @staticmethod
+    def _padding(kb):
+        # Inline script bulk, like the JSON blobs real pages carry
+        if kb <= 0:
+            return ""
+        return "<script>var __fixturePadding = \"" + "x" * (kb * 1024) + "\";</script>"
+
+    def render(self, kind, username="", shortcode=""):
+        html = self.templates[kind]
+        for name, value in (("username", username), ("name", username.replace("_", " ").title()),
+                            ("shortcode", shortcode), ("padding", self.padding)):
+            html = html.replace("{{" + name + "}}", value)
+        return html.encode("utf-8")
+
+    def count(self, kind):
+        with self._lock:
+            self.hits[kind] += 1
+
+    def start(self):
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), _FixtureHandler)
+        self._server.daemon_threads = True
+        self._server.fixture = self
+        threading.Thread(target=self._server.serve_forever, name="fixture-server", daemon=True).start()
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+
+
+class _FixtureHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        fixture = self.server.fixture
+        path = self.path.split("?", 1)[0]
+        parts = [part for part in path.split("/") if part]
+        if path.startswith("/static/"):
+            fixture.count("static")
+            time.sleep(fixture.subresource_latency)
+            content_type = _STATIC_TYPES.get(os.path.splitext(path)[1], "application/octet-stream")
+            return self._send(200, content_type, b"\0" * 2048)
+        if len(parts) == 2 and parts[0] == "reel":
+            kind, body = "reel", fixture.render("reel", "fixture_reels", parts[1])
+        elif len(parts) == 1 and parts[0].startswith("@"):
+            kind, body = "tiktok_profile", fixture.render("tiktok_profile", parts[0][1:])
+        elif len(parts) == 1:
+            kind, body = "profile", fixture.render("profile", parts[0])
+        else:
+            fixture.count("not_found")
+            return self._send(404, "text/plain", b"Not found")
+        fixture.count(kind)
+        time.sleep(fixture.latency)
+        self._send(200, "text/html; charset=utf-8", body)
+
+    def _send(self, status, content_type, body):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def percentile(sorted_values, p):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(p / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def summarize(samples, elapsed):
+    """Reduce ``(latency_seconds, ok, source)`` samples to a result dict."""
+    latencies = sorted(latency * 1000 for latency, _, _ in samples)
+    sources = {}
+    for _, ok, source in samples:
+        if ok:
+            sources[source or "unknown"] = sources.get(source or "unknown", 0) + 1
+    errors = sum(1 for _, ok, _ in samples if not ok)
+    return {
+        "count": len(samples),
+        "errors": errors,
+        "sources": sources,
+        "duration_s": round(elapsed, 3),
+        "throughput_rps": round(len(samples) / elapsed, 2) if elapsed else None,
+        "latency_ms": {
+            "min": round(latencies[0], 1) if latencies else None,
+            "mean": round(sum(latencies) / len(latencies), 1) if latencies else None,
+            "p50": _round(percentile(latencies, 50)),
+            "p95": _round(percentile(latencies, 95)),
+            "p99": _round(percentile(latencies, 99)),
+            "max": round(latencies[-1], 1) if latencies else None,
+        },
+    }
+
+
+def _round(value):
+    return None if value is None else round(value, 1)
+
+
+def tree_rss(pid=None):
+    """Resident bytes of ``pid`` (default: this process) and all descendants."""
+    pid = pid or os.getpid()
+    if not os.path.isdir("/proc"):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    page_size = os.sysconf("SC_PAGE_SIZE")
+    children, rss = {}, {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                stat = f.read().rsplit(")", 1)[1].split()
+            with open(f"/proc/{entry}/statm") as f:
+                rss[int(entry)] = int(f.read().split()[1]) * page_size
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(int(stat[1]), []).append(int(entry))
+    total, stack = 0, [pid]
+    while stack:
+        current = stack.pop()
+        total += rss.get(current, 0)
+        stack.extend(children.get(current, []))
+    return total
+
+
+class RssSampler:
+    """Track peak process-tree RSS (Python, Playwright driver, browsers)."""
+
+    def __init__(self, interval=0.5):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="rss-sampler", daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, tree_rss())
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, tree_rss())
+
+
+def identifiers(kind, base_url, count, distinct):
+    """Yield ``count`` identifiers cycling over ``distinct`` unique ones."""
+    for i in range(count):
+        n = i % distinct
+        if kind == "reel":
+            yield f"{base_url}/reel/Bench{n:06d}/"
+        else:
+            yield f"bench_user_{n}"
+
+
+def run_single(args, base_url):
+    """Call the scraper functions directly, one at a time."""
+    from browser_pool import get_pool
+    from scraper import get_instagram_data, get_reel_data
+    from tiktok_scraper import scrape_tiktok_profile
+
+    def tiktok(username):
+        return get_pool().run(scrape_tiktok_profile(username))
+
+    calls = {"profile": get_instagram_data, "reel": get_reel_data, "tiktok_profile": tiktok}
+    results = {}
+    for kind in args.kinds:
+        samples = []
+        started = time.perf_counter()
+        for identifier in identifiers(kind, base_url, args.iterations, args.iterations):
+            call_started = time.perf_counter()
+            try:
+                data, error = calls[kind](identifier)
+            except Exception as e:
+                data, error = None, str(e)
+            samples.append((time.perf_counter() - call_started, not error, (data or {}).get("Source", "browser")))
+        results[kind] = summarize(samples, time.perf_counter() - started)
+    return results
+
+
+def run_load(args, base_url):
+    """Drive the Flask endpoints over HTTP with concurrent clients."""
+    import requests
+    from werkzeug.serving import make_server
+
+    import app as app_module
+
+    server = make_server("127.0.0.1", 0, app_module.app, threaded=True)
+    threading.Thread(target=server.serve_forever, name="bench-app", daemon=True).start()
+    api = f"http://127.0.0.1:{server.server_port}"
+    session = requests.Session()
+    session.mount("http://", requests.adapters.HTTPAdapter(pool_maxsize=args.concurrency))
+    routes = {"profile": ("/api/profile", "username"), "reel": ("/api/reel", "reel_url"),
+              "tiktok_profile": ("/api/tiktok_profile", "username")}
+
+    def one(kind, identifier):
+        path, param = routes[kind]
+        url = f"{api}{path}?{param}={quote(identifier, safe='')}"
+        if not args.cache:
+            url += "&no_cache=1"
+        started = time.perf_counter()
+        try:
+            response = session.get(url, timeout=args.timeout)
+            ok = response.status_code == 200
+            source = response.json().get("Source", "browser") if ok else None
+        except Exception:
+            ok, source = False, None
+        return time.perf_counter() - started, ok, source
+
+    results = {}
+    try:
+        for kind in args.kinds:
+            distinct = args.distinct or args.requests
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+                samples = list(executor.map(lambda identifier: one(kind, identifier),
+                                            identifiers(kind, base_url, args.requests, distinct)))
+            results[kind] = summarize(samples, time.perf_counter() - started)
+    finally:
+        server.shutdown()
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def configure_environment(args, base_url):
+    """Point the scrapers at the fixture server; must run before importing them."""
+    os.environ["INSTAGRAM_BASE_URL"] = base_url
+    os.environ["TIKTOK_BASE_URL"] = base_url
+    os.environ["JOB_AUTOSTART"] = "0"
+    os.environ["WATCHLIST_AUTOSTART"] = "0"
+    # Keep fixture results out of the real databases and capture directory
+    state_dir = tempfile.mkdtemp(prefix="bench-")
+    os.environ["JOB_DB_PATH"] = os.path.join(state_dir, "jobs.db")
+    os.environ["CACHE_SHARED_PATH"] = os.path.join(state_dir, "result_cache.db")
+    os.environ["SNAPSHOT_DB_PATH"] = os.path.join(state_dir, "snapshots.db")
+    os.environ["WATCHLIST_DB_PATH"] = os.path.join(state_dir, "watchlist.db")
+    os.environ["CAPTURE_DIR"] = os.path.join(state_dir, "captures")
+    os.environ["RATE_LIMIT_ENABLED"] = "1" if args.rate_limit else "0"
+    os.environ["FAST_PATH_ENABLED"] = "0" if args.no_fast_path else "1"
+    # Fixture pages are identical, so failures would only trip the breaker
+    os.environ.setdefault("BREAKER_MIN_CALLS", str(10 ** 9))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("mode", choices=("single", "load"),
+                        help="single: sequential scraper calls; load: concurrent requests to the Flask API")
+    parser.add_argument("--kinds", nargs="+", choices=KINDS, default=list(KINDS))
+    parser.add_argument("--iterations", type=int, default=10, help="Calls per kind in single mode")
+    parser.add_argument("--requests", type=int, default=100, help="Requests per kind in load mode")
+    parser.add_argument("--concurrency", type=int, default=8, help="Parallel clients in load mode")
+    parser.add_argument("--distinct", type=int, default=0,
+                        help="Distinct identifiers in load mode (default: all unique)")
+    parser.add_argument("--cache", action="store_true", help="Let load requests use the result cache")
+    parser.add_argument("--timeout", type=float, default=120, help="Per-request timeout in load mode")
+    parser.add_argument("--latency-ms", type=int, default=0, help="Delay before serving each document")
+    parser.add_argument("--subresource-latency-ms", type=int, default=0,
+                        help="Delay before serving images, styles, scripts and fonts")
+    parser.add_argument("--padding-kb", type=int, default=0, help="Extra inline script per document")
+    parser.add_argument("--no-fast-path", action="store_true", help="Force the browser path for Instagram")
+    parser.add_argument("--rate-limit", action="store_true", help="Keep the per-platform rate limiters on")
+    parser.add_argument("--output", default="benchmark_results.json", help="Where to write the JSON results")
+    args = parser.parse_args(argv)
+
+    fixture = FixtureServer(args.latency_ms, args.subresource_latency_ms, args.padding_kb)
+    base_url = fixture.start()
+    configure_environment(args, base_url)
+
+    import metrics
+    from browser_pool import get_pool
+
+    try:
+        with RssSampler() as sampler:
+            results = run_single(args, base_url) if args.mode == "single" else run_load(args, base_url)
+        pool_stats = get_pool().stats()
+    finally:
+        fixture.stop()
+
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "git_commit": git_commit(),
+        "python": platform.python_version(),
+        "mode": args.mode,
+        "settings": {key: value for key, value in vars(args).items() if key not in ("mode", "output")},
+        "results": results,
+        "phases_ms": {f"{platform_name}.{phase}": {"count": state["count"],
+                                                   "mean": round(state["sum"] / state["count"] * 1000, 1)}
+                      for (platform_name, phase), state in metrics.PHASE_SECONDS.snapshot().items()
+                      if state["count"]},
+        "fixture_hits": fixture.hits,
+        "peak_rss_bytes": sampler.peak,
+        "browser_launches": pool_stats["launches"],
+        "pages_opened": pool_stats["pages_opened"],
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    for kind, result in results.items():
+        latency = result["latency_ms"]
+        print(f"{kind:15} {result['count']:5} calls {result['errors']:4} errors "
+              f"{result['throughput_rps'] or 0:8.2f} req/s  p50 {latency['p50']} ms  "
+              f"p95 {latency['p95']} ms  p99 {latency['p99']} ms  sources {result['sources']}")
+    print(f"peak RSS {sampler.peak / 2 ** 20:.0f} MiB, {report['browser_launches']} browser launches, "
+          f"{report['pages_opened']} pages opened; results written to {args.output}")
+    get_pool().close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,543 @@
+import asyncio
+import atexit
+import logging
+import os
+import threading
+import time
+import uuid
+from contextlib import asynccontextmanager
+
+from playwright.async_api import async_playwright
+
+import config
+from metrics import span
+
+logger = logging.getLogger(__name__)
+
+# Navigating here exercises the renderer without touching the network
+WARM_UP_URL = "data:text/html,<!DOCTYPE html><title>warm-up</title><p>warm-up</p>"
+
+
+class SharedContext:
+    """A browser context whose pages are leased as separate tabs, up to ``tabs`` at once.
+
+    The context closes with its last page and takes no new pages once it is
+    ``CONTEXT_MAX_AGE`` old.
+    """
+
+    def __init__(self, context, tabs):
+        self.context = context
+        self.tabs = tabs
+        self.pages = 0
+        self.closed = False
+        self.created_at = time.monotonic()
+
+    def is_expired(self):
+        return self.closed or time.monotonic() - self.created_at >= config.CONTEXT_MAX_AGE
+
+    def has_room(self):
+        return not self.is_expired() and self.pages < self.tabs
+
+    def detach(self):
+        """Forget one page; returns True if it was the last and the context should close."""
+        self.pages -= 1
+        if self.pages == 0:
+            self.closed = True
+            return True
+        return False
+
+
+class PooledPage:
+    """A context/page pair that is reused across scrapes until it expires.
+
+    Pages opened as tabs of a ``SharedContext`` close only themselves; the
+    context goes with its last tab.
+    """
+
+    def __init__(self, key, context, page, shared=None):
+        self.key = key
+        self.context = context
+        self.page = page
+        self.shared = shared
+        self.created_at = time.monotonic()
+        self.uses = 0
+
+    def is_expired(self):
+        return (
+            self.page.is_closed()
+            or self.uses >= config.CONTEXT_MAX_USES
+            or time.monotonic() - self.created_at >= config.CONTEXT_MAX_AGE
+            or (self.shared is not None and self.shared.is_expired())
+        )
+
+    async def close(self):
+        try:
+            if self.shared is None:
+                await self.context.close()
+                return
+            last = self.shared.detach()
+            await self.page.close()
+            if last:
+                await self.context.close()
+        except Exception:
+            pass
+
+
+class PooledBrowser:
+    """A warm Chromium instance plus the bookkeeping the pool needs."""
+
+    def __init__(self, browser, browser_id, marker):
+        self.browser = browser
+        self.id = browser_id
+        self.marker = marker
+        self.launched_at = time.monotonic()
+        self.active = 0
+        self.leases = 0
+        self.rss = None
+        self.retiring = False
+        self.idle_pages = {}
+        self.shared_contexts = {}
+
+    def is_healthy(self):
+        return self.browser.is_connected()
+
+    def take_page(self, key, discard):
+        """Pop a reusable page for ``key``, discarding expired ones."""
+        idle = self.idle_pages.get(key, [])
+        while idle:
+            slot = idle.pop()
+            if not slot.is_expired():
+                return slot
+            discard(slot)
+        return None
+
+    def take_context(self, key, tabs):
+        """Return a shared context for ``key`` with room for another tab, or None."""
+        contexts = [shared for shared in self.shared_contexts.get(key, []) if not shared.closed]
+        self.shared_contexts[key] = contexts
+        for shared in contexts:
+            if shared.tabs == tabs and shared.has_room():
+                return shared
+        return None
+
+
+class BrowserPool:
+    """Process-wide pool of warm Chromium browsers.
+
+    Playwright objects are bound to the event loop that created them, so the
+    pool owns the process's single long-lived scrape loop, running in its own
+    thread, and the one Playwright driver on it. Sync callers hand coroutines
+    to it with ``run()``; async callers use ``call()``. The driver and
+    browsers start on the first lease, or up front with ``warm()``. Each
+    browser is leased to at most ``max_pages`` scrapes at a time.
+
+    Contexts and pages are kept per browser and reused by ``lease_page()``
+    until they reach ``CONTEXT_MAX_USES`` or ``CONTEXT_MAX_AGE``. Browsers that
+    exceed ``BROWSER_MAX_RSS_MB`` or ``BROWSER_MAX_AGE`` are rotated in the
+    background: a replacement takes new leases right away and the old browser
+    is closed once its in-flight scrapes finish.
+    """
+
+    def __init__(self, size=None, max_pages=None, launch_options=None):
+        self.size = size or config.BROWSER_POOL_SIZE
+        self.max_pages = max_pages or config.BROWSER_MAX_PAGES
+        self.launch_options = launch_options or {"headless": True}
+        self.loop = None
+        self._thread = None
+        self._playwright = None
+        self._browsers = []
+        self._retiring = []
+        self._available = asyncio.Condition()
+        self._launch_lock = asyncio.Lock()
+        self._health_task = None
+        self._start_lock = threading.Lock()
+        self._next_id = 0
+        self.launched = False
+        self.launches = 0
+        self.replacements = 0
+        self.rotations = 0
+        self.pages_opened = 0
+        self.pages_recycled = 0
+
+    # -- lifecycle -----------------------------------------------------------
+
+    def start(self):
+        """Start the loop thread (idempotent). Browsers launch on first lease."""
+        with self._start_lock:
+            if self.loop is not None:
+                return
+            loop = asyncio.new_event_loop()
+            self._thread = threading.Thread(target=loop.run_forever, name="browser-pool", daemon=True)
+            self._thread.start()
+            self.loop = loop
+
+    def warm(self):
+        """Start the Playwright driver and launch all browsers now."""
+        self.run(self._ensure_launched())
+
+    async def _ensure_launched(self):
+        if self.launched:
+            return
+        async with self._launch_lock:
+            if self.launched:
+                return
+            self._playwright = await async_playwright().start()
+            try:
+                for _ in range(self.size):
+                    self._browsers.append(await self._launch())
+            except BaseException:
+                for pooled in self._browsers:
+                    await pooled.browser.close()
+                self._browsers = []
+                await self._playwright.stop()
+                raise
+            self._health_task = asyncio.ensure_future(self._health_loop())
+            self.launched = True
+            logger.info("Browser pool launched %d browsers", self.size)
+
+    async def _launch(self):
+        # Chromium ignores unknown switches; the marker lets us find the
+        # browser's processes to measure its memory.
+        marker = f"--browser-pool-id={uuid.uuid4().hex}"
+        options = dict(self.launch_options)
+        options["args"] = list(options.get("args", [])) + [marker]
+        with span("browser", "launch"):
+            browser = await self._playwright.chromium.launch(**options)
+        self._next_id += 1
+        self.launches += 1
+        return PooledBrowser(browser, self._next_id, marker)
+
+    def close(self):
+        if self.loop is None:
+            return
+        try:
+            self.run(self._close(), timeout=30)
+        except Exception as e:
+            logger.warning("Browser pool shutdown error: %s", e)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout=5)
+        self.loop = None
+
+    async def _close(self):
+        if not self.launched:
+            return
+        if self._health_task:
+            self._health_task.cancel()
+        for pooled in self._browsers + self._retiring:
+            try:
+                await pooled.browser.close()
+            except Exception:
+                pass
+        self._browsers = []
+        self._retiring = []
+        await self._playwright.stop()
+        self.launched = False
+
+    # -- running work on the pool loop ---------------------------------------
+
+    def run(self, coro, timeout=None):
+        """Run a coroutine on the pool loop and block until it finishes."""
+        if self.loop is None:
+            self.start()
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result(timeout)
+
+    async def call(self, coro):
+        """Await a coroutine on the pool loop from any event loop."""
+        if self.loop is None:
+            self.start()
+        if asyncio.get_running_loop() is self.loop:
+            return await coro
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, self.loop))
+
+    # -- lease / return ------------------------------------------------------
+
+    async def acquire(self, timeout=None):
+        """Lease the least busy healthy browser, waiting for capacity if needed."""
+        timeout = config.BROWSER_LEASE_TIMEOUT if timeout is None else timeout
+        await self._ensure_launched()
+        async with self._available:
+            pooled = await asyncio.wait_for(
+                self._available.wait_for(self._pick), timeout
+            )
+            if not pooled.is_healthy():
+                pooled = await self._replace(pooled)
+            pooled.active += 1
+            pooled.leases += 1
+            return pooled
+
+    async def release(self, pooled):
+        """Return a leased browser to the pool."""
+        async with self._available:
+            pooled.active -= 1
+            if pooled.retiring and pooled.active == 0:
+                asyncio.ensure_future(self._close_retired(pooled))
+            self._available.notify_all()
+
+    @asynccontextmanager
+    async def lease(self, timeout=None):
+        pooled = await self.acquire(timeout)
+        try:
+            yield pooled.browser
+        finally:
+            await self.release(pooled)
+
+    @asynccontextmanager
+    async def lease_page(self, key, context_options=None, setup=None, timeout=None, tabs=1):
+        """Lease a ready page, reusing an idle one for ``key`` when possible.
+
+        ``setup`` is awaited once with each new page (e.g. to apply stealth).
+        With ``tabs`` > 1 new pages open as tabs of a shared context, up to
+        ``tabs`` per context, instead of one context each. Pages that raise
+        out of the ``async with`` block are never reused.
+        """
+        with span(key, "lease"):
+            pooled = await self.acquire(timeout)
+        slot = None
+        try:
+            slot = pooled.take_page(key, self._discard)
+            if slot is None:
+                with span(key, "new_page"):
+                    slot = await self._open_page(pooled, key, context_options, setup, tabs)
+            yield slot.page
+        except BaseException:
+            if slot is not None:
+                self._discard(slot)
+                slot = None
+            raise
+        finally:
+            if slot is not None:
+                slot.uses += 1
+                if pooled.retiring or slot.is_expired():
+                    self._discard(slot)
+                else:
+                    pooled.idle_pages.setdefault(key, []).append(slot)
+            await self.release(pooled)
+
+    async def warm_page(self, key, context_options=None, setup=None):
+        """Open a page for ``key``, load a local page in it and leave it idle.
+
+        Runs the same setup as a real scrape, so stealth scripts and routing
+        are in place before the first request needs them.
+        """
+        async with self.lease_page(key, context_options, setup) as page:
+            await page.goto(WARM_UP_URL)
+
+    async def _open_page(self, pooled, key, context_options, setup, tabs=1):
+        if tabs > 1:
+            return await self._open_tab(pooled, key, context_options, setup, tabs)
+        context = await pooled.browser.new_context(**(context_options or {}))
+        try:
+            page = await context.new_page()
+            if setup:
+                await setup(page)
+        except BaseException:
+            await context.close()
+            raise
+        self.pages_opened += 1
+        return PooledPage(key, context, page)
+
+    async def _open_tab(self, pooled, key, context_options, setup, tabs):
+        shared = pooled.take_context(key, tabs)
+        if shared is None:
+            shared = SharedContext(await pooled.browser.new_context(**(context_options or {})), tabs)
+            pooled.shared_contexts.setdefault(key, []).append(shared)
+        # Count the tab before awaiting so the context can't close under it
+        shared.pages += 1
+        page = None
+        try:
+            page = await shared.context.new_page()
+            slot = PooledPage(key, shared.context, page, shared)
+            if setup:
+                await setup(page)
+        except BaseException:
+            if shared.detach():
+                await shared.context.close()
+            elif page is not None:
+                # Other tabs keep the context open, so close just this one
+                try:
+                    await page.close()
+                except Exception:
+                    pass
+            raise
+        self.pages_opened += 1
+        return slot
+
+    def _discard(self, slot):
+        """Close a page's context in the background."""
+        self.pages_recycled += 1
+        asyncio.ensure_future(slot.close())
+
+    def _pick(self):
+        free = [b for b in self._browsers if b.active < self.max_pages]
+        if not free:
+            return None
+        return min(free, key=lambda b: b.active)
+
+    # -- health checks and rotation ------------------------------------------
+
+    async def _replace(self, pooled):
+        """Swap a dead browser for a fresh one in place.
+
+        Leases still open on the dead browser release the old object, so it
+        is retired rather than dropped and the fresh one starts idle.
+        """
+        logger.warning("Replacing unhealthy browser %d", pooled.id)
+        try:
+            await pooled.browser.close()
+        except Exception:
+            pass
+        fresh = await self._launch()
+        self._browsers[self._browsers.index(pooled)] = fresh
+        if pooled.active:
+            pooled.retiring = True
+            self._retiring.append(pooled)
+        self.replacements += 1
+        return fresh
+
+    def _should_rotate(self, pooled):
+        if time.monotonic() - pooled.launched_at >= config.BROWSER_MAX_AGE:
+            return True
+        limit = config.BROWSER_MAX_RSS_MB
+        return bool(limit) and pooled.rss is not None and pooled.rss >= limit * 1024 * 1024
+
+    async def _rotate(self, pooled):
+        """Put a fresh browser in rotation and retire the old one."""
+        logger.info("Rotating browser %d (rss=%s bytes)", pooled.id, pooled.rss)
+        fresh = await self._launch()
+        async with self._available:
+            self._browsers[self._browsers.index(pooled)] = fresh
+            pooled.retiring = True
+            self._retiring.append(pooled)
+            if pooled.active == 0:
+                asyncio.ensure_future(self._close_retired(pooled))
+            self.rotations += 1
+            self._available.notify_all()
+
+    async def _close_retired(self, pooled):
+        if pooled in self._retiring:
+            self._retiring.remove(pooled)
+        try:
+            await pooled.browser.close()
+        except Exception:
+            pass
+
+    async def _health_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(config.BROWSER_HEALTH_INTERVAL)
+            try:
+                async with self._available:
+                    for pooled in list(self._browsers):
+                        if pooled.active == 0 and not pooled.is_healthy():
+                            await self._replace(pooled)
+                    self._available.notify_all()
+
+                browsers = list(self._browsers)
+                usage = await loop.run_in_executor(None, browser_rss, [b.marker for b in browsers])
+                for pooled in browsers:
+                    pooled.rss = usage.get(pooled.marker)
+                    if pooled in self._browsers and self._should_rotate(pooled):
+                        await self._rotate(pooled)
+            except Exception as e:
+                logger.error("Browser pool health check failed: %s", e)
+
+    def stats(self):
+        browsers = list(self._browsers)
+        return {
+            "size": self.size,
+            "max_pages": self.max_pages,
+            "started": self.loop is not None,
+            "launched": self.launched,
+            "healthy": sum(1 for b in browsers if b.is_healthy()),
+            "active_pages": sum(b.active for b in browsers),
+            "idle_pages": sum(len(p) for b in browsers for p in b.idle_pages.values()),
+            "shared_contexts": sum(1 for b in browsers for contexts in b.shared_contexts.values()
+                                   for shared in contexts if not shared.closed),
+            "retiring": len(self._retiring),
+            "launches": self.launches,
+            "replacements": self.replacements,
+            "rotations": self.rotations,
+            "pages_opened": self.pages_opened,
+            "pages_recycled": self.pages_recycled,
+            "rss_bytes": {b.id: b.rss for b in browsers},
+        }
+
+
+def browser_rss(markers):
+    """Return resident memory in bytes for each browser marker.
+
+    Sums the browser process and all of its children (renderers, GPU, ...)
+    by walking ``/proc``. Returns an empty dict where ``/proc`` is missing.
+    """
+    if not os.path.isdir("/proc"):
+        return {}
+    page_size = os.sysconf("SC_PAGE_SIZE")
+    parents, cmdlines, rss = {}, {}, {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        pid = int(entry)
+        try:
+            with open(f"/proc/{pid}/stat", "rb") as f:
+                stat = f.read()
+            with open(f"/proc/{pid}/cmdline", "rb") as f:
+                cmdline = f.read()
+            with open(f"/proc/{pid}/statm", "rb") as f:
+                resident = int(f.read().split()[1]) * page_size
+            # The command name may contain spaces; ppid follows the closing paren
+            parents[pid] = int(stat[stat.rindex(b")") + 2:].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        cmdlines[pid] = cmdline
+        rss[pid] = resident
+
+    children = {}
+    for pid, ppid in parents.items():
+        children.setdefault(ppid, []).append(pid)
+
+    usage = {}
+    for marker in markers:
+        needle = marker.encode()
+        roots = [pid for pid, cmd in cmdlines.items()
+                 if needle in cmd and needle not in cmdlines.get(parents.get(pid), b"")]
+        total, stack = 0, list(roots)
+        while stack:
+            pid = stack.pop()
+            total += rss.get(pid, 0)
+            stack.extend(children.get(pid, []))
+        if roots:
+            usage[marker] = total
+    return usage
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Return the process-wide browser pool, creating it on first use.
+
+    The pool is created lazily so that forking servers (gunicorn) start their
+    browsers in each worker rather than in the master process. A pool that
+    already exists when the process forks (``--preload`` with pre-launch)
+    is dropped in the child, whose first call builds a new one.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = BrowserPool()
+            atexit.register(_pool.close)
+        return _pool
+
+
+def _forget_pool_after_fork():
+    """The pool's loop thread does not survive fork(); make the child start its own."""
+    global _pool, _pool_lock
+    if _pool is not None:
+        _pool.loop = None  # its atexit close() would wait on the parent's loop
+    _pool = None
+    _pool_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_forget_pool_after_fork)
@@ -0,0 +1,212 @@
+import atexit
+import gzip
+import json
+import logging
+import os
+import queue
+import random
+import re
+import threading
+import time
+import uuid
+
+import config
+
+logger = logging.getLogger(__name__)
+
+_ID_RE = re.compile(r"^[\w.-]+$")
+_UNSAFE_RE = re.compile(r"[^\w.-]+")
+
+
+class CaptureStore:
+    """Bounded on-disk store of gzipped HTML from failed scrapes.
+
+    ``add()`` only enqueues; a background thread compresses and writes each
+    capture as ``<id>.html.gz`` with an ``<id>.json`` metadata sidecar, then
+    evicts the oldest captures beyond ``max_count`` or ``max_bytes``. When the
+    queue is full new captures are dropped rather than blocking a scrape.
+    """
+
+    def __init__(self, directory=None, max_count=None, max_bytes=None, sample_rate=None, queue_size=None):
+        self.directory = directory or config.CAPTURE_DIR
+        self.max_count = max_count or config.CAPTURE_MAX_COUNT
+        self.max_bytes = max_bytes or config.CAPTURE_MAX_MB * 1024 * 1024
+        self.sample_rate = config.CAPTURE_SAMPLE_RATE if sample_rate is None else sample_rate
+        self._queue = queue.Queue(maxsize=queue_size or config.CAPTURE_QUEUE_SIZE)
+        self._lock = threading.Lock()
+        self._index = {}
+        self.bytes = 0
+        self.captured = 0
+        self.sampled_out = 0
+        self.dropped = 0
+        self.evicted = 0
+        os.makedirs(self.directory, exist_ok=True)
+        self._load_index()
+        self._writer = threading.Thread(target=self._write_loop, name="capture-writer", daemon=True)
+        self._writer.start()
+
+    def _load_index(self):
+        for filename in os.listdir(self.directory):
+            if not filename.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.directory, filename), encoding="utf-8") as f:
+                    meta = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if os.path.exists(self._html_path(meta["id"])):
+                self._index[meta["id"]] = meta
+                self.bytes += meta["compressed_bytes"]
+        self._index = dict(sorted(self._index.items(), key=lambda item: item[1]["captured_at"]))
+
+    def _html_path(self, capture_id):
+        return os.path.join(self.directory, f"{capture_id}.html.gz")
+
+    def _meta_path(self, capture_id):
+        return os.path.join(self.directory, f"{capture_id}.json")
+
+    def sample(self):
+        """Decide whether to capture this failure (call before reading the page)."""
+        if self.sample_rate >= 1 or random.random() < self.sample_rate:
+            return True
+        with self._lock:
+            self.sampled_out += 1
+        return False
+
+    def add(self, platform, identifier, html, reason=None, url=None):
+        """Queue ``html`` for writing and return its capture id, or None if dropped."""
+        capture_id = "{}-{}-{}-{}".format(
+            time.strftime("%Y%m%dT%H%M%S"), platform, _UNSAFE_RE.sub("_", identifier)[:60], uuid.uuid4().hex[:8]
+        )
+        meta = {
+            "id": capture_id,
+            "platform": platform,
+            "identifier": identifier,
+            "url": url,
+            "reason": reason,
+            "captured_at": time.time(),
+            "bytes": len(html.encode("utf-8")),
+        }
+        try:
+            self._queue.put_nowait((meta, html))
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            return None
+        return capture_id
+
+    def _write_loop(self):
+        while True:
+            meta, html = self._queue.get()
+            try:
+                self._write(meta, html)
+            except Exception as e:
+                logger.error("Could not write capture %s: %s", meta["id"], e)
+            finally:
+                self._queue.task_done()
+
+    def _write(self, meta, html):
+        html_path = self._html_path(meta["id"])
+        tmp_path = html_path + ".tmp"
+        with gzip.open(tmp_path, "wt", encoding="utf-8", compresslevel=6) as f:
+            f.write(html)
+        os.replace(tmp_path, html_path)
+        meta["compressed_bytes"] = os.path.getsize(html_path)
+        with open(self._meta_path(meta["id"]), "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        with self._lock:
+            self._index[meta["id"]] = meta
+            self.bytes += meta["compressed_bytes"]
+            self.captured += 1
+            expired = []
+            while self._index and (len(self._index) > self.max_count or self.bytes > self.max_bytes):
+                oldest_id = next(iter(self._index))
+                self.bytes -= self._index.pop(oldest_id)["compressed_bytes"]
+                self.evicted += 1
+                expired.append(oldest_id)
+        for capture_id in expired:
+            for path in (self._html_path(capture_id), self._meta_path(capture_id)):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def list(self, platform=None, limit=50):
+        """Return capture metadata, newest first."""
+        with self._lock:
+            captures = [meta for meta in reversed(self._index.values())
+                        if platform is None or meta["platform"] == platform]
+        return captures[:limit]
+
+    def get(self, capture_id):
+        with self._lock:
+            return self._index.get(capture_id)
+
+    def read(self, capture_id):
+        """Return the decompressed HTML of a capture, or None."""
+        if not _ID_RE.match(capture_id) or self.get(capture_id) is None:
+            return None
+        try:
+            with gzip.open(self._html_path(capture_id), "rt", encoding="utf-8") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def flush(self, timeout=None):
+        """Wait until queued captures are written (best effort with a timeout)."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if deadline is not None and time.monotonic() > deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def stats(self):
+        with self._lock:
+            return {
+                "count": len(self._index),
+                "bytes": self.bytes,
+                "queued": self._queue.qsize(),
+                "captured": self.captured,
+                "sampled_out": self.sampled_out,
+                "dropped": self.dropped,
+                "evicted": self.evicted,
+            }
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_capture_store():
+    """Return the process-wide capture store."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = CaptureStore()
+            atexit.register(_store.flush, 5)
+        return _store
+
+
+def capture_html(platform, identifier, html, reason=None, url=None):
+    """Capture already-fetched HTML if enabled and sampled; returns the id or None."""
+    if not config.CAPTURE_ENABLED:
+        return None
+    store = get_capture_store()
+    if not store.sample():
+        return None
+    return store.add(platform, identifier, html, reason=reason, url=url)
+
+
+async def read_page(page):
+    """Read a failed page's ``(html, url)`` to capture once the scrape gives up.
+
+    Returns None when captures are disabled or the page can't be read.
+    """
+    if not config.CAPTURE_ENABLED:
+        return None
+    try:
+        return await page.content(), page.url
+    except Exception as e:
+        logger.warning("Could not read page for capture: %s", e)
+        return None
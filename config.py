@@ -0,0 +1,147 @@
+import os
+
+
+def env_int(name, default):
+    """Read an integer setting from the environment."""
+    return int(os.environ.get(name, default))
+
+
+def env_float(name, default):
+    """Read a float setting from the environment."""
+    return float(os.environ.get(name, default))
+
+
+def env_bool(name, default):
+    """Read a boolean setting ("1", "true", "yes", "on") from the environment."""
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def env_list(name, default=None):
+    """Read a comma separated setting from the environment."""
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+# Target sites (overridden by the benchmark's local fixture server)
+INSTAGRAM_BASE_URL = os.environ.get("INSTAGRAM_BASE_URL", "https://www.instagram.com").rstrip("/")
+TIKTOK_BASE_URL = os.environ.get("TIKTOK_BASE_URL", "https://www.tiktok.com").rstrip("/")
+
+# Browser pool
+BROWSER_POOL_SIZE = env_int("BROWSER_POOL_SIZE", 2)
+BROWSER_MAX_PAGES = env_int("BROWSER_MAX_PAGES", 4)
+BROWSER_LEASE_TIMEOUT = env_float("BROWSER_LEASE_TIMEOUT", 120)
+BROWSER_HEALTH_INTERVAL = env_float("BROWSER_HEALTH_INTERVAL", 30)
+CONTEXT_MAX_USES = env_int("CONTEXT_MAX_USES", 50)
+CONTEXT_MAX_AGE = env_float("CONTEXT_MAX_AGE", 600)
+# Reel pages are tabs sharing one context, up to this many per context
+REEL_TABS_PER_CONTEXT = env_int("REEL_TABS_PER_CONTEXT", 4)
+BROWSER_MAX_AGE = env_float("BROWSER_MAX_AGE", 6 * 3600)
+BROWSER_MAX_RSS_MB = env_int("BROWSER_MAX_RSS_MB", 1024)
+
+# Request blocking (per-platform overrides: INSTAGRAM_BLOCK_RESOURCE_TYPES,
+# INSTAGRAM_BLOCK_URL_PATTERNS, TIKTOK_BLOCK_RESOURCE_TYPES, ...)
+BLOCK_REQUESTS = env_bool("BLOCK_REQUESTS", True)
+
+# Early-exit waits: how long to wait for the extractor's target before
+# falling back to networkidle / fixed sleeps
+WAIT_MAX_MS = env_int("WAIT_MAX_MS", 20000)
+WAIT_POLL_MS = env_int("WAIT_POLL_MS", 100)
+
+# Browserless fast path for Instagram meta tags
+FAST_PATH_ENABLED = env_bool("FAST_PATH_ENABLED", True)
+FAST_PATH_TIMEOUT = env_float("FAST_PATH_TIMEOUT", 10)
+FAST_PATH_POOL_SIZE = env_int("FAST_PATH_POOL_SIZE", 20)
+
+# Result cache (seconds)
+CACHE_MAX_ENTRIES = env_int("CACHE_MAX_ENTRIES", 10000)
+CACHE_TTL_PROFILE = env_float("CACHE_TTL_PROFILE", 300)
+CACHE_TTL_REEL = env_float("CACHE_TTL_REEL", 300)
+CACHE_TTL_TIKTOK = env_float("CACHE_TTL_TIKTOK", 300)
+CACHE_NEGATIVE_TTL = env_float("CACHE_NEGATIVE_TTL", 30)
+CACHE_STALE_TTL = env_float("CACHE_STALE_TTL", 3600)
+CACHE_SERVE_STALE = env_bool("CACHE_SERVE_STALE", True)
+CACHE_REFRESH_WORKERS = env_int("CACHE_REFRESH_WORKERS", 2)
+# Results shared by all worker processes on the host through one SQLite file
+CACHE_SHARED_ENABLED = env_bool("CACHE_SHARED_ENABLED", True)
+CACHE_SHARED_PATH = os.environ.get("CACHE_SHARED_PATH", "result_cache.db")
+CACHE_SHARED_CLEANUP_INTERVAL = env_float("CACHE_SHARED_CLEANUP_INTERVAL", 60)
+CACHE_SHARED_CLAIM_SECONDS = env_float("CACHE_SHARED_CLAIM_SECONDS", 90)
+
+# Response compression (brotli is used when the brotli package is installed)
+COMPRESS_ENABLED = env_bool("COMPRESS_ENABLED", True)
+COMPRESS_MIN_BYTES = env_int("COMPRESS_MIN_BYTES", 1024)
+COMPRESS_GZIP_LEVEL = env_int("COMPRESS_GZIP_LEVEL", 6)
+COMPRESS_BROTLI_QUALITY = env_int("COMPRESS_BROTLI_QUALITY", 4)
+
+# Batch endpoints
+BATCH_MAX_ITEMS = env_int("BATCH_MAX_ITEMS", 5000)
+BATCH_DEFAULT_CONCURRENCY = env_int("BATCH_DEFAULT_CONCURRENCY", 4)
+BATCH_MAX_CONCURRENCY = env_int("BATCH_MAX_CONCURRENCY", 16)
+
+# Background job queue
+JOB_DB_PATH = os.environ.get("JOB_DB_PATH", "jobs.db")
+JOB_WORKERS = env_int("JOB_WORKERS", 2)
+JOB_POLL_INTERVAL = env_float("JOB_POLL_INTERVAL", 1)
+JOB_RUN_TIMEOUT = env_float("JOB_RUN_TIMEOUT", 600)
+JOB_MAX_ATTEMPTS = env_int("JOB_MAX_ATTEMPTS", 3)
+JOB_AUTOSTART = env_bool("JOB_AUTOSTART", True)
+
+# Retries and circuit breaking (per platform)
+RETRY_ATTEMPTS = env_int("RETRY_ATTEMPTS", 2)
+RETRY_BASE_DELAY = env_float("RETRY_BASE_DELAY", 1)
+RETRY_MAX_DELAY = env_float("RETRY_MAX_DELAY", 10)
+RETRY_BUDGET_RATIO = env_float("RETRY_BUDGET_RATIO", 0.2)
+RETRY_BUDGET_MAX = env_float("RETRY_BUDGET_MAX", 10)
+BREAKER_FAILURE_RATE = env_float("BREAKER_FAILURE_RATE", 0.5)
+BREAKER_WINDOW = env_int("BREAKER_WINDOW", 20)
+BREAKER_MIN_CALLS = env_int("BREAKER_MIN_CALLS", 10)
+BREAKER_OPEN_SECONDS = env_float("BREAKER_OPEN_SECONDS", 60)
+
+# Per-platform rate limiting (overrides: INSTAGRAM_RATE_LIMIT_RPS,
+# TIKTOK_MAX_CONCURRENCY, ...; also adjustable at runtime via /api/limits)
+RATE_LIMIT_ENABLED = env_bool("RATE_LIMIT_ENABLED", True)
+RATE_LIMIT_RPS = env_float("RATE_LIMIT_RPS", 2)
+RATE_LIMIT_BURST = env_float("RATE_LIMIT_BURST", 5)
+RATE_LIMIT_CONCURRENCY = env_int("RATE_LIMIT_CONCURRENCY", 8)
+RATE_LIMIT_MIN_RPS = env_float("RATE_LIMIT_MIN_RPS", 0.2)
+RATE_LIMIT_MAX_RPS = env_float("RATE_LIMIT_MAX_RPS", 10)
+RATE_LIMIT_ADAPTIVE = env_bool("RATE_LIMIT_ADAPTIVE", True)
+RATE_LIMIT_WINDOW = env_int("RATE_LIMIT_WINDOW", 10)
+
+# Failure captures (gzipped HTML of pages that could not be parsed)
+CAPTURE_ENABLED = env_bool("CAPTURE_ENABLED", True)
+CAPTURE_DIR = os.environ.get("CAPTURE_DIR", "captures")
+CAPTURE_MAX_COUNT = env_int("CAPTURE_MAX_COUNT", 200)
+CAPTURE_MAX_MB = env_float("CAPTURE_MAX_MB", 50)
+CAPTURE_SAMPLE_RATE = env_float("CAPTURE_SAMPLE_RATE", 1.0)
+CAPTURE_QUEUE_SIZE = env_int("CAPTURE_QUEUE_SIZE", 100)
+
+# Startup
+BROWSER_PRELAUNCH = env_bool("BROWSER_PRELAUNCH", False)
+WARM_UP_PAGES = env_int("WARM_UP_PAGES", 0)  # per platform; 0 means one per browser
+SWAGGER_ENABLED = env_bool("SWAGGER_ENABLED", True)
+
+# Snapshot history (successful scrape results)
+SNAPSHOT_ENABLED = env_bool("SNAPSHOT_ENABLED", True)
+SNAPSHOT_DB_PATH = os.environ.get("SNAPSHOT_DB_PATH", "snapshots.db")
+SNAPSHOT_BATCH_SIZE = env_int("SNAPSHOT_BATCH_SIZE", 100)
+SNAPSHOT_FLUSH_INTERVAL = env_float("SNAPSHOT_FLUSH_INTERVAL", 1)
+SNAPSHOT_QUEUE_SIZE = env_int("SNAPSHOT_QUEUE_SIZE", 10000)
+
+# Watchlist refresh scheduler (seconds)
+WATCHLIST_DB_PATH = os.environ.get("WATCHLIST_DB_PATH", "watchlist.db")
+WATCHLIST_AUTOSTART = env_bool("WATCHLIST_AUTOSTART", True)
+WATCHLIST_INTERVAL = env_float("WATCHLIST_INTERVAL", 3600)
+WATCHLIST_MIN_INTERVAL = env_float("WATCHLIST_MIN_INTERVAL", 300)
+WATCHLIST_MAX_INTERVAL = env_float("WATCHLIST_MAX_INTERVAL", 86400)
+WATCHLIST_CHANGE_THRESHOLD = env_float("WATCHLIST_CHANGE_THRESHOLD", 0.01)
+WATCHLIST_MAX_RPS = env_float("WATCHLIST_MAX_RPS", 0.5)
+WATCHLIST_CONCURRENCY = env_int("WATCHLIST_CONCURRENCY", 2)
+WATCHLIST_POLL_INTERVAL = env_float("WATCHLIST_POLL_INTERVAL", 1)
+# Seconds before a refresh left unfinished by a dead worker is claimed again
+WATCHLIST_LEASE_SECONDS = env_float("WATCHLIST_LEASE_SECONDS", 600)
@@ -0,0 +1,346 @@
+"""Pure extraction functions shared by the scrapers and ``reextract.py``.
+
+Nothing here touches a browser, the network or process-wide state, so the
+same code runs on live pages, in the fast path and in worker processes
+over saved HTML.
+"""
+import html
+import json
+import re
+from datetime import datetime
+from urllib.parse import urlsplit
+
+PROFILE_META_KEYS = ("og:description", "description")
+PROFILE_PATTERN = re.compile(r"(\d[\d,.MK]*)\s*Followers,\s*(\d[\d,.MK]*)\s*Following,\s*(\d[\d,.MK]*)\s*Posts", re.IGNORECASE)
+REEL_META_KEYS = ("og:description",)
+REEL_PATTERN = re.compile(r"([\d,.MK]+)\s*likes,\s*([\d,.MK]+)\s*comments\s*-\s*\w+\s*on\s*([A-Za-z]+\s*\d{1,2},\s*\d{4}|\d{1,2}\s*[A-Za-z]+\s*\d{4})", re.IGNORECASE)
+
+# Embedded TikTok state blobs, newest layout first
+TIKTOK_STATE_SCRIPT_IDS = ("__UNIVERSAL_DATA_FOR_REHYDRATION__", "SIGI_STATE")
+# Elements the TikTok DOM parsers need, by data-e2e attribute
+_TIKTOK_TAGS = {
+    "followers": "followers-count",
+    "following": "following-count",
+    "likes": "likes-count",
+    "bio": "user-bio",
+    "link": "user-link",
+}
+_TIKTOK_E2E = frozenset(_TIKTOK_TAGS.values())
+
+# /reel/, /reels/, /p/ and /tv/ URLs all name a post by its shortcode
+_REEL_PATH_RE = re.compile(r"/(?:reels?|p|tv)/([A-Za-z0-9_-]+)")
+_SHORTCODE_RE = re.compile(r"^[A-Za-z0-9_-]+$")
+
+_META_TAG_RE = re.compile(r"<meta\b[^>]*>", re.IGNORECASE)
+_ATTR_RE = re.compile(r"""([\w:-]+)\s*=\s*(?:"([^"]*)"|'([^']*)')""")
+
+
+# -- Instagram ---------------------------------------------------------------
+
+def parse_number(text):
+    """Convert formatted number (e.g., '1.2M', '1,234') to integer."""
+    text = text.replace(',', '')
+    if 'M' in text:
+        return int(float(text.replace('M', '')) * 1_000_000)
+    elif 'K' in text:
+        return int(float(text.replace('K', '')) * 1_000)
+    return int(text)
+
+def parse_date(date_str):
+    """Parse date string (e.g., 'June 6, 2025' or '6 June 2025') to YYYY-MM-DD."""
+    try:
+        return datetime.strptime(date_str, "%B %d, %Y").strftime("%Y-%m-%d")
+    except ValueError:
+        try:
+            return datetime.strptime(date_str, "%d %B %Y").strftime("%Y-%m-%d")
+        except ValueError as e:
+            print(f"Date parsing error: {e}")
+            return None
+
+def meta_contents(page_html, keys):
+    """Yield the ``content`` of <meta> tags whose property or name is in ``keys``.
+
+    Only the document head is scanned, in document order.
+    """
+    head_end = page_html.find("</head>")
+    if head_end != -1:
+        page_html = page_html[:head_end]
+    for tag in _META_TAG_RE.findall(page_html):
+        attrs = {m.group(1).lower(): m.group(2) if m.group(2) is not None else m.group(3)
+                 for m in _ATTR_RE.finditer(tag)}
+        if (attrs.get("property") in keys or attrs.get("name") in keys) and attrs.get("content"):
+            yield html.unescape(attrs["content"])
+
+def reel_shortcode(reel_url):
+    """Shortcode of a reel or post URL in any of its forms, or None.
+
+    Query strings (``?igsh=...``), fragments and a missing trailing slash
+    are ignored; a bare shortcode is returned as is.
+    """
+    reel_url = reel_url.strip()
+    match = _REEL_PATH_RE.search(urlsplit(reel_url).path)
+    if match:
+        return match.group(1)
+    if _SHORTCODE_RE.match(reel_url):
+        return reel_url
+    return None
+
+def extract_profile_stats(content):
+    """Extract Followers/Following/Posts from a profile meta description, or None."""
+    match = PROFILE_PATTERN.search(content)
+    if not match:
+        return None
+    return {
+        "Followers": parse_number(match.group(1)),
+        "Following": parse_number(match.group(2)),
+        "Posts": parse_number(match.group(3)),
+    }
+
+def extract_reel_stats(content):
+    """Extract Likes/Comments/Upload_Date from a reel meta description, or None."""
+    match = REEL_PATTERN.search(content)
+    if not match:
+        return None
+    return {
+        "Likes": parse_number(match.group(1)),
+        "Comments": parse_number(match.group(2)),
+        "Upload_Date": parse_date(match.group(3)),
+    }
+
+def profile_stats_from_html(page_html):
+    """Profile stats from the meta tags of a whole page, or None."""
+    for content in meta_contents(page_html, PROFILE_META_KEYS):
+        stats = extract_profile_stats(content)
+        if stats:
+            return stats
+    return None
+
+def reel_stats_from_html(page_html):
+    """Reel stats from the meta tags of a whole page, or None."""
+    for content in meta_contents(page_html, REEL_META_KEYS):
+        stats = extract_reel_stats(content)
+        if stats:
+            return stats
+    return None
+
+
+# -- TikTok ------------------------------------------------------------------
+
+def format_number(number_str):
+    number_str = number_str.upper().strip()
+    if 'M' in number_str:
+        return int(float(number_str.replace('M', '')) * 1_000_000)
+    elif 'K' in number_str:
+        return int(float(number_str.replace('K', '')) * 1_000)
+    return int(number_str.replace(',', ''))
+
+def script_text(html_content, script_id):
+    """Return the text of ``<script id=script_id>`` without parsing the page, or None."""
+    marker = html_content.find(f'id="{script_id}"')
+    if marker == -1:
+        return None
+    start = html_content.find(">", marker) + 1
+    end = html_content.find("</script>", start)
+    if start == 0 or end == -1:
+        return None
+    return html_content[start:end]
+
+def profile_from_state(state):
+    """Build a profile from TikTok's embedded state JSON, or return {}."""
+    if "__DEFAULT_SCOPE__" in state:
+        detail = state["__DEFAULT_SCOPE__"].get("webapp.user-detail") or {}
+        info = detail.get("userInfo") or {}
+        user, stats = info.get("user") or {}, info.get("stats") or {}
+    else:
+        # Older SIGI_STATE layout, keyed by username
+        users = (state.get("UserModule") or {}).get("users") or {}
+        if not users:
+            return {}
+        username = next(iter(users))
+        user = users[username]
+        stats = state["UserModule"].get("stats", {}).get(username) or {}
+    if "followerCount" not in stats:
+        return {}
+    link = user.get("bioLink") or {}
+    return {
+        "name": user.get("nickname", ""),
+        "followers": stats["followerCount"],
+        "following": stats.get("followingCount", 0),
+        "likes": stats.get("heartCount", stats.get("heart", 0)),
+        "bio": user.get("signature", ""),
+        "link": link.get("link", "") if isinstance(link, dict) else "",
+        "videos": stats.get("videoCount", 0),
+        "verified": bool(user.get("verified")),
+        "private": bool(user.get("privateAccount")),
+    }
+
+def profile_from_state_text(text):
+    """Decode a state script's text and build a profile, or return {}."""
+    try:
+        return profile_from_state(json.loads(text))
+    except (ValueError, AttributeError, TypeError):
+        return {}
+
+def parse_profile_state(html_content):
+    """Read the profile from the embedded state script; the fastest method."""
+    for script_id in TIKTOK_STATE_SCRIPT_IDS:
+        text = script_text(html_content, script_id)
+        result = profile_from_state_text(text) if text else {}
+        if result:
+            return result
+    return {}
+
+class _TikTokTarget:
+    """lxml parser target that keeps only the text of the profile elements and the title.
+
+    Text is split into nodes at element boundaries and joined like
+    BeautifulSoup's ``get_text(separator=" ", strip=True)``, so both DOM
+    parsers read ``hi<br>there`` as "hi there".
+    """
+
+    def __init__(self):
+        self.texts = {}
+        self.link = ""
+        self._open = []  # [name, depth] of elements whose text is being collected
+
+    def _boundary(self):
+        for name, _ in self._open:
+            self.texts[name].append(None)
+
+    def start(self, tag, attrib):
+        self._boundary()
+        for item in self._open:
+            item[1] += 1
+        name = attrib.get("data-e2e")
+        if name in _TIKTOK_E2E and name not in self.texts:
+            self.texts[name] = []
+            self._open.append([name, 1])
+            if name == "user-link":
+                self.link = attrib.get("href", "")
+        elif tag == "title" and "title" not in self.texts:
+            self.texts["title"] = []
+            self._open.append(["title", 1])
+
+    def end(self, tag):
+        for item in self._open:
+            item[1] -= 1
+        self._open = [item for item in self._open if item[1] > 0]
+        self._boundary()
+
+    def data(self, data):
+        for name, _ in self._open:
+            self.texts[name].append(data)
+
+    def close(self):
+        return {name: _join_text_nodes(parts) for name, parts in self.texts.items()}
+
+
+def _join_text_nodes(parts):
+    nodes, node = [], []
+    for part in parts + [None]:
+        if part is None:
+            text = "".join(node).strip()
+            if text:
+                nodes.append(text)
+            node = []
+        else:
+            node.append(part)
+    return " ".join(nodes)
+
+
+def parse_profile_lxml(html_content):
+    """Read the profile from the rendered DOM with lxml, or return None if it is not installed.
+
+    lxml streams the page into a parser target that only keeps the text of
+    the few elements read, so no document tree is built.
+    """
+    try:
+        from lxml import etree
+    except ImportError:
+        return None
+
+    target = _TikTokTarget()
+    parser = etree.HTMLParser(target=target)
+    parser.feed(html_content)
+    texts = parser.close()
+    if not all(e2e in texts for e2e in ("followers-count", "following-count", "likes-count")):
+        return {}
+    return {
+        "followers": format_number(texts["followers-count"]),
+        "following": format_number(texts["following-count"]),
+        "likes": format_number(texts["likes-count"]),
+        "bio": texts.get("user-bio", ""),
+        "link": target.link,
+        "name": texts.get("title", "").replace(" on TikTok", "").strip(),
+    }
+
+def parse_profile_soup(html_content):
+    # Imported here so workers that never parse TikTok pages boot faster
+    from bs4 import BeautifulSoup, SoupStrainer
+
+    result = {}
+    # Only build the few elements we read instead of the whole document
+    soup = BeautifulSoup(html_content, "html.parser", parse_only=SoupStrainer(["title", "strong", "h2", "a"]))
+
+    # Get follower/following/likes using data-e2e attributes
+    followers_tag = soup.find("strong", {"data-e2e": "followers-count"})
+    following_tag = soup.find("strong", {"data-e2e": "following-count"})
+    likes_tag = soup.find("strong", {"data-e2e": "likes-count"})
+    bio_tag = soup.find("h2", {"data-e2e": "user-bio"})
+    link_tag = soup.find("a", {"data-e2e": "user-link"})
+
+    if followers_tag and following_tag and likes_tag:
+        result["followers"] = format_number(followers_tag.text)
+        result["following"] = format_number(following_tag.text)
+        result["likes"] = format_number(likes_tag.text)
+        result["bio"] = bio_tag.get_text(separator=" ", strip=True) if bio_tag else ""
+        result["link"] = link_tag["href"] if link_tag and link_tag.has_attr("href") else ""
+        result["name"] = soup.title.string.replace(" on TikTok", "").strip() if soup.title else ""
+    return result
+
+def parse_tiktok_profile(html_content):
+    """Extract a profile as ``(result, method)``, trying the state JSON, then lxml, then BeautifulSoup.
+
+    ``method`` is "state", "lxml", "soup" or "none" when nothing was found.
+    """
+    result = parse_profile_state(html_content)
+    if result:
+        return result, "state"
+    result = parse_profile_lxml(html_content)
+    method = "lxml"
+    if result is None:
+        result = parse_profile_soup(html_content)
+        method = "soup"
+    return result, method if result else "none"
+
+
+# -- any saved page ----------------------------------------------------------
+
+EXTRACT_KINDS = ("profile", "reel", "tiktok_profile")
+
+def guess_kind(page_html, url=None):
+    """Guess which extractor a saved page needs from its URL or content."""
+    if url:
+        if "tiktok.com" in url:
+            return "tiktok_profile"
+        if "/reel/" in url or "/p/" in url:
+            return "reel"
+        if "instagram.com" in url:
+            return "profile"
+    if any(f'id="{script_id}"' in page_html for script_id in TIKTOK_STATE_SCRIPT_IDS) or 'data-e2e="' in page_html:
+        return "tiktok_profile"
+    if reel_stats_from_html(page_html):
+        return "reel"
+    return "profile"
+
+def extract_page(page_html, kind=None, url=None):
+    """Run the right extractor over a saved page; returns ``(kind, data)`` with None data on no match."""
+    kind = kind or guess_kind(page_html, url)
+    if kind == "profile":
+        return kind, profile_stats_from_html(page_html)
+    if kind == "reel":
+        return kind, reel_stats_from_html(page_html)
+    if kind == "tiktok_profile":
+        result, _ = parse_tiktok_profile(page_html)
+        return kind, result or None
+    raise ValueError(f"Unknown kind: {kind}")
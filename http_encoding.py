@@ -0,0 +1,120 @@
+import gzip
+import hashlib
+import json
+
+from flask.json.provider import DefaultJSONProvider
+
+import config
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Only bodies of these types are worth compressing
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/plain", "text/html", "text/csv")
+
+
+def dumps_bytes(obj):
+    """Compact UTF-8 JSON, with orjson when it is installed."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+        except TypeError:
+            pass  # types orjson can't encode; let the stdlib raise or cope
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def dumps(obj):
+    return dumps_bytes(obj).decode("utf-8")
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider that encodes with orjson when available.
+
+    Output is compact and keys keep their insertion order, so identical
+    results always serialise to identical bytes (and ETags).
+    """
+
+    sort_keys = False
+    compact = True
+
+    def dumps(self, obj, **kwargs):
+        if orjson is None or kwargs:
+            kwargs.setdefault("sort_keys", self.sort_keys)
+            kwargs.setdefault("default", self.default)
+            return json.dumps(obj, separators=(",", ":"), ensure_ascii=False, **kwargs)
+        return dumps(obj)
+
+    def loads(self, s, **kwargs):
+        if orjson is None or kwargs:
+            return json.loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dumps_bytes(obj), mimetype=self.mimetype)
+
+
+def body_etag(body):
+    """Strong ETag value for a response body."""
+    return hashlib.blake2b(body, digest_size=12).hexdigest()
+
+
+def etag_matches(if_none_match, etag):
+    """True if an ``If-None-Match`` header value names ``etag`` in any content coding."""
+    if if_none_match.star_tag:
+        return True
+    return any(tag.split("-", 1)[0] == etag for tag in if_none_match.as_set(include_weak=True))
+
+
+def choose_encoding(accept_encodings):
+    """Pick br or gzip from the request's ``Accept-Encoding``, or None."""
+    if brotli is not None and accept_encodings["br"]:
+        return "br"
+    if accept_encodings["gzip"]:
+        return "gzip"
+    return None
+
+
+def representation_etag(etag, size, accept_encodings):
+    """ETag ``compress_response`` gives a ``size``-byte body with ``etag``, for 304 answers."""
+    encoding = choose_encoding(accept_encodings) if size >= config.COMPRESS_MIN_BYTES else None
+    return f"{etag}-{encoding}" if encoding else etag
+
+
+def compress(body, encoding):
+    if encoding == "br":
+        return brotli.compress(body, quality=config.COMPRESS_BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=config.COMPRESS_GZIP_LEVEL)
+
+
+def compress_response(response, accept_encodings):
+    """Compress a large buffered response in place if the client accepts it.
+
+    Streamed responses are left alone so results still arrive as they
+    finish. A strong ETag gets the coding appended, as each coding is a
+    different representation.
+    """
+    if (response.direct_passthrough or response.is_streamed or response.status_code != 200
+            or "Content-Encoding" in response.headers
+            or response.mimetype not in COMPRESSIBLE_TYPES):
+        return response
+    response.vary.add("Accept-Encoding")
+    encoding = choose_encoding(accept_encodings)
+    if encoding is None:
+        return response
+    body = response.get_data()
+    if len(body) < config.COMPRESS_MIN_BYTES:
+        return response
+    response.set_data(compress(body, encoding))
+    response.headers["Content-Encoding"] = encoding
+    etag, weak = response.get_etag()
+    if etag:
+        response.set_etag(f"{etag}-{encoding}", weak)
+    return response
@@ -0,0 +1,47 @@
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import config
+
+# Statuses that mean the platform is pushing back rather than a missing page
+BLOCK_STATUSES = (401, 403, 429)
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """Return the shared keep-alive HTTP session."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=config.FAST_PATH_POOL_SIZE)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = session
+        return _session
+
+
+def fetch_html(url, user_agent, limiter=None):
+    """Fetch server-rendered HTML, or return None if the request fails.
+
+    A block status (see ``BLOCK_STATUSES``) is reported to ``limiter``.
+    """
+    try:
+        response = get_session().get(
+            url,
+            headers={"User-Agent": user_agent, "Accept-Language": "en-US,en;q=0.9"},
+            timeout=config.FAST_PATH_TIMEOUT,
+        )
+    except requests.RequestException as e:
+        print(f"Fast path request failed for {url}: {e}")
+        return None
+    if response.status_code != 200:
+        print(f"Fast path got HTTP {response.status_code} for {url}")
+        if limiter is not None and response.status_code in BLOCK_STATUSES:
+            limiter.record(False, blocked=True)
+        return None
+    return response.text
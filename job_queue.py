@@ -0,0 +1,182 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+
+import config
+
+logger = logging.getLogger(__name__)
+
+JOB_TYPES = ("profile", "reel", "tiktok_profile")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    type TEXT NOT NULL,
+    identifier TEXT NOT NULL,
+    priority INTEGER NOT NULL DEFAULT 0,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_queue ON jobs (status, priority DESC, created_at);
+"""
+
+
+class JobQueue:
+    """Durable SQLite-backed scrape queue drained by a pool of worker threads.
+
+    Jobs are claimed highest priority first, then oldest first. Several
+    processes may share one database file; claims are serialized by SQLite.
+    """
+
+    def __init__(self, path=None, workers=None, runner=None):
+        self.path = path or config.JOB_DB_PATH
+        self.workers = workers or config.JOB_WORKERS
+        self.runner = runner
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._threads = []
+        self._stopping = False
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.executescript(_SCHEMA)
+
+    # -- producer side -------------------------------------------------------
+
+    def enqueue(self, job_type, identifier, priority=0):
+        """Persist a new job and return its id."""
+        if job_type not in JOB_TYPES:
+            raise ValueError(f"Unknown job type: {job_type}")
+        job_id = uuid.uuid4().hex
+        with self._wakeup:
+            self._conn.execute(
+                "INSERT INTO jobs (id, type, identifier, priority, status, created_at) VALUES (?, ?, ?, ?, 'queued', ?)",
+                (job_id, job_type, identifier, int(priority), time.time()),
+            )
+            self._wakeup.notify()
+        return job_id
+
+    def get(self, job_id):
+        """Return a job as a dict, or None if it doesn't exist."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, type, identifier, priority, status, attempts, result, error, created_at, started_at, finished_at "
+                "FROM jobs WHERE id = ?",
+                (job_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        keys = ("id", "type", "identifier", "priority", "status", "attempts", "result", "error",
+                "created_at", "started_at", "finished_at")
+        job = dict(zip(keys, row))
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def stats(self):
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return {"workers": len(self._threads), "jobs": dict(rows)}
+
+    # -- worker side ---------------------------------------------------------
+
+    def start(self):
+        """Start the worker threads (idempotent)."""
+        with self._lock:
+            if self._threads:
+                return
+            self._stopping = False
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._work, name=f"job-worker-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+        logger.info("Job queue started with %d workers", self.workers)
+
+    def stop(self, timeout=5):
+        with self._wakeup:
+            self._stopping = True
+            self._wakeup.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def _claim(self):
+        """Atomically mark the next runnable job as running and return it.
+
+        Runnable means queued, or left running past ``JOB_RUN_TIMEOUT`` by a
+        worker that died (possibly in another process sharing the database).
+        """
+        cutoff = time.time() - config.JOB_RUN_TIMEOUT
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._conn.execute(
+                "UPDATE jobs SET status = 'failed', error = 'Worker lost too many times', finished_at = ? "
+                "WHERE status = 'running' AND started_at < ? AND attempts >= ?",
+                (time.time(), cutoff, config.JOB_MAX_ATTEMPTS),
+            )
+            row = self._conn.execute(
+                "SELECT id, type, identifier FROM jobs "
+                "WHERE status = 'queued' OR (status = 'running' AND started_at < ?) "
+                "ORDER BY priority DESC, created_at LIMIT 1",
+                (cutoff,),
+            ).fetchone()
+            if row is not None:
+                self._conn.execute(
+                    "UPDATE jobs SET status = 'running', attempts = attempts + 1, started_at = ? WHERE id = ?",
+                    (time.time(), row[0]),
+                )
+            self._conn.execute("COMMIT")
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        return row
+
+    def _finish(self, job_id, data, error):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ? WHERE id = ?",
+                ("failed" if error else "done", json.dumps(data) if data is not None else None,
+                 error, time.time(), job_id),
+            )
+
+    def _work(self):
+        while True:
+            with self._wakeup:
+                job = None
+                while not self._stopping:
+                    try:
+                        job = self._claim()
+                    except sqlite3.Error as e:
+                        logger.error("Job claim failed: %s", e)
+                        job = None
+                    if job is not None:
+                        break
+                    self._wakeup.wait(config.JOB_POLL_INTERVAL)
+                if self._stopping:
+                    return
+            job_id, job_type, identifier = job
+            try:
+                data, error = self.runner(job_type, identifier)
+            except Exception as e:
+                data, error = None, f"Failed to scrape {identifier}: {e}"
+            self._finish(job_id, data, error)
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_queue(runner):
+    """Return the process-wide job queue (its workers are started separately)."""
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = JobQueue(runner=runner)
+        return _queue
@@ -0,0 +1,191 @@
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+# Latency buckets in seconds, from a cache hit up to a slow browser scrape
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60)
+
+_registry = []
+_registry_lock = threading.Lock()
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+        with _registry_lock:
+            _registry.append(self)
+
+    def _key(self, labels):
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}")
+        return tuple(str(label) for label in labels)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+            lines.extend(self._samples(items))
+        return "\n".join(lines)
+
+    def _samples(self, items):
+        for labels, value in items:
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labels, amount=1):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, *labels, value):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+
+    def observe(self, *labels, value):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state["counts"][i] += 1
+                    break
+            state["sum"] += value
+            state["count"] += 1
+
+    def snapshot(self):
+        """Return ``{labels: {"count", "sum"}}`` for every label set."""
+        with self._lock:
+            return {labels: {"count": state["count"], "sum": state["sum"]} for labels, state in self._values.items()}
+
+    def _samples(self, items):
+        for labels, state in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, state["counts"]):
+                cumulative += count
+                le = _format_labels(self.labelnames, labels, [("le", _format_value(bound))])
+                yield f"{self.name}_bucket{le} {cumulative}"
+            label_text = _format_labels(self.labelnames, labels)
+            yield f"{self.name}_sum{label_text} {state['sum']!r}"
+            yield f"{self.name}_count{label_text} {state['count']}"
+
+
+def render():
+    """Return every registered metric in the Prometheus text format."""
+    with _registry_lock:
+        metrics = list(_registry)
+    return "\n".join(metric.render() for metric in metrics) + "\n"
+
+
+PHASE_SECONDS = Histogram(
+    "scrape_phase_seconds", "Time spent in each phase of a scrape", ("platform", "phase"))
+SCRAPE_RESULTS = Counter(
+    "scrape_results_total", "Scrapes executed (cache misses) by outcome", ("endpoint", "result"))
+SCRAPE_FAILURES = Counter(
+    "scrape_failures_total", "Failed scrape attempts by reason", ("platform", "reason"))
+SCRAPE_RETRIES = Counter(
+    "scrape_retries_total", "Scrape attempts retried after a failure", ("platform",))
+EXTRACTIONS = Counter(
+    "extractions_total", "Pages parsed by extraction method (none when nothing was found)", ("platform", "method"))
+CACHE_REQUESTS = Counter(
+    "cache_requests_total", "Result cache lookups by status", ("endpoint", "status"))
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "API request latency", ("endpoint", "status"))
+BROWSER_POOL = Gauge(
+    "browser_pool", "Browser pool counters and usage, as in /api/stats", ("stat",))
+RATE_LIMIT_RPS = Gauge(
+    "rate_limit_requests_per_second", "Current adaptive request rate", ("platform",))
+WATCHLIST = Gauge(
+    "watchlist", "Watchlist size, due queue depth, refreshes in flight and lag in seconds", ("stat",))
+BREAKER_OPEN = Gauge(
+    "circuit_breaker_open", "1 while the platform's circuit breaker rejects scrapes", ("platform",))
+
+
+class Timings:
+    """Per-request phase durations, summed when a phase repeats (retries)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.phases = {}
+
+    def add(self, phase, seconds):
+        with self._lock:
+            self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+    def server_timing(self):
+        """Format as a ``Server-Timing`` header value (milliseconds)."""
+        with self._lock:
+            return ", ".join(f"{phase};dur={seconds * 1000:.1f}" for phase, seconds in self.phases.items())
+
+
+_current_timings = contextvars.ContextVar("timings", default=None)
+
+
+def start_timings():
+    """Collect spans for the current request; returns the Timings object.
+
+    Coroutines handed to the browser pool inherit the caller's context, so
+    spans recorded on the pool loop land here too.
+    """
+    timings = Timings()
+    _current_timings.set(timings)
+    return timings
+
+
+def current_timings():
+    return _current_timings.get()
+
+
+@contextmanager
+def span(platform, phase):
+    """Time a block into ``scrape_phase_seconds`` and the request's timings."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        PHASE_SECONDS.observe(platform, phase, value=elapsed)
+        timings = _current_timings.get()
+        if timings is not None:
+            timings.add(f"{platform}.{phase}", elapsed)
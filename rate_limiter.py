@@ -0,0 +1,257 @@
+import asyncio
+import logging
+import math
+import threading
+import time
+from collections import deque
+
+import config
+from metrics import span
+
+logger = logging.getLogger(__name__)
+
+# Settings that can be changed at runtime through ``configure()``
+SETTINGS = ("rate", "burst", "max_concurrency", "min_rate", "max_rate", "adaptive")
+
+
+class PlatformLimiter:
+    """Token bucket plus concurrency cap for one target platform.
+
+    ``rate`` adapts to outcomes: it is cut by ``decrease`` when at least
+    ``slow_down_at`` of the last ``window`` outcomes failed (or at once on an
+    explicit block) and raised by ``increase`` when at most ``speed_up_at``
+    failed, staying within ``min_rate``..``max_rate``. Safe to use from any
+    thread or event loop.
+    """
+
+    def __init__(self, platform, rate, burst, max_concurrency, min_rate, max_rate, adaptive=True,
+                 window=None, slow_down_at=0.3, speed_up_at=0.05, decrease=0.5, increase=1.2):
+        self.platform = platform
+        self._lock = threading.Lock()
+        self._waiters = deque()
+        self._outcomes = deque(maxlen=window or config.RATE_LIMIT_WINDOW)
+        self.slow_down_at = slow_down_at
+        self.speed_up_at = speed_up_at
+        self.decrease = decrease
+        self.increase = increase
+        self.rate = rate
+        self.burst = burst
+        self.max_concurrency = max_concurrency
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.adaptive = adaptive
+        self.tokens = float(burst)
+        self._refilled_at = time.monotonic()
+        self.active = 0
+        self.pending = 0
+        self.acquired = 0
+        self.wait_seconds = 0.0
+        self.slowdowns = 0
+        self.speedups = 0
+
+    def configure(self, **settings):
+        """Change settings in place; raises ValueError for unknown or invalid ones."""
+        unknown = set(settings) - set(SETTINGS)
+        if unknown:
+            raise ValueError(f"Unknown setting(s): {', '.join(sorted(unknown))}")
+        with self._lock:
+            values = {name: getattr(self, name) for name in SETTINGS}
+            for name, value in settings.items():
+                if name == "adaptive":
+                    if not isinstance(value, bool):
+                        raise ValueError("adaptive must be true or false")
+                    values[name] = value
+                    continue
+                if isinstance(value, bool):
+                    raise ValueError(f"{name} must be a number")
+                values[name] = float(value)
+                if not math.isfinite(values[name]):
+                    raise ValueError(f"{name} must be a finite number")
+            if not float(values["max_concurrency"]).is_integer() or values["max_concurrency"] < 1:
+                raise ValueError("max_concurrency must be a whole number of at least 1")
+            if min(values["rate"], values["burst"], values["min_rate"]) <= 0:
+                raise ValueError("rate, burst and min_rate must be positive")
+            if values["min_rate"] > values["max_rate"]:
+                raise ValueError("min_rate must not exceed max_rate")
+            self._refill(time.monotonic())
+            self.burst = values["burst"]
+            self.max_concurrency = int(values["max_concurrency"])
+            self.min_rate = values["min_rate"]
+            self.max_rate = values["max_rate"]
+            self.rate = min(self.max_rate, max(self.min_rate, values["rate"]))
+            self.adaptive = values["adaptive"]
+            self.tokens = min(self.tokens, self.burst)
+            self._outcomes.clear()
+        self._wake_waiters()
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self._refilled_at) * self.rate)
+        self._refilled_at = now
+
+    async def acquire(self):
+        """Wait for a concurrency slot and a token; pair with ``release()``."""
+        started = time.monotonic()
+        with self._lock:
+            self.pending += 1
+        try:
+            await self._acquire_slot()
+            try:
+                while True:
+                    with self._lock:
+                        self._refill(time.monotonic())
+                        if self.tokens >= 1:
+                            self.tokens -= 1
+                            self.acquired += 1
+                            self.wait_seconds += time.monotonic() - started
+                            return
+                        delay = (1 - self.tokens) / self.rate
+                    await asyncio.sleep(delay)
+            except BaseException:
+                self.release()
+                raise
+        finally:
+            with self._lock:
+                self.pending -= 1
+
+    async def _acquire_slot(self):
+        """Take a concurrency slot, queueing first come first served when none is free."""
+        loop = asyncio.get_running_loop()
+        woken = False
+        while True:
+            with self._lock:
+                # New arrivals don't jump the queue; a woken waiter keeps its place
+                if self.active < self.max_concurrency and (woken or not self._waiters):
+                    self.active += 1
+                    return
+                waiter = loop.create_future()
+                if woken:
+                    self._waiters.appendleft((loop, waiter))
+                else:
+                    self._waiters.append((loop, waiter))
+            try:
+                await waiter
+                woken = True
+            except asyncio.CancelledError:
+                with self._lock:
+                    if (loop, waiter) in self._waiters:
+                        self._waiters.remove((loop, waiter))
+                # Pass on a wake-up this waiter may have consumed
+                self._wake_waiters()
+                raise
+
+    def release(self):
+        with self._lock:
+            self.active -= 1
+        self._wake_waiters()
+
+    def _wake_waiters(self):
+        """Wake as many queued waiters, oldest first, as there are free slots."""
+        # Woken waiters re-check the cap, so waking one too many is harmless
+        with self._lock:
+            free = self.max_concurrency - self.active
+            woken = [self._waiters.popleft() for _ in range(min(free, len(self._waiters)))]
+        for loop, waiter in woken:
+            loop.call_soon_threadsafe(_resolve, waiter)
+
+    def waiting(self):
+        """Number of requests currently waiting for a slot or a token."""
+        with self._lock:
+            return self.pending
+
+    def slot(self):
+        """``async with limiter.slot():`` around one request to the platform."""
+        return _Slot(self)
+
+    def record(self, success, blocked=False):
+        """Feed back an outcome; ``blocked`` (e.g. HTTP 429) slows down at once."""
+        if not self.adaptive:
+            return
+        with self._lock:
+            self._outcomes.append(success)
+            failures = self._outcomes.count(False)
+            if blocked or (len(self._outcomes) == self._outcomes.maxlen
+                           and failures / len(self._outcomes) >= self.slow_down_at):
+                new_rate = max(self.min_rate, self.rate * self.decrease)
+                if new_rate < self.rate:
+                    self.slowdowns += 1
+                    logger.warning("Slowing %s down to %.2f requests/s", self.platform, new_rate)
+                self.rate = new_rate
+                self._outcomes.clear()
+            elif (len(self._outcomes) == self._outcomes.maxlen
+                  and failures / len(self._outcomes) <= self.speed_up_at):
+                new_rate = min(self.max_rate, self.rate * self.increase)
+                if new_rate > self.rate:
+                    self.speedups += 1
+                    logger.info("Speeding %s up to %.2f requests/s", self.platform, new_rate)
+                self.rate = new_rate
+                self._outcomes.clear()
+
+    def stats(self):
+        with self._lock:
+            self._refill(time.monotonic())
+            return {
+                "rate": round(self.rate, 3),
+                "burst": self.burst,
+                "tokens": round(self.tokens, 2),
+                "max_concurrency": self.max_concurrency,
+                "min_rate": self.min_rate,
+                "max_rate": self.max_rate,
+                "adaptive": self.adaptive,
+                "active": self.active,
+                "waiting": self.pending,
+                "acquired": self.acquired,
+                "avg_wait_ms": int(self.wait_seconds / self.acquired * 1000) if self.acquired else 0,
+                "recent_failures": self._outcomes.count(False),
+                "slowdowns": self.slowdowns,
+                "speedups": self.speedups,
+            }
+
+
+def _resolve(waiter):
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+class _Slot:
+    def __init__(self, limiter):
+        self.limiter = limiter
+
+    async def __aenter__(self):
+        if config.RATE_LIMIT_ENABLED:
+            with span(self.limiter.platform, "throttle"):
+                await self.limiter.acquire()
+            self.acquired = True
+        else:
+            self.acquired = False
+        return self.limiter
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if self.acquired:
+            self.limiter.release()
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(platform):
+    """Return the shared limiter for ``platform`` built from config."""
+    with _limiters_lock:
+        if platform not in _limiters:
+            prefix = platform.upper()
+            _limiters[platform] = PlatformLimiter(
+                platform,
+                rate=config.env_float(f"{prefix}_RATE_LIMIT_RPS", config.RATE_LIMIT_RPS),
+                burst=config.env_float(f"{prefix}_RATE_LIMIT_BURST", config.RATE_LIMIT_BURST),
+                max_concurrency=config.env_int(f"{prefix}_MAX_CONCURRENCY", config.RATE_LIMIT_CONCURRENCY),
+                min_rate=config.env_float(f"{prefix}_RATE_LIMIT_MIN_RPS", config.RATE_LIMIT_MIN_RPS),
+                max_rate=config.env_float(f"{prefix}_RATE_LIMIT_MAX_RPS", config.RATE_LIMIT_MAX_RPS),
+                adaptive=config.env_bool(f"{prefix}_RATE_LIMIT_ADAPTIVE", config.RATE_LIMIT_ADAPTIVE),
+            )
+        return _limiters[platform]
+
+
+def limiter_stats():
+    with _limiters_lock:
+        limiters = dict(_limiters)
+    return {platform: limiter.stats() for platform, limiter in limiters.items()}
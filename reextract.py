@@ -0,0 +1,202 @@
+"""Re-run the extractors over saved HTML pages without a browser.
+
+Reads a directory (``.html``, ``.htm`` and ``.html.gz`` files, including
+the failure captures in ``CAPTURE_DIR``) or a ``.zip``/``.tar[.gz]``
+archive. Pages are parsed in a process pool, one JSON line per page is
+written as it finishes and progress goes to stderr.
+
+    python reextract.py captures --output recovered.jsonl
+    python reextract.py pages.tar.gz --kind reel --workers 8
+
+Capture metadata sidecars (``<id>.json``) supply the identifier and URL;
+otherwise the identifier is the file name and the kind is guessed from
+the page.
+"""
+import argparse
+import gzip
+import json
+import os
+import sys
+import tarfile
+import time
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from extractors import EXTRACT_KINDS, extract_page
+
+PAGE_SUFFIXES = (".html", ".htm", ".html.gz", ".htm.gz")
+# Pages per task: large enough to amortise pickling, small enough to balance
+DEFAULT_CHUNK_SIZE = 64
+PROGRESS_INTERVAL = 0.5
+
+
+def _page_name(name):
+    base = os.path.basename(name)
+    for suffix in PAGE_SUFFIXES:
+        if base.endswith(suffix):
+            return base[:-len(suffix)]
+    return None
+
+
+def _decode(raw, name):
+    if name.endswith(".gz"):
+        raw = gzip.decompress(raw)
+    return raw.decode("utf-8", errors="replace")
+
+
+def _load_sidecar(path):
+    sidecar = os.path.join(os.path.dirname(path), _page_name(path) + ".json")
+    try:
+        with open(sidecar, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def iter_directory(directory):
+    """Yield ``(source, meta)`` for every saved page under ``directory``; workers read the files."""
+    for root, _, files in os.walk(directory):
+        for filename in sorted(files):
+            if _page_name(filename) is not None:
+                path = os.path.join(root, filename)
+                yield path, _load_sidecar(path)
+
+
+def iter_archive(path):
+    """Yield ``(source, meta, html)`` for every saved page in a zip or tar archive."""
+    if zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as archive:
+            for name in archive.namelist():
+                if _page_name(name) is not None:
+                    yield name, {}, _decode(archive.read(name), name)
+        return
+    with tarfile.open(path) as archive:
+        for member in archive:
+            if member.isfile() and _page_name(member.name) is not None:
+                yield member.name, {}, _decode(archive.extractfile(member).read(), member.name)
+
+
+def count_pages(source):
+    """Number of pages in ``source``, or None for compressed tars (too slow to count twice)."""
+    if os.path.isdir(source):
+        return sum(1 for root, _, files in os.walk(source) for f in files if _page_name(f) is not None)
+    if zipfile.is_zipfile(source):
+        with zipfile.ZipFile(source) as archive:
+            return sum(1 for name in archive.namelist() if _page_name(name) is not None)
+    return None
+
+
+def extract_one(source, meta, page_html, kind=None):
+    """Extract one page into an output record."""
+    identifier = meta.get("identifier") or _page_name(source)
+    try:
+        if page_html is None:
+            with open(source, "rb") as f:
+                page_html = _decode(f.read(), source)
+        page_kind, data = extract_page(page_html, kind, meta.get("url"))
+    except Exception as e:
+        return {"source": source, "kind": kind, "identifier": identifier, "data": None,
+                "error": f"{type(e).__name__}: {e}"}
+    if data and page_kind == "profile":
+        data = {"ID": identifier, **data}
+    elif data and page_kind == "reel":
+        data = {"Reel_URL": meta.get("url") or identifier, **data}
+    return {"source": source, "kind": page_kind, "identifier": identifier, "data": data,
+            "error": None if data else "no data extracted"}
+
+
+def _extract_chunk(items, kind):
+    return [extract_one(source, meta, page_html, kind) for source, meta, page_html in items]
+
+
+def _chunks(items, size):
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def reextract(source, output, kind=None, workers=None, chunk_size=DEFAULT_CHUNK_SIZE, progress=None):
+    """Extract every page in ``source`` and write JSON lines to the file object ``output``.
+
+    At most ``2 * workers`` chunks are in flight, so memory stays flat on
+    archives of any size. ``progress(done, ok, total, elapsed)`` is called
+    at most every ``PROGRESS_INTERVAL`` seconds and once at the end.
+    Returns ``{"pages", "ok", "failed", "seconds"}``.
+    """
+    workers = workers or os.cpu_count() or 1
+    if os.path.isdir(source):
+        items = ((path, meta, None) for path, meta in iter_directory(source))
+    else:
+        items = iter_archive(source)
+    total = count_pages(source)
+    started = time.monotonic()
+    done = ok = 0
+    reported = started
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = set()
+        chunks = _chunks(items, chunk_size)
+        exhausted = False
+        while pending or not exhausted:
+            while not exhausted and len(pending) < workers * 2:
+                chunk = next(chunks, None)
+                if chunk is None:
+                    exhausted = True
+                else:
+                    pending.add(executor.submit(_extract_chunk, chunk, kind))
+            if not pending:
+                break
+            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                for record in future.result():
+                    output.write(json.dumps(record, separators=(",", ":")) + "\n")
+                    done += 1
+                    ok += record["data"] is not None
+            if progress and time.monotonic() - reported >= PROGRESS_INTERVAL:
+                reported = time.monotonic()
+                progress(done, ok, total, reported - started)
+    if progress:
+        progress(done, ok, total, time.monotonic() - started)
+    return {"pages": done, "ok": ok, "failed": done - ok, "seconds": round(time.monotonic() - started, 2)}
+
+
+def _print_progress(done, ok, total, elapsed):
+    rate = done / elapsed if elapsed > 0 else 0
+    of_total = f"/{total}" if total else ""
+    sys.stderr.write(f"\r{done}{of_total} pages, {ok} extracted, {rate:.0f} pages/s")
+    sys.stderr.flush()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("source", help="Directory or .zip/.tar[.gz] archive of saved pages")
+    parser.add_argument("--output", default="-", help="JSONL file to write (default: stdout)")
+    parser.add_argument("--kind", choices=EXTRACT_KINDS, help="Extractor to use instead of guessing per page")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="Pages per worker task")
+    parser.add_argument("--quiet", action="store_true", help="Don't show progress")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.source):
+        parser.error(f"{args.source} does not exist")
+    output = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    try:
+        summary = reextract(args.source, output, args.kind, args.workers, args.chunk_size,
+                            progress=None if args.quiet else _print_progress)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    if not args.quiet:
+        sys.stderr.write("\n")
+    rate = summary["pages"] / summary["seconds"] if summary["seconds"] else 0
+    sys.stderr.write(f"{summary['ok']} of {summary['pages']} pages extracted in {summary['seconds']}s "
+                     f"({rate:.0f} pages/s)\n")
+    return 0 if summary["pages"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
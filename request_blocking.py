@@ -0,0 +1,121 @@
+import re
+import threading
+
+import config
+
+# Extractors only read meta tags and a few text nodes, so anything that
+# renders pixels or phones home can be dropped.
+PLATFORM_DEFAULTS = {
+    "instagram": {
+        "resource_types": ["image", "media", "font", "stylesheet"],
+        "url_patterns": [
+            r"/logging_client_events",
+            r"graph\.instagram\.com/logging",
+            r"/ajax/bz",
+            r"connect\.facebook\.net",
+            r"google-analytics\.com",
+            r"doubleclick\.net",
+        ],
+    },
+    "tiktok": {
+        "resource_types": ["image", "media", "font", "stylesheet"],
+        "url_patterns": [
+            r"mon[\w-]*\.tiktokv?\.com",
+            r"mcs[\w-]*\.tiktokv?\.com",
+            r"/monitor_browser/collect",
+            r"analytics\.tiktok\.com",
+            r"google-analytics\.com",
+            r"googletagmanager\.com",
+            r"doubleclick\.net",
+        ],
+    },
+}
+
+
+class RequestBlocker:
+    """Abort unneeded requests on scrape pages via Playwright routing.
+
+    Counts blocked requests per resource type, plus the requests and bytes
+    (from ``Content-Length``) that were let through.
+    """
+
+    def __init__(self, platform, resource_types=None, url_patterns=None):
+        defaults = PLATFORM_DEFAULTS.get(platform, {"resource_types": [], "url_patterns": []})
+        self.platform = platform
+        self.resource_types = set(defaults["resource_types"] if resource_types is None else resource_types)
+        self.url_patterns = list(defaults["url_patterns"] if url_patterns is None else url_patterns)
+        self._url_re = re.compile("|".join(self.url_patterns)) if self.url_patterns else None
+        self._lock = threading.Lock()
+        self.blocked = 0
+        self.blocked_by_type = {}
+        self.allowed = 0
+        self.allowed_bytes = 0
+
+    def should_block(self, resource_type, url):
+        if resource_type == "document":
+            return False
+        if resource_type in self.resource_types:
+            return True
+        return bool(self._url_re and self._url_re.search(url))
+
+    async def install(self, page):
+        """Route every request of ``page`` through the blocklist."""
+        await page.route("**/*", self._handle)
+        page.on("response", self._on_response)
+
+    async def _handle(self, route):
+        request = route.request
+        if self.should_block(request.resource_type, request.url):
+            with self._lock:
+                self.blocked += 1
+                self.blocked_by_type[request.resource_type] = self.blocked_by_type.get(request.resource_type, 0) + 1
+            await route.abort()
+        else:
+            await route.continue_()
+
+    def _on_response(self, response):
+        length = response.headers.get("content-length")
+        with self._lock:
+            self.allowed += 1
+            if length and length.isdigit():
+                self.allowed_bytes += int(length)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "blocked_requests": self.blocked,
+                "blocked_by_type": dict(self.blocked_by_type),
+                "allowed_requests": self.allowed,
+                "allowed_bytes": self.allowed_bytes,
+            }
+
+
+_blockers = {}
+_blockers_lock = threading.Lock()
+
+
+def get_blocker(platform):
+    """Return the shared blocker for ``platform`` built from config."""
+    with _blockers_lock:
+        if platform not in _blockers:
+            prefix = platform.upper()
+            url_patterns = config.env_list(f"{prefix}_BLOCK_URL_PATTERNS")
+            if url_patterns is not None:
+                url_patterns = PLATFORM_DEFAULTS.get(platform, {}).get("url_patterns", []) + url_patterns
+            _blockers[platform] = RequestBlocker(
+                platform,
+                resource_types=config.env_list(f"{prefix}_BLOCK_RESOURCE_TYPES"),
+                url_patterns=url_patterns,
+            )
+        return _blockers[platform]
+
+
+async def install_blocking(page, platform):
+    """Apply the platform blocklist to ``page`` unless disabled in config."""
+    if config.BLOCK_REQUESTS:
+        await get_blocker(platform).install(page)
+
+
+def blocking_stats():
+    with _blockers_lock:
+        return {platform: blocker.stats() for platform, blocker in _blockers.items()}
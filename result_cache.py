@@ -0,0 +1,241 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import config
+from extractors import reel_shortcode
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_identifier(endpoint, identifier):
+    """Canonical form of a username or reel URL for keys and storage.
+
+    Reels are keyed by their (case-sensitive) shortcode, so every URL form
+    of the same reel shares one key; usernames are case-insensitive.
+    """
+    identifier = identifier.strip()
+    if endpoint == "reel":
+        return reel_shortcode(identifier) or identifier
+    return identifier.lstrip("@").lower()
+
+
+class CacheEntry:
+    def __init__(self, data, error, ttl, stored_at=None):
+        self.data = data
+        self.error = error
+        self.ttl = ttl
+        self.stored_at = stored_at or time.time()
+
+    @property
+    def age(self):
+        return time.time() - self.stored_at
+
+    def is_fresh(self, max_age=None):
+        limit = self.ttl if max_age is None else min(self.ttl, max_age)
+        return self.age < limit
+
+    def is_servable_stale(self, stale_ttl):
+        """Expired successful results may be served for ``stale_ttl`` more seconds."""
+        return self.error is None and bool(self.data) and self.age < self.ttl + stale_ttl
+
+
+class ResultCache:
+    """Thread-safe in-process TTL cache with an LRU size bound.
+
+    Stores ``(data, error)`` scrape results per key. Failed scrapes are kept
+    for ``negative_ttl`` seconds so a broken identifier can't be used to keep
+    browsers busy. Successful results stay around for ``stale_ttl`` seconds
+    past their TTL so they can be served stale while a background refresh
+    (at most one per key) fetches a new value.
+
+    With a ``shared`` store (see ``shared_cache.SharedCacheStore``) this
+    cache is a per-process front for results shared by all workers on the
+    host: misses and expired entries are looked up there, every result is
+    written through, and a miss claimed by another worker waits for its
+    result instead of scraping again.
+    """
+
+    def __init__(self, max_entries=None, ttls=None, negative_ttl=None, stale_ttl=None, shared=None):
+        self.max_entries = max_entries or config.CACHE_MAX_ENTRIES
+        self.ttls = ttls or {
+            "profile": config.CACHE_TTL_PROFILE,
+            "reel": config.CACHE_TTL_REEL,
+            "tiktok_profile": config.CACHE_TTL_TIKTOK,
+        }
+        self.negative_ttl = config.CACHE_NEGATIVE_TTL if negative_ttl is None else negative_ttl
+        self.stale_ttl = config.CACHE_STALE_TTL if stale_ttl is None else stale_ttl
+        self.shared = shared
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._refreshing = set()
+        self._executor = None
+        self.hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+        self.refreshes = 0
+        self.refresh_failures = 0
+        self.shared_hits = 0
+        self.shared_waits = 0
+
+    @staticmethod
+    def make_key(endpoint, identifier):
+        return f"{endpoint}:{normalize_identifier(endpoint, identifier)}"
+
+    def get(self, key, max_age=None):
+        """Return a fresh entry for ``key`` or None."""
+        entry = self.peek(key)
+        if entry is None or not entry.is_fresh(max_age):
+            return None
+        return entry
+
+    def peek(self, key):
+        """Return the entry for ``key`` whatever its age, or None.
+
+        An expired or missing local entry is replaced by a newer shared one.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+        if self.shared is not None and (entry is None or not entry.is_fresh()):
+            row = self.shared.get(key)
+            if row is not None and (entry is None or row[3] > entry.stored_at):
+                self.shared_hits += 1
+                entry = self._set_local(key, CacheEntry(*row))
+        return entry
+
+    def _set_local(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def set(self, key, data, error, ttl):
+        entry = self._set_local(key, CacheEntry(data, error, ttl))
+        if self.shared is not None:
+            # Failures are only worth keeping for their (negative) TTL
+            keep_for = ttl + self.stale_ttl if error is None and data else ttl
+            self.shared.put(key, data, error, ttl, entry.stored_at, keep_for)
+
+    def lookup(self, endpoint, identifier, fetch, max_age=None, allow_stale=False):
+        """Serve ``(data, error)`` from cache or call ``fetch()`` and store it.
+
+        ``max_age`` caps the acceptable entry age in seconds; 0 bypasses the
+        cache (the fresh result is still stored). With ``allow_stale`` an
+        expired successful entry is returned at once and refreshed in the
+        background. Returns ``((data, error), info)`` where info has
+        ``status`` (HIT, STALE or MISS), ``age`` and the entry's ``ttl``.
+        """
+        key = self.make_key(endpoint, identifier)
+        if max_age != 0:
+            entry = self.peek(key)
+            if entry is not None and entry.is_fresh(max_age):
+                self.hits += 1
+                return (entry.data, entry.error), {"status": "HIT", "age": entry.age, "ttl": entry.ttl}
+            if entry is not None and allow_stale and max_age is None and entry.is_servable_stale(self.stale_ttl):
+                self.stale_hits += 1
+                self.refresh(endpoint, identifier, fetch)
+                return (entry.data, entry.error), {"status": "STALE", "age": entry.age, "ttl": entry.ttl}
+
+        if self.shared is not None:
+            requested_at = time.time()
+            if not self.shared.claim(key):
+                # Another worker is scraping this key; share its result
+                self.shared_waits += 1
+                row = self.shared.wait_for(key, requested_at)
+                if row is not None:
+                    self.hits += 1
+                    entry = self._set_local(key, CacheEntry(*row))
+                    return (entry.data, entry.error), {"status": "HIT", "age": entry.age, "ttl": entry.ttl}
+
+        self.misses += 1
+        try:
+            data, error = fetch()
+        except BaseException:
+            if self.shared is not None:
+                self.shared.release(key)
+            raise
+        ttl = self._store(key, endpoint, data, error)
+        return (data, error), {"status": "MISS", "age": 0, "ttl": ttl}
+
+    def _store(self, key, endpoint, data, error):
+        """Store a fetched result and return the TTL it was given."""
+        ttl = self.negative_ttl if error or not data else self.ttls.get(endpoint, config.CACHE_TTL_PROFILE)
+        self.set(key, data, error, ttl)
+        return ttl
+
+    def refresh(self, endpoint, identifier, fetch):
+        """Queue a background refresh unless one is already queued for the key."""
+        key = self.make_key(endpoint, identifier)
+        with self._lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=config.CACHE_REFRESH_WORKERS, thread_name_prefix="cache-refresh"
+                )
+        self._executor.submit(self._run_refresh, key, endpoint, fetch)
+        return True
+
+    def _run_refresh(self, key, endpoint, fetch):
+        try:
+            if self.shared is not None and not self.shared.claim(key):
+                return  # another worker is refreshing it already
+            data, error = fetch()
+            if error or not data:
+                # Keep serving the last good value rather than caching the failure
+                self.refresh_failures += 1
+                if self.shared is not None:
+                    self.shared.release(key)
+                logger.warning("Background refresh of %s failed: %s", key, error)
+            else:
+                self.refreshes += 1
+                self._store(key, endpoint, data, error)
+        except Exception as e:
+            self.refresh_failures += 1
+            if self.shared is not None:
+                self.shared.release(key)
+            logger.error("Background refresh of %s raised: %s", key, e)
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def stats(self):
+        with self._lock:
+            size = len(self._entries)
+        return {
+            "entries": size,
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "refreshes": self.refreshes,
+            "refresh_failures": self.refresh_failures,
+            "refreshing": len(self._refreshing),
+            "shared_hits": self.shared_hits,
+            "shared_waits": self.shared_waits,
+            "shared": self.shared.stats() if self.shared is not None else None,
+        }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """Return the process-wide result cache."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            shared = None
+            if config.CACHE_SHARED_ENABLED:
+                from shared_cache import SharedCacheStore
+                shared = SharedCacheStore()
+            _cache = ResultCache(shared=shared)
+        return _cache
@@ -0,0 +1,226 @@
+import asyncio
+import logging
+import random
+import threading
+import time
+from collections import deque
+
+import config
+from metrics import SCRAPE_FAILURES, SCRAPE_RETRIES, span
+from rate_limiter import get_limiter
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of scraping while a platform's circuit breaker is open."""
+
+    def __init__(self, platform, retry_after):
+        self.platform = platform
+        self.retry_after = retry_after
+        super().__init__(f"{platform} is failing too often; scraping paused for {int(retry_after) + 1}s")
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter."""
+
+    def __init__(self, attempts=None, base_delay=None, max_delay=None):
+        self.attempts = attempts or config.RETRY_ATTEMPTS
+        self.base_delay = config.RETRY_BASE_DELAY if base_delay is None else base_delay
+        self.max_delay = config.RETRY_MAX_DELAY if max_delay is None else max_delay
+
+    def backoff(self, attempt):
+        """Seconds to wait after failed attempt number ``attempt`` (0-based)."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+
+class RetryBudget:
+    """Caps retries to a fraction of first attempts.
+
+    Every first attempt deposits ``ratio`` tokens (up to ``max_tokens``); every
+    retry spends one. During an outage the budget drains and callers stop
+    retrying instead of multiplying load.
+    """
+
+    def __init__(self, ratio=None, max_tokens=None):
+        self.ratio = config.RETRY_BUDGET_RATIO if ratio is None else ratio
+        self.max_tokens = config.RETRY_BUDGET_MAX if max_tokens is None else max_tokens
+        self.tokens = self.max_tokens
+        self._lock = threading.Lock()
+
+    def deposit(self):
+        with self._lock:
+            self.tokens = min(self.max_tokens, self.tokens + self.ratio)
+
+    def withdraw(self):
+        with self._lock:
+            if self.tokens < 1:
+                return False
+            self.tokens -= 1
+            return True
+
+
+class CircuitBreaker:
+    """Per-platform breaker driven by the failure rate of recent attempts.
+
+    Opens when at least ``min_calls`` of the last ``window`` attempts were
+    recorded and the failure rate reaches ``failure_rate``. After
+    ``open_seconds`` one probe is let through (half-open); its outcome closes
+    or re-opens the breaker.
+    """
+
+    def __init__(self, platform, failure_rate=None, window=None, min_calls=None, open_seconds=None):
+        self.platform = platform
+        self.failure_rate = config.BREAKER_FAILURE_RATE if failure_rate is None else failure_rate
+        self.min_calls = config.BREAKER_MIN_CALLS if min_calls is None else min_calls
+        self.open_seconds = config.BREAKER_OPEN_SECONDS if open_seconds is None else open_seconds
+        self._outcomes = deque(maxlen=window or config.BREAKER_WINDOW)
+        self._lock = threading.Lock()
+        self.state = "closed"
+        self.opened_at = None
+        self._probing = False
+        self.times_opened = 0
+
+    def retry_after(self):
+        if self.state != "open":
+            return 0
+        return max(0.0, self.opened_at + self.open_seconds - time.monotonic())
+
+    def is_open(self):
+        """True while calls are being rejected (no side effects)."""
+        with self._lock:
+            if self.state == "open":
+                return self.retry_after() > 0
+            return self.state == "half_open" and self._probing
+
+    def allow(self):
+        """Return True if a call may proceed, claiming the probe when half-open."""
+        with self._lock:
+            if self.state == "open" and self.retry_after() <= 0:
+                self.state = "half_open"
+                self._probing = False
+            if self.state == "closed":
+                return True
+            if self.state == "half_open" and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record(self, success):
+        with self._lock:
+            if self.state == "half_open":
+                self._probing = False
+                if success:
+                    self.state = "closed"
+                    self._outcomes.clear()
+                else:
+                    self._open()
+                return
+            self._outcomes.append(success)
+            failures = self._outcomes.count(False)
+            if (self.state == "closed" and len(self._outcomes) >= self.min_calls
+                    and failures / len(self._outcomes) >= self.failure_rate):
+                self._open()
+
+    def _open(self):
+        self.state = "open"
+        self.opened_at = time.monotonic()
+        self.times_opened += 1
+        logger.warning("Circuit breaker for %s opened", self.platform)
+
+    def reset(self):
+        with self._lock:
+            self.state = "closed"
+            self._outcomes.clear()
+            self._probing = False
+
+    def snapshot(self):
+        with self._lock:
+            outcomes = list(self._outcomes)
+            return {
+                "state": self.state,
+                "recent_calls": len(outcomes),
+                "recent_failures": outcomes.count(False),
+                "retry_after": round(self.retry_after(), 1),
+                "times_opened": self.times_opened,
+            }
+
+
+_breakers = {}
+_budgets = {}
+_registry_lock = threading.Lock()
+
+
+def get_breaker(platform):
+    with _registry_lock:
+        if platform not in _breakers:
+            _breakers[platform] = CircuitBreaker(platform)
+        return _breakers[platform]
+
+
+def get_budget(platform):
+    with _registry_lock:
+        if platform not in _budgets:
+            _budgets[platform] = RetryBudget()
+        return _budgets[platform]
+
+
+def breaker_states():
+    with _registry_lock:
+        platforms = dict(_breakers)
+        budgets = dict(_budgets)
+    states = {}
+    for platform, breaker in platforms.items():
+        states[platform] = breaker.snapshot()
+        if platform in budgets:
+            states[platform]["retry_tokens"] = round(budgets[platform].tokens, 2)
+    return states
+
+
+async def retry_async(platform, attempt, policy=None):
+    """Run ``attempt(number, is_last)`` with backoff under the platform breaker.
+
+    ``attempt`` returns ``(data, error)``; an exception counts as an error.
+    Each attempt runs inside a slot of the platform rate limiter, which is
+    told the outcome. Backoff sleeps on the event loop, so callers should hold no page or
+    browser lease between attempts. Raises CircuitOpenError without calling
+    ``attempt`` while the breaker is open; if it opens between attempts the
+    last error is returned instead.
+    """
+    policy = policy or RetryPolicy()
+    breaker = get_breaker(platform)
+    budget = get_budget(platform)
+    limiter = get_limiter(platform)
+    budget.deposit()
+    data, error = None, None
+    for number in range(policy.attempts):
+        if not breaker.allow():
+            if number == 0:
+                SCRAPE_FAILURES.inc(platform, "circuit_open")
+                raise CircuitOpenError(platform, breaker.retry_after())
+            break
+        is_last = number == policy.attempts - 1
+        reason = "no_data"
+        try:
+            async with limiter.slot():
+                data, error = await attempt(number, is_last)
+        except Exception as e:
+            data, error = None, str(e)
+            reason = type(e).__name__
+        breaker.record(error is None)
+        limiter.record(error is None)
+        if error is None:
+            return data, None
+        SCRAPE_FAILURES.inc(platform, reason)
+        logger.warning("Attempt %d failed on %s: %s", number + 1, platform, error)
+        if is_last:
+            break
+        if not budget.withdraw():
+            logger.warning("Retry budget for %s exhausted, not retrying.", platform)
+            break
+        delay = policy.backoff(number)
+        logger.info("Retrying on %s in %.1fs...", platform, delay)
+        SCRAPE_RETRIES.inc(platform)
+        with span(platform, "backoff"):
+            await asyncio.sleep(delay)
+    return data, error
@@ -1,126 +1,223 @@
-from playwright.sync_api import sync_playwright
-from playwright_stealth import stealth_sync
-import re
-import time
-import os
-from datetime import datetime
-
-def parse_number(text):
-    """Convert formatted number (e.g., '1.2M', '1,234') to integer."""
-    text = text.replace(',', '')
-    if 'M' in text:
-        return int(float(text.replace('M', '')) * 1_000_000)
-    elif 'K' in text:
-        return int(float(text.replace('K', '')) * 1_000)
-    return int(text)
-
-def parse_date(date_str):
-    """Parse date string (e.g., 'June 6, 2025' or '6 June 2025') to YYYY-MM-DD."""
-    try:
-        return datetime.strptime(date_str, "%B %d, %Y").strftime("%Y-%m-%d")
-    except ValueError:
-        try:
-            return datetime.strptime(date_str, "%d %B %Y").strftime("%Y-%m-%d")
-        except ValueError as e:
-            print(f"Date parsing error: {e}")
-            return None
-
-def get_instagram_data(username, retries=2):
+from playwright_stealth import stealth_async
+import asyncio
+
+import config
+from browser_pool import get_pool
+from capture_store import capture_html, read_page
+# parse_number and parse_date are re-exported for existing callers
+from extractors import (PROFILE_PATTERN, REEL_PATTERN, extract_profile_stats, extract_reel_stats,  # noqa: F401
+                        parse_date, parse_number, profile_stats_from_html, reel_shortcode, reel_stats_from_html)
+from http_fastpath import fetch_html
+from metrics import span
+from rate_limiter import get_limiter
+from request_blocking import install_blocking
+from retry_policy import RetryPolicy, retry_async
+from singleflight import flight_key, scrape_flights
+from snapshot_store import record_snapshot
+from wait_strategy import wait_for_target
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/129.0 Safari/537.36"
+
+PROFILE_META_SELECTOR = 'meta[property="og:description"], meta[name="description"]'
+REEL_META_SELECTOR = 'meta[property="og:description"]'
+
+async def _setup_page(page):
+    await stealth_async(page)
+    await install_blocking(page, "instagram")
+
+async def warm_up(pages=1):
+    """Open ``pages`` ready Instagram pages in the pool before traffic arrives."""
+    await asyncio.gather(*(
+        get_pool().warm_page("instagram", {"user_agent": USER_AGENT}, _setup_page) for _ in range(pages)
+    ))
+
+def get_instagram_data(username, retries=None):
     """Scrape Instagram profile data (Followers, Following, Posts)."""
-    url = f"https://www.instagram.com/{username}/"
-    data = {"ID": username, "Followers": None, "Following": None, "Posts": None}
-
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=True)
-        context = browser.new_context(
-            user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/129.0 Safari/537.36"
-        )
-        page = context.new_page()
-        stealth_sync(page)
-
-        for attempt in range(retries):
+    return get_pool().run(get_instagram_data_async(username, retries))
+
+def get_reel_data(reel_url, retries=None):
+    """Scrape Instagram reel data (Likes, Comments, Upload Date) from meta tags."""
+    return get_pool().run(get_reel_data_async(reel_url, retries))
+
+def canonical_reel_url(reel_url):
+    """``<INSTAGRAM_BASE_URL>/reel/<shortcode>/`` for any URL form of a reel (or a bare shortcode).
+
+    URLs without a recognisable shortcode are returned unchanged.
+    """
+    shortcode = reel_shortcode(reel_url)
+    if shortcode is None:
+        return reel_url.strip()
+    return f"{config.INSTAGRAM_BASE_URL}/reel/{shortcode}/"
+
+async def get_instagram_data_async(username, retries=None):
+    """Async version of ``get_instagram_data``; await it from any event loop.
+
+    Tries the server-rendered HTML first and only uses a browser when its
+    meta tags don't match. ``Source`` in the result says which path served it.
+    Concurrent calls for the same username share one scrape.
+    """
+    return await scrape_flights.do_async(
+        flight_key("instagram_profile", username),
+        lambda: _get_instagram_data(username, retries),
+    )
+
+async def get_reel_data_async(reel_url, retries=None):
+    """Async version of ``get_reel_data``; await it from any event loop.
+
+    The URL is canonicalised first, so ``/p/<code>``, ``?igsh=`` links and
+    the like share one scrape and report the same ``Reel_URL``.
+    """
+    reel_url = canonical_reel_url(reel_url)
+    return await scrape_flights.do_async(
+        flight_key("instagram_reel", reel_url),
+        lambda: _get_reel_data(reel_url, retries),
+    )
+
+async def _get_instagram_data(username, retries):
+    if config.FAST_PATH_ENABLED:
+        loop = asyncio.get_running_loop()
+        async with get_limiter("instagram").slot():
+            with span("instagram", "fast_path"):
+                data = await loop.run_in_executor(None, _fetch_profile_fast, username)
+        if data:
+            record_snapshot("profile", username, data)
+            return data, None
+    data, error = await get_pool().call(_scrape_instagram_profile(username, retries))
+    if not error:
+        record_snapshot("profile", username, data)
+    return data, error
+
+async def _get_reel_data(reel_url, retries):
+    if config.FAST_PATH_ENABLED:
+        loop = asyncio.get_running_loop()
+        async with get_limiter("instagram").slot():
+            with span("instagram", "fast_path"):
+                data = await loop.run_in_executor(None, _fetch_reel_fast, reel_url)
+        if data:
+            record_snapshot("reel", reel_url, data)
+            return data, None
+    data, error = await get_pool().call(_scrape_instagram_reel(reel_url, retries))
+    if not error:
+        record_snapshot("reel", reel_url, data)
+    return data, error
+
+def _fetch_profile_fast(username):
+    url = f"{config.INSTAGRAM_BASE_URL}/{username}/"
+    page_html = fetch_html(url, USER_AGENT, get_limiter("instagram"))
+    if page_html is None:
+        return None
+    stats = profile_stats_from_html(page_html)
+    if stats:
+        get_limiter("instagram").record(True)
+        print(f"Fast path extracted for {username}: {stats['Followers']:,} Followers, {stats['Following']:,} Following, {stats['Posts']:,} Posts")
+        return {"ID": username, **stats, "Source": "http"}
+    print(f"Fast path found no profile meta data for {username}, falling back to browser.")
+    return None
+
+def _fetch_reel_fast(reel_url):
+    page_html = fetch_html(reel_url, USER_AGENT, get_limiter("instagram"))
+    if page_html is None:
+        return None
+    stats = reel_stats_from_html(page_html)
+    if stats:
+        get_limiter("instagram").record(True)
+        print(f"Fast path extracted for {reel_url}: {stats['Likes']:,} Likes, {stats['Comments']:,} Comments, {stats['Upload_Date']} Upload Date")
+        return {"Reel_URL": reel_url, **stats, "Source": "http"}
+    print(f"Fast path found no reel meta data for {reel_url}, falling back to browser.")
+    return None
+
+def _capture_failure(identifier, page, reason):
+    """Capture the last page a failed scrape saw; returns the capture id or None."""
+    if page is None:
+        return None
+    html, url = page
+    return capture_html("instagram", identifier, html, reason=reason, url=url)
+
+async def _scrape_instagram_profile(username, retries):
+    url = f"{config.INSTAGRAM_BASE_URL}/{username}/"
+    data = {"ID": username, "Followers": None, "Following": None, "Posts": None, "Source": "browser"}
+    # Page and reason of the latest failed attempt, captured if the scrape gives up
+    failed_page = None, None
+
+    async def attempt(number, is_last):
+        nonlocal failed_page
+        # Each attempt leases its own page so backoff doesn't hold a browser
+        async with get_pool().lease_page("instagram", {"user_agent": USER_AGENT}, _setup_page) as page:
             try:
-                print(f"Attempt {attempt + 1}: Navigating to {url}")
-                page.goto(url, timeout=60000)
-                page.wait_for_load_state("networkidle", timeout=40000)
+                print(f"Attempt {number + 1}: Navigating to {url}")
+                with span("instagram", "goto"):
+                    await page.goto(url, timeout=60000, wait_until="domcontentloaded")
+                with span("instagram", "wait"):
+                    await wait_for_target(
+                        page, PROFILE_META_SELECTOR, PROFILE_PATTERN, attribute="content",
+                        fallback=lambda: page.wait_for_load_state("networkidle", timeout=40000),
+                    )
                 print(f"Page loaded for {username}, searching for meta tags...")
 
-                meta_tags = page.query_selector_all('meta[property="og:description"], meta[name="description"]')
-                for meta in meta_tags:
-                    content = meta.get_attribute("content")
-                    if content:
-                        match = re.search(r"(\d[\d,.MK]*)\s*Followers,\s*(\d[\d,.MK]*)\s*Following,\s*(\d[\d,.MK]*)\s*Posts", content, re.IGNORECASE)
-                        if match:
-                            data["Followers"] = parse_number(match.group(1))
-                            data["Following"] = parse_number(match.group(2))
-                            data["Posts"] = parse_number(match.group(3))
-                            print(f"Extracted for {username}: {data['Followers']:,} Followers, {data['Following']:,} Following, {data['Posts']:,} Posts")
-                            browser.close()
-                            return data, None
-
-                print(f"Attempt {attempt + 1} failed for {username}: No valid meta tag data found.")
-                if attempt < retries - 1:
-                    print("Retrying...")
-                    time.sleep(2)
-
+                with span("instagram", "query"):
+                    contents = [await meta.get_attribute("content")
+                                for meta in await page.query_selector_all(PROFILE_META_SELECTOR)]
+                with span("instagram", "extract"):
+                    for content in contents:
+                        stats = extract_profile_stats(content) if content else None
+                        if stats:
+                            return stats, None
             except Exception as e:
-                print(f"Attempt {attempt + 1} error for {username}: {str(e)}")
-                if attempt < retries - 1:
-                    print("Retrying...")
-                    time.sleep(2)
-
-        error_msg = f"Failed to extract data for {username}. Check page_content_{username}.html."
-        with open(f"page_content_{username}.html", "w", encoding="utf-8") as f:
-            f.write(page.content())
-        browser.close()
-        return data, error_msg
-
-def get_reel_data(reel_url, retries=2):
-    """Scrape Instagram reel data (Likes, Comments, Upload Date) from meta tags."""
-    data = {"Reel_URL": reel_url, "Likes": None, "Comments": None, "Upload_Date": None}
-    
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=True)
-        context = browser.new_context(
-            user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/129.0 Safari/537.36"
-        )
-        page = context.new_page()
-        stealth_sync(page)
-
-        for attempt in range(retries):
+                failed_page = await read_page(page), str(e)
+                raise
+
+            failed_page = await read_page(page), "no meta data"
+            return None, f"No valid meta tag data found for {username}."
+
+    stats, error = await retry_async("instagram", attempt, RetryPolicy(attempts=retries))
+    if error:
+        capture_id = _capture_failure(username, *failed_page)
+        return data, f"Failed to extract data for {username}." + (f" Page captured as {capture_id}." if capture_id else "")
+    data.update(stats)
+    print(f"Extracted for {username}: {data['Followers']:,} Followers, {data['Following']:,} Following, {data['Posts']:,} Posts")
+    return data, None
+
+async def _scrape_instagram_reel(reel_url, retries):
+    data = {"Reel_URL": reel_url, "Likes": None, "Comments": None, "Upload_Date": None, "Source": "browser"}
+    # Page and reason of the latest failed attempt, captured if the scrape gives up
+    failed_page = None, None
+
+    async def attempt(number, is_last):
+        nonlocal failed_page
+        # Reels are tabs of a shared context rather than a context each
+        async with get_pool().lease_page("instagram_reel", {"user_agent": USER_AGENT}, _setup_page,
+                                         tabs=config.REEL_TABS_PER_CONTEXT) as page:
             try:
-                print(f"Attempt {attempt + 1}: Navigating to {reel_url}")
-                page.goto(reel_url, timeout=60000)
-                page.wait_for_load_state("networkidle", timeout=40000)
+                print(f"Attempt {number + 1}: Navigating to {reel_url}")
+                with span("instagram", "goto"):
+                    await page.goto(reel_url, timeout=60000, wait_until="domcontentloaded")
+                with span("instagram", "wait"):
+                    await wait_for_target(
+                        page, REEL_META_SELECTOR, REEL_PATTERN, attribute="content",
+                        fallback=lambda: page.wait_for_load_state("networkidle", timeout=40000),
+                    )
                 print(f"Page loaded for {reel_url}, searching for meta tags...")
 
-                meta_tag = page.query_selector('meta[property="og:description"]')
-                if meta_tag:
-                    content = meta_tag.get_attribute("content")
+                with span("instagram", "query"):
+                    meta_tag = await page.query_selector(REEL_META_SELECTOR)
+                    content = await meta_tag.get_attribute("content") if meta_tag else None
+                if content:
                     print(f"Meta description content: {content}")
-
-                    match = re.search(r"([\d,.MK]+)\s*likes,\s*([\d,.MK]+)\s*comments\s*-\s*\w+\s*on\s*([A-Za-z]+\s*\d{1,2},\s*\d{4}|\d{1,2}\s*[A-Za-z]+\s*\d{4})", content, re.IGNORECASE)
-                    if match:
-                        data["Likes"] = parse_number(match.group(1))
-                        data["Comments"] = parse_number(match.group(2))
-                        data["Upload_Date"] = parse_date(match.group(3))
-                        print(f"Extracted for {reel_url}: {data['Likes']:,} Likes, {data['Comments']:,} Comments, {data['Upload_Date']} Upload Date")
-                        browser.close()
-                        return data, None
-
-                print(f"Attempt {attempt + 1} failed for {reel_url}: No valid meta tag data found.")
-                if attempt < retries - 1:
-                    print("Retrying...")
-                    time.sleep(2)
-
+                    with span("instagram", "extract"):
+                        stats = extract_reel_stats(content)
+                    if stats:
+                        return stats, None
             except Exception as e:
-                print(f"Attempt {attempt + 1} error for {reel_url}: {str(e)}")
-                if attempt < retries - 1:
-                    print("Retrying...")
-                    time.sleep(2)
-
-        error_msg = f"Failed to extract reel data for {reel_url}. Check page_content_reel.html."
-        with open(f"page_content_reel.html", "w", encoding="utf-8") as f:
-            f.write(page.content())
-        browser.close()
-        return data, error_msg
\ No newline at end of file
+                failed_page = await read_page(page), str(e)
+                raise
+
+            failed_page = await read_page(page), "no meta data"
+            return None, f"No valid meta tag data found for {reel_url}."
+
+    stats, error = await retry_async("instagram", attempt, RetryPolicy(attempts=retries))
+    if error:
+        capture_id = _capture_failure(reel_url, *failed_page)
+        return data, f"Failed to extract reel data for {reel_url}." + (f" Page captured as {capture_id}." if capture_id else "")
+    data.update(stats)
+    print(f"Extracted for {reel_url}: {data['Likes']:,} Likes, {data['Comments']:,} Comments, {data['Upload_Date']} Upload Date")
+    return data, None
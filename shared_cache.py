@@ -0,0 +1,176 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+import config
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    key TEXT PRIMARY KEY,
+    data TEXT,
+    error TEXT,
+    ttl REAL NOT NULL,
+    stored_at REAL NOT NULL,
+    expires_at REAL NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS results_expiry ON results (expires_at);
+CREATE TABLE IF NOT EXISTS claims (
+    key TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    expires_at REAL NOT NULL
+) WITHOUT ROWID;
+"""
+
+
+class SharedCacheStore:
+    """Scrape results shared by every worker process on a host.
+
+    One SQLite file in WAL mode: readers never block the writer, each
+    ``put()`` is a single atomic upsert and ``get()`` is a primary-key
+    lookup. Rows are kept until ``expires_at`` (TTL plus the stale window)
+    and deleted by a background thread in each process.
+
+    ``claim()`` lets one worker scrape a key while the others wait for its
+    result in ``wait_for()`` instead of scraping it too.
+    """
+
+    def __init__(self, path=None, cleanup_interval=None):
+        self.path = path or config.CACHE_SHARED_PATH
+        self.cleanup_interval = cleanup_interval or config.CACHE_SHARED_CLEANUP_INTERVAL
+        self.owner = f"{os.getpid()}-{id(self)}"
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.executescript(_SCHEMA)
+        self.hits = 0
+        self.writes = 0
+        self.errors = 0
+        self.cleaned = 0
+        self.waits = 0
+        self._cleaner = threading.Thread(target=self._cleanup_loop, name="shared-cache-cleanup", daemon=True)
+        self._cleaner.start()
+
+    def _execute(self, sql, params=()):
+        with self._lock:
+            return self._conn.execute(sql, params)
+
+    def get(self, key):
+        """Return ``(data, error, ttl, stored_at)`` for ``key``, or None."""
+        try:
+            row = self._execute(
+                "SELECT data, error, ttl, stored_at FROM results WHERE key = ? AND expires_at > ?",
+                (key, time.time()),
+            ).fetchone()
+        except sqlite3.Error as e:
+            self.errors += 1
+            logger.warning("Shared cache read of %s failed: %s", key, e)
+            return None
+        if row is None:
+            return None
+        self.hits += 1
+        data, error, ttl, stored_at = row
+        return (json.loads(data) if data is not None else None), error, ttl, stored_at
+
+    def put(self, key, data, error, ttl, stored_at, keep_for):
+        """Store a result for ``keep_for`` seconds and release any claim on ``key``."""
+        try:
+            with self._lock:
+                with self._conn:
+                    self._conn.execute("BEGIN IMMEDIATE")
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO results (key, data, error, ttl, stored_at, expires_at) "
+                        "VALUES (?, ?, ?, ?, ?, ?)",
+                        (key, json.dumps(data, separators=(",", ":")) if data is not None else None,
+                         error, ttl, stored_at, stored_at + keep_for),
+                    )
+                    self._conn.execute("DELETE FROM claims WHERE key = ?", (key,))
+            self.writes += 1
+        except (sqlite3.Error, TypeError, ValueError) as e:
+            self.errors += 1
+            logger.warning("Shared cache write of %s failed: %s", key, e)
+
+    def claim(self, key, seconds=None):
+        """Try to become the one process scraping ``key``; True if this process should scrape."""
+        now = time.time()
+        try:
+            cursor = self._execute(
+                "INSERT INTO claims (key, owner, expires_at) VALUES (?, ?, ?) "
+                "ON CONFLICT (key) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at "
+                "WHERE claims.expires_at <= ? OR claims.owner = excluded.owner",
+                (key, self.owner, now + (seconds or config.CACHE_SHARED_CLAIM_SECONDS), now),
+            )
+        except sqlite3.Error as e:
+            self.errors += 1
+            logger.warning("Shared cache claim of %s failed: %s", key, e)
+            return True
+        return cursor.rowcount > 0
+
+    def release(self, key):
+        """Drop this process's claim on ``key`` (after a scrape that stored nothing)."""
+        try:
+            self._execute("DELETE FROM claims WHERE key = ? AND owner = ?", (key, self.owner))
+        except sqlite3.Error as e:
+            self.errors += 1
+            logger.warning("Shared cache release of %s failed: %s", key, e)
+
+    def wait_for(self, key, newer_than, timeout=None, poll=0.1):
+        """Wait for another process to store ``key`` after ``newer_than``; returns ``get()``'s row or None.
+
+        Gives up early if the claim is released or expires without a result.
+        """
+        self.waits += 1
+        deadline = time.monotonic() + (timeout or config.CACHE_SHARED_CLAIM_SECONDS)
+        while time.monotonic() < deadline:
+            time.sleep(poll)
+            row = self.get(key)
+            if row is not None and row[3] >= newer_than:
+                return row
+            try:
+                claimed = self._execute(
+                    "SELECT 1 FROM claims WHERE key = ? AND expires_at > ?", (key, time.time())).fetchone()
+            except sqlite3.Error:
+                return None
+            if not claimed:
+                return None
+        return None
+
+    def cleanup(self):
+        """Delete expired results and claims; returns the number of results removed."""
+        now = time.time()
+        with self._lock:
+            with self._conn:
+                self._conn.execute("BEGIN IMMEDIATE")
+                removed = self._conn.execute("DELETE FROM results WHERE expires_at <= ?", (now,)).rowcount
+                self._conn.execute("DELETE FROM claims WHERE expires_at <= ?", (now,))
+        self.cleaned += removed
+        return removed
+
+    def _cleanup_loop(self):
+        while True:
+            time.sleep(self.cleanup_interval)
+            try:
+                self.cleanup()
+            except sqlite3.Error as e:
+                logger.warning("Shared cache cleanup failed: %s", e)
+
+    def stats(self):
+        try:
+            entries = self._execute("SELECT COUNT(*) FROM results").fetchone()[0]
+        except sqlite3.Error:
+            entries = None
+        return {
+            "path": self.path,
+            "entries": entries,
+            "hits": self.hits,
+            "writes": self.writes,
+            "waits": self.waits,
+            "cleaned": self.cleaned,
+            "errors": self.errors,
+        }
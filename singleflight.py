@@ -0,0 +1,90 @@
+import asyncio
+import threading
+from concurrent.futures import Future
+
+
+class SingleFlight:
+    """Coalesce concurrent calls for the same key into one execution.
+
+    The first caller for a key runs the work; callers arriving while it is in
+    flight wait for and share its result or exception. Works across threads
+    and event loops because the shared result is a ``concurrent.futures``
+    Future.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.calls = 0
+        self.executions = 0
+        self.coalesced = 0
+
+    def _join(self, key):
+        with self._lock:
+            self.calls += 1
+            future = self._calls.get(key)
+            if future is not None:
+                self.coalesced += 1
+                return future, False
+            future = Future()
+            self._calls[key] = future
+            self.executions += 1
+            return future, True
+
+    def _finish(self, key, future, result=None, error=None):
+        with self._lock:
+            self._calls.pop(key, None)
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def do(self, key, fn):
+        """Run ``fn()`` once for all concurrent callers of ``key``."""
+        future, leader = self._join(key)
+        if not leader:
+            return future.result()
+        try:
+            result = fn()
+        except BaseException as e:
+            self._finish(key, future, error=e)
+            raise
+        self._finish(key, future, result)
+        return result
+
+    async def do_async(self, key, coro_fn):
+        """Async variant of ``do()``; ``coro_fn()`` must return an awaitable."""
+        future, leader = self._join(key)
+        if not leader:
+            return await asyncio.wrap_future(future)
+        try:
+            result = await coro_fn()
+        except BaseException as e:
+            self._finish(key, future, error=e)
+            raise
+        self._finish(key, future, result)
+        return result
+
+    def stats(self):
+        with self._lock:
+            in_flight = len(self._calls)
+        return {
+            "calls": self.calls,
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "in_flight": in_flight,
+        }
+
+
+def flight_key(platform, identifier):
+    """Normalize a platform/identifier pair so equivalent requests coalesce.
+
+    Usernames are case-insensitive; reel URLs are not (shortcodes are).
+    """
+    identifier = identifier.strip()
+    if platform != "instagram_reel":
+        identifier = identifier.lstrip("@").lower()
+    return f"{platform}:{identifier}"
+
+
+scrape_flights = SingleFlight()
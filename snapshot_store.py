@@ -0,0 +1,202 @@
+import atexit
+import json
+import logging
+import queue
+import sqlite3
+import threading
+import time
+
+import config
+from result_cache import normalize_identifier
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_TYPES = ("profile", "reel", "tiktok_profile")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    id INTEGER PRIMARY KEY,
+    type TEXT NOT NULL,
+    identifier TEXT NOT NULL,
+    ts REAL NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS snapshots_series ON snapshots (type, identifier, ts);
+"""
+
+# SQLite allows 999 bound parameters in older builds
+_IN_CHUNK = 500
+
+
+class SnapshotStore:
+    """Append-only SQLite time series of successful scrape results.
+
+    ``add()`` only enqueues; a writer thread inserts queued snapshots in
+    batches of up to ``batch_size``, at least every ``flush_interval``
+    seconds. Reads use their own connection, so they never wait on a batch.
+    """
+
+    def __init__(self, path=None, batch_size=None, flush_interval=None, queue_size=None):
+        self.path = path or config.SNAPSHOT_DB_PATH
+        self.batch_size = batch_size or config.SNAPSHOT_BATCH_SIZE
+        self.flush_interval = flush_interval or config.SNAPSHOT_FLUSH_INTERVAL
+        self._queue = queue.Queue(maxsize=queue_size or config.SNAPSHOT_QUEUE_SIZE)
+        self._lock = threading.Lock()
+        self._conn = self._connect()
+        self._conn.executescript(_SCHEMA)
+        self.written = 0
+        self.batches = 0
+        self.dropped = 0
+        self._writer = threading.Thread(target=self._write_loop, name="snapshot-writer", daemon=True)
+        self._writer.start()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=5000")
+        return conn
+
+    # -- writes --------------------------------------------------------------
+
+    def add(self, snapshot_type, identifier, data, ts=None):
+        """Queue a snapshot; returns False if the queue is full and it was dropped."""
+        row = (snapshot_type, normalize_identifier(snapshot_type, identifier),
+               ts or time.time(), json.dumps(data, separators=(",", ":")))
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            return False
+        return True
+
+    def _write_loop(self):
+        conn = self._connect()
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            try:
+                with conn:
+                    conn.execute("BEGIN")
+                    conn.executemany("INSERT INTO snapshots (type, identifier, ts, data) VALUES (?, ?, ?, ?)", batch)
+                with self._lock:
+                    self.written += len(batch)
+                    self.batches += 1
+            except sqlite3.Error as e:
+                logger.error("Could not write %d snapshots: %s", len(batch), e)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def flush(self, timeout=None):
+        """Wait until queued snapshots are written (best effort with a timeout)."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if deadline is not None and time.monotonic() > deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    # -- reads ---------------------------------------------------------------
+
+    def history(self, snapshot_type, identifier, since=None, until=None, limit=500):
+        """Snapshots of one account or reel, oldest first."""
+        rows = self._query(
+            "SELECT ts, data FROM snapshots WHERE type = ? AND identifier = ? AND ts >= ? AND ts <= ? "
+            "ORDER BY ts DESC LIMIT ?",
+            (snapshot_type, normalize_identifier(snapshot_type, identifier),
+             since or 0, until or time.time(), limit),
+        )
+        return [{"ts": ts, "data": json.loads(data)} for ts, data in reversed(rows)]
+
+    def growth(self, snapshot_type, identifier, window):
+        """Change of every numeric field between the first and last snapshot in ``window`` seconds.
+
+        Returns None when there are no snapshots in the window.
+        """
+        key = (snapshot_type, normalize_identifier(snapshot_type, identifier), time.time() - window)
+        first = self._query(
+            "SELECT ts, data FROM snapshots WHERE type = ? AND identifier = ? AND ts >= ? ORDER BY ts LIMIT 1", key)
+        last = self._query(
+            "SELECT ts, data FROM snapshots WHERE type = ? AND identifier = ? AND ts >= ? ORDER BY ts DESC LIMIT 1", key)
+        if not first:
+            return None
+        (first_ts, first_data), (last_ts, last_data) = first[0], last[0]
+        first_data, last_data = json.loads(first_data), json.loads(last_data)
+        days = (last_ts - first_ts) / 86400
+        delta = {}
+        for field, value in last_data.items():
+            before = first_data.get(field)
+            if _is_number(value) and _is_number(before):
+                delta[field] = {
+                    "from": before,
+                    "to": value,
+                    "change": value - before,
+                    "percent": round((value - before) / before * 100, 2) if before else None,
+                    "per_day": round((value - before) / days, 2) if days > 0 else None,
+                }
+        return {"from_ts": first_ts, "to_ts": last_ts, "fields": delta}
+
+    def latest(self, snapshot_type, identifiers):
+        """Newest snapshot for each identifier that has one, keyed by identifier."""
+        wanted = {normalize_identifier(snapshot_type, identifier): identifier for identifier in identifiers}
+        names = list(wanted)
+        latest = {}
+        for start in range(0, len(names), _IN_CHUNK):
+            chunk = names[start:start + _IN_CHUNK]
+            placeholders = ",".join("?" * len(chunk))
+            rows = self._query(
+                f"SELECT s.identifier, s.ts, s.data FROM snapshots s "
+                f"WHERE s.type = ? AND s.identifier IN ({placeholders}) AND s.ts = ("
+                f"SELECT MAX(ts) FROM snapshots WHERE type = s.type AND identifier = s.identifier)",
+                [snapshot_type] + chunk,
+            )
+            for identifier, ts, data in rows:
+                latest[wanted[identifier]] = {"ts": ts, "data": json.loads(data)}
+        return latest
+
+    def _query(self, sql, params):
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "queued": self._queue.qsize(),
+                "written": self.written,
+                "batches": self.batches,
+                "dropped": self.dropped,
+            }
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_snapshot_store():
+    """Return the process-wide snapshot store."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = SnapshotStore()
+            atexit.register(_store.flush, 5)
+        return _store
+
+
+def record_snapshot(snapshot_type, identifier, data):
+    """Append a successful scrape result to the history (no-op when disabled)."""
+    if config.SNAPSHOT_ENABLED and data:
+        get_snapshot_store().add(snapshot_type, identifier, data)
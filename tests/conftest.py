@@ -0,0 +1,16 @@
+import os
+import sys
+import tempfile
+
+# The modules live at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# config reads the environment at import: keep test state out of the working directory
+_state_dir = tempfile.mkdtemp(prefix="scraper-tests-")
+for name, filename in (("JOB_DB_PATH", "jobs.db"), ("CACHE_SHARED_PATH", "result_cache.db"),
+                       ("SNAPSHOT_DB_PATH", "snapshots.db"), ("WATCHLIST_DB_PATH", "watchlist.db"),
+                       ("CAPTURE_DIR", "captures")):
+    os.environ[name] = os.path.join(_state_dir, filename)
+os.environ["JOB_AUTOSTART"] = "0"
+os.environ["WATCHLIST_AUTOSTART"] = "0"
+os.environ["BROWSER_PRELAUNCH"] = "0"
@@ -0,0 +1,24 @@
+import app as app_module
+import config
+
+
+def test_create_jobs_caps_identifiers_after_dedupe(monkeypatch):
+    monkeypatch.setattr(config, "BATCH_MAX_ITEMS", 2)
+    queued = []
+
+    class FakeQueue:
+        def enqueue(self, job_type, identifier, priority):
+            queued.append(identifier)
+            return f"job-{len(queued)}"
+
+    monkeypatch.setattr(app_module, "get_queue", lambda runner: FakeQueue())
+    client = app_module.app.test_client()
+
+    response = client.post("/api/jobs", json={"type": "profile", "identifiers": ["a", "b", "c"]})
+    assert response.status_code == 400
+    assert response.get_json() == {"error": "Too many items: 3 (max 2)"}
+    assert queued == []
+
+    response = client.post("/api/jobs", json={"type": "profile", "identifiers": ["a", "A", "b", "a"]})
+    assert response.status_code == 202
+    assert queued == ["a", "b"]
@@ -0,0 +1,82 @@
+import asyncio
+import os
+
+import pytest
+
+import browser_pool
+from browser_pool import BrowserPool, PooledBrowser
+
+
+class FakeBrowser:
+    def __init__(self):
+        self.connected = True
+
+    def is_connected(self):
+        return self.connected
+
+    async def close(self):
+        self.connected = False
+
+
+def make_pool(size=1, max_pages=4):
+    pool = BrowserPool(size=size, max_pages=max_pages)
+
+    async def launch():
+        pool._next_id += 1
+        return PooledBrowser(FakeBrowser(), pool._next_id, f"--marker-{pool._next_id}")
+
+    pool._launch = launch
+    pool.launched = True
+    return pool
+
+
+def test_replacing_a_crashed_browser_does_not_leak_capacity():
+    async def scenario():
+        pool = make_pool()
+        pool._browsers = [await pool._launch()]
+        first = await pool.acquire()
+        second = await pool.acquire()
+        first.browser.connected = False  # crashes with two leases open
+        third = await pool.acquire()
+        assert third is not first
+        for pooled in (first, second, third):
+            await pool.release(pooled)
+        await asyncio.sleep(0)
+        return pool, first
+
+    pool, crashed = asyncio.run(scenario())
+    assert [b.active for b in pool._browsers] == [0]
+    assert crashed.active == 0
+    assert pool._retiring == []
+    assert pool.replacements == 1
+
+
+def test_acquire_picks_the_least_busy_browser():
+    async def scenario():
+        pool = make_pool(size=2)
+        pool._browsers = [await pool._launch(), await pool._launch()]
+        leases = [await pool.acquire() for _ in range(4)]
+        return pool, leases
+
+    pool, leases = asyncio.run(scenario())
+    assert [b.active for b in pool._browsers] == [2, 2]
+    assert leases[0] is not leases[1]
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs fork()")
+def test_forked_child_gets_a_working_pool():
+    pool = browser_pool.get_pool()
+    pool.start()
+    read_end, write_end = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        try:
+            child_pool = browser_pool.get_pool()
+            ok = child_pool is not pool and child_pool.run(asyncio.sleep(0, result=42), timeout=5) == 42
+            os.write(write_end, b"1" if ok else b"0")
+        finally:
+            os._exit(0)
+    os.close(write_end)
+    result = os.read(read_end, 1)
+    os.waitpid(pid, 0)
+    assert result == b"1"
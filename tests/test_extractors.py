@@ -0,0 +1,86 @@
+import re
+
+import pytest
+
+import extractors
+from benchmark import FixtureServer
+
+FIELDS = ("followers", "following", "likes", "bio", "link")
+
+
+@pytest.fixture(scope="module")
+def fixtures():
+    server = FixtureServer()
+    return {kind: server.render(kind, "jane_doe", "Cabc123").decode("utf-8")
+            for kind in ("profile", "reel", "tiktok_profile")}
+
+
+def without_state(page):
+    return re.sub(r'<script id="__UNIVERSAL_DATA_FOR_REHYDRATION__".*?</script>', "", page, flags=re.S)
+
+
+def test_tiktok_paths_agree_on_the_fixture(fixtures):
+    page = fixtures["tiktok_profile"]
+    state = extractors.parse_profile_state(page)
+    dom_page = without_state(page)
+    lxml_result = extractors.parse_profile_lxml(dom_page)
+    soup_result = extractors.parse_profile_soup(dom_page)
+
+    assert state["followers"] == 4321 and state["likes"] == 98700 and state["videos"] == 56
+    assert lxml_result == soup_result
+    for field in FIELDS:
+        assert lxml_result[field] == state[field], field
+
+
+def test_tiktok_fallback_order(fixtures, monkeypatch):
+    page = fixtures["tiktok_profile"]
+    assert extractors.parse_tiktok_profile(page)[1] == "state"
+    assert extractors.parse_tiktok_profile(without_state(page))[1] == "lxml"
+    monkeypatch.setattr(extractors, "parse_profile_lxml", lambda html: None)
+    assert extractors.parse_tiktok_profile(without_state(page))[1] == "soup"
+    assert extractors.parse_tiktok_profile("<html></html>") == ({}, "none")
+
+
+@pytest.mark.parametrize("bio", ["hi<br>there", "hi <b>there</b>\n you", "a&amp;b <i>c</i>d", "<span>one</span><span>two</span>"])
+def test_dom_parsers_read_the_bio_alike(bio):
+    page = ("<html><head><title>Jane on TikTok</title></head><body>"
+            '<strong data-e2e="followers-count">1.2M</strong><strong data-e2e="following-count">12</strong>'
+            f'<strong data-e2e="likes-count">3,400</strong><h2 data-e2e="user-bio">{bio}</h2></body></html>')
+    lxml_result = extractors.parse_profile_lxml(page)
+    assert lxml_result == extractors.parse_profile_soup(page)
+    assert lxml_result["followers"] == 1_200_000 and lxml_result["name"] == "Jane"
+    assert "  " not in lxml_result["bio"].replace("\n", "")
+
+
+def test_extract_page_guesses_each_fixture(fixtures):
+    assert extractors.extract_page(fixtures["profile"]) == (
+        "profile", {"Followers": 12400, "Following": 312, "Posts": 1024})
+    assert extractors.extract_page(fixtures["reel"]) == (
+        "reel", {"Likes": 3456, "Comments": 78, "Upload_Date": "2025-06-06"})
+    kind, data = extractors.extract_page(fixtures["tiktok_profile"])
+    assert kind == "tiktok_profile" and data["followers"] == 4321
+
+
+def test_extract_page_with_a_url_or_kind(fixtures):
+    assert extractors.guess_kind("", "https://www.tiktok.com/@jane_doe") == "tiktok_profile"
+    assert extractors.guess_kind("", "https://www.instagram.com/p/Cabc123/") == "reel"
+    assert extractors.guess_kind("", "https://www.instagram.com/jane_doe/") == "profile"
+    assert extractors.extract_page("<html></html>", kind="reel") == ("reel", None)
+    with pytest.raises(ValueError):
+        extractors.extract_page(fixtures["profile"], kind="story")
+
+
+@pytest.mark.parametrize("url, shortcode", [
+    ("https://www.instagram.com/reel/Cabc123/", "Cabc123"),
+    ("https://www.instagram.com/reel/Cabc123", "Cabc123"),
+    ("https://www.instagram.com/reels/Cabc123/", "Cabc123"),
+    ("https://www.instagram.com/p/Cabc_12-3/", "Cabc_12-3"),
+    ("https://www.instagram.com/tv/Cabc123/", "Cabc123"),
+    ("https://www.instagram.com/reel/Cabc123/?igsh=MWx0eXo=", "Cabc123"),
+    ("https://www.instagram.com/jane_doe/reel/Cabc123/#comments", "Cabc123"),
+    ("  Cabc123 ", "Cabc123"),
+    ("https://www.instagram.com/jane_doe/", None),
+    ("not a url", None),
+])
+def test_reel_shortcode(url, shortcode):
+    assert extractors.reel_shortcode(url) == shortcode
@@ -0,0 +1,103 @@
+import asyncio
+import math
+
+import pytest
+
+from rate_limiter import PlatformLimiter
+
+
+def make_limiter(max_concurrency=1, rate=1000.0, burst=1000.0):
+    return PlatformLimiter("test", rate=rate, burst=burst, max_concurrency=max_concurrency,
+                           min_rate=0.1, max_rate=1000.0, adaptive=False)
+
+
+@pytest.mark.parametrize("settings", [
+    {"max_concurrency": "inf"},
+    {"max_concurrency": 0.5},
+    {"max_concurrency": 0},
+    {"max_concurrency": 2.5},
+    {"max_concurrency": True},
+    {"rate": "nan"},
+    {"burst": -1},
+    {"rate": math.inf},
+    {"min_rate": 5, "max_rate": 1},
+    {"adaptive": "false"},
+    {"adaptive": 1},
+    {"unknown": 1},
+])
+def test_configure_rejects_invalid_settings(settings):
+    limiter = make_limiter(max_concurrency=3)
+    before = limiter.stats()
+    with pytest.raises(ValueError):
+        limiter.configure(**settings)
+    assert limiter.stats() == before
+
+
+def test_configure_applies_valid_settings():
+    limiter = make_limiter()
+    limiter.configure(max_concurrency="4", rate=2, burst=5, adaptive=True)
+    stats = limiter.stats()
+    assert stats["max_concurrency"] == 4
+    assert isinstance(limiter.max_concurrency, int)
+    assert stats["rate"] == 2
+    assert stats["burst"] == 5
+    assert stats["adaptive"] is True
+
+
+def test_raising_the_cap_admits_all_queued_waiters():
+    async def scenario():
+        limiter = make_limiter(max_concurrency=1)
+        await limiter.acquire()
+        admitted = []
+
+        async def wait(i):
+            await limiter.acquire()
+            admitted.append(i)
+
+        tasks = [asyncio.create_task(wait(i)) for i in range(6)]
+        await asyncio.sleep(0.01)
+        assert admitted == []
+        limiter.configure(max_concurrency=8)
+        await asyncio.wait_for(asyncio.gather(*tasks), 1)
+        return admitted, limiter.active
+
+    admitted, active = asyncio.run(scenario())
+    assert admitted == [0, 1, 2, 3, 4, 5]
+    assert active == 7
+
+
+def test_waiters_are_admitted_in_arrival_order():
+    async def scenario():
+        limiter = make_limiter(max_concurrency=1)
+        await limiter.acquire()
+        admitted = []
+
+        async def wait(i):
+            await limiter.acquire()
+            admitted.append(i)
+            limiter.release()
+
+        tasks = [asyncio.create_task(wait(i)) for i in range(3)]
+        await asyncio.sleep(0.01)
+        limiter.release()
+        # A newcomer arriving as the slot frees up queues behind the others
+        tasks.append(asyncio.create_task(wait(3)))
+        await asyncio.wait_for(asyncio.gather(*tasks), 1)
+        return admitted
+
+    assert asyncio.run(scenario()) == [0, 1, 2, 3]
+
+
+def test_cancelled_waiter_passes_its_wake_up_on():
+    async def scenario():
+        limiter = make_limiter(max_concurrency=1)
+        await limiter.acquire()
+        first = asyncio.create_task(limiter.acquire())
+        second = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0.01)
+        limiter.release()
+        first.cancel()
+        await asyncio.wait_for(second, 1)
+        return limiter.active
+
+    assert asyncio.run(scenario()) == 1
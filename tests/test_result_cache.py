@@ -0,0 +1,95 @@
+import time
+
+import pytest
+
+from result_cache import ResultCache
+
+
+@pytest.fixture
+def cache():
+    cache = ResultCache(max_entries=10, ttls={"profile": 60}, negative_ttl=5, stale_ttl=30, shared=None)
+    yield cache
+    if cache._executor is not None:
+        cache._executor.shutdown(wait=True)
+
+
+def counting(result):
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        return result
+    return fetch, calls
+
+
+def age_entry(cache, key, seconds):
+    cache._entries[key].stored_at -= seconds
+
+
+def test_miss_then_hit(cache):
+    fetch, calls = counting(({"Followers": 1}, None))
+    assert cache.lookup("profile", "Jane", fetch) == (({"Followers": 1}, None), {"status": "MISS", "age": 0, "ttl": 60})
+    result, info = cache.lookup("profile", "@jane", fetch)
+    assert result == ({"Followers": 1}, None)
+    assert info["status"] == "HIT" and info["ttl"] == 60
+    assert len(calls) == 1
+
+
+def test_failures_use_the_negative_ttl(cache):
+    fetch, calls = counting((None, "blocked"))
+    assert cache.lookup("profile", "jane", fetch)[1]["ttl"] == 5
+    assert cache.lookup("profile", "jane", fetch)[1]["status"] == "HIT"
+    age_entry(cache, "profile:jane", 6)
+    # Failed results are never served stale
+    assert cache.lookup("profile", "jane", fetch, allow_stale=True)[1]["status"] == "MISS"
+    assert len(calls) == 2
+
+
+def test_max_age_zero_bypasses_the_cache(cache):
+    fetch, calls = counting(({"Followers": 1}, None))
+    cache.lookup("profile", "jane", fetch)
+    assert cache.lookup("profile", "jane", fetch, max_age=0)[1]["status"] == "MISS"
+    age_entry(cache, "profile:jane", 20)
+    assert cache.lookup("profile", "jane", fetch, max_age=10)[1]["status"] == "MISS"
+    assert len(calls) == 3
+
+
+def test_stale_entry_is_served_and_refreshed_in_the_background(cache):
+    cache.lookup("profile", "jane", lambda: ({"Followers": 1}, None))
+    age_entry(cache, "profile:jane", 70)
+
+    fetch, calls = counting(({"Followers": 2}, None))
+    result, info = cache.lookup("profile", "jane", fetch, allow_stale=True)
+    assert result == ({"Followers": 1}, None)
+    assert info["status"] == "STALE" and info["ttl"] == 60
+    cache._executor.shutdown(wait=True)
+    assert calls == [1] and cache.refreshes == 1
+
+    result, info = cache.lookup("profile", "jane", fetch)
+    assert result == ({"Followers": 2}, None) and info["status"] == "HIT"
+
+
+def test_expired_entry_without_allow_stale_is_a_miss(cache):
+    cache.lookup("profile", "jane", lambda: ({"Followers": 1}, None))
+    age_entry(cache, "profile:jane", 70)
+    fetch, calls = counting(({"Followers": 2}, None))
+    assert cache.lookup("profile", "jane", fetch)[1]["status"] == "MISS"
+    age_entry(cache, "profile:jane", 100)
+    # Past ttl + stale_ttl even allow_stale fetches again
+    assert cache.lookup("profile", "jane", fetch, allow_stale=True)[1]["status"] == "MISS"
+    assert len(calls) == 2
+
+
+def test_reel_urls_share_one_key(cache):
+    fetch, calls = counting(({"Likes": 1}, None))
+    cache.lookup("reel", "https://www.instagram.com/reel/Cabc123/?igsh=x", fetch)
+    assert cache.lookup("reel", "https://www.instagram.com/p/Cabc123", fetch)[1]["status"] == "HIT"
+    assert cache.lookup("reel", "https://www.instagram.com/reel/CABC123/", fetch)[1]["status"] == "MISS"
+    assert len(calls) == 2
+
+
+def test_lru_bound(cache):
+    for i in range(12):
+        cache.lookup("profile", f"user{i}", lambda: ({"Followers": 1}, None))
+    assert cache.stats()["entries"] == 10
+    assert "profile:user0" not in cache._entries and "profile:user11" in cache._entries
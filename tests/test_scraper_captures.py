@@ -0,0 +1,41 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+import retry_policy
+import scraper
+
+
+class FailingPage:
+    url = "https://www.instagram.com/someone/"
+
+    async def goto(self, url, **kwargs):
+        raise TimeoutError("navigation timeout")
+
+    async def content(self):
+        return "<html>blocked</html>"
+
+
+class FakePool:
+    @asynccontextmanager
+    async def lease_page(self, *args, **kwargs):
+        yield FailingPage()
+
+    async def call(self, coro):
+        return await coro
+
+
+def test_failure_is_captured_when_the_retry_budget_stops_early(monkeypatch):
+    captured = []
+    monkeypatch.setattr(scraper, "get_pool", lambda: FakePool())
+    monkeypatch.setattr(scraper, "capture_html",
+                        lambda platform, identifier, html, reason=None, url=None:
+                        captured.append((identifier, html, reason)) or "cap1")
+    # Three attempts allowed, but no retry tokens: the loop ends after the first
+    monkeypatch.setitem(retry_policy._budgets, "instagram", retry_policy.RetryBudget(ratio=0, max_tokens=0))
+    monkeypatch.setitem(retry_policy._breakers, "instagram", retry_policy.CircuitBreaker("instagram", min_calls=100))
+
+    data, error = asyncio.run(scraper._scrape_instagram_profile("someone", 3))
+
+    assert captured == [("someone", "<html>blocked</html>", "navigation timeout")]
+    assert "cap1" in error
+    assert data["Followers"] is None
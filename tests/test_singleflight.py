@@ -0,0 +1,71 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from singleflight import SingleFlight, flight_key
+
+
+def test_concurrent_threads_share_one_call():
+    flights = SingleFlight()
+    started, finish = threading.Event(), threading.Event()
+    calls, results = [], []
+
+    def work():
+        calls.append(1)
+        started.set()
+        finish.wait(5)
+        return "result"
+
+    leader = threading.Thread(target=lambda: results.append(flights.do("k", work)))
+    leader.start()
+    started.wait(5)
+    followers = [threading.Thread(target=lambda: results.append(flights.do("k", work))) for _ in range(3)]
+    for thread in followers:
+        thread.start()
+    while flights.stats()["coalesced"] < 3:
+        time.sleep(0.001)
+    finish.set()
+    for thread in [leader, *followers]:
+        thread.join(5)
+
+    assert calls == [1] and results == ["result"] * 4
+    assert flights.stats() == {"calls": 4, "executions": 1, "coalesced": 3, "in_flight": 0}
+
+
+def test_async_callers_share_the_result_and_the_error():
+    flights = SingleFlight()
+    calls = []
+
+    async def work(result):
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    async def main():
+        shared = await asyncio.gather(*(flights.do_async("a", lambda: work("ok")) for _ in range(5)))
+        failed = await asyncio.gather(*(flights.do_async("b", lambda: work(RuntimeError("boom"))) for _ in range(3)),
+                                      return_exceptions=True)
+        return shared, failed
+
+    shared, failed = asyncio.run(main())
+    assert shared == ["ok"] * 5
+    assert all(isinstance(error, RuntimeError) for error in failed)
+    assert len(calls) == 2
+
+
+def test_finished_keys_run_again():
+    flights = SingleFlight()
+    assert flights.do("k", lambda: 1) == 1
+    assert flights.do("k", lambda: 2) == 2
+    with pytest.raises(ZeroDivisionError):
+        flights.do("k", lambda: 1 / 0)
+    assert flights.stats()["in_flight"] == 0
+
+
+def test_flight_key():
+    assert flight_key("instagram_profile", " @Jane ") == "instagram_profile:jane"
+    assert flight_key("instagram_reel", "https://x/reel/AbC/") == "instagram_reel:https://x/reel/AbC/"
@@ -1,67 +1,94 @@
 import asyncio
-import os
 import json
-from playwright.async_api import async_playwright
-from bs4 import BeautifulSoup
 
-def format_number(number_str):
-    number_str = number_str.upper().strip()
-    if 'M' in number_str:
-        return int(float(number_str.replace('M', '')) * 1_000_000)
-    elif 'K' in number_str:
-        return int(float(number_str.replace('K', '')) * 1_000)
-    return int(number_str.replace(',', ''))
+import config
+from browser_pool import get_pool
+from capture_store import capture_html
+from extractors import TIKTOK_STATE_SCRIPT_IDS, parse_tiktok_profile, profile_from_state_text
+from metrics import EXTRACTIONS, span
+from request_blocking import install_blocking
+from retry_policy import RetryPolicy, retry_async
+from singleflight import flight_key, scrape_flights
+from snapshot_store import record_snapshot
+from wait_strategy import wait_for_target
 
-async def scrape_tiktok_profile(username):
-    url = f"https://www.tiktok.com/@{username}"
-    html_file = "tiktok_page.html"
-    result = {}
+async def _setup_page(page):
+    await install_blocking(page, "tiktok")
 
-    async with async_playwright() as p:
-        browser = await p.chromium.launch(headless=True)
-        context = await browser.new_context()
-        page = await context.new_page()
+def parse_profile_html(html_content):
+    """Extract a profile, trying the embedded state JSON, then lxml, then BeautifulSoup."""
+    result, method = parse_tiktok_profile(html_content)
+    EXTRACTIONS.inc("tiktok", method)
+    return result
 
-        try:
-            await page.goto(url, timeout=60000)
-            await page.wait_for_timeout(5000)
-            html_content = await page.content()
+async def _read_state(page):
+    """Extract the profile from the live page's state script, or return {}."""
+    for script_id in TIKTOK_STATE_SCRIPT_IDS:
+        text = await page.evaluate(
+            "id => { const el = document.getElementById(id); return el ? el.textContent : null; }", script_id)
+        result = profile_from_state_text(text) if text else {}
+        if result:
+            return result
+    return {}
 
-            with open(html_file, "w", encoding="utf-8") as f:
-                f.write(html_content)
+async def warm_up(pages=1):
+    """Open ``pages`` ready TikTok pages in the pool before traffic arrives."""
+    await asyncio.gather(*(get_pool().warm_page("tiktok", setup=_setup_page) for _ in range(pages)))
 
-            soup = BeautifulSoup(html_content, "html.parser")
+async def scrape_tiktok_profile(username, retries=None):
+    """Scrape a TikTok profile; returns ``(data, error)``.
 
-            # Get follower/following/likes using data-e2e attributes
-            followers_tag = soup.find("strong", {"data-e2e": "followers-count"})
-            following_tag = soup.find("strong", {"data-e2e": "following-count"})
-            likes_tag = soup.find("strong", {"data-e2e": "likes-count"})
-            bio_tag = soup.find("h2", {"data-e2e": "user-bio"})
-            link_tag = soup.find("a", {"data-e2e": "user-link"})
+    ``retries`` is the number of attempts (default ``RETRY_ATTEMPTS``).
+    """
+    # Concurrent requests for the same username share one scrape
+    return await scrape_flights.do_async(
+        flight_key("tiktok_profile", username),
+        lambda: get_pool().call(_scrape_tiktok_profile(username, retries)),
+    )
 
-            if followers_tag and following_tag and likes_tag:
-                result["followers"] = format_number(followers_tag.text)
-                result["following"] = format_number(following_tag.text)
-                result["likes"] = format_number(likes_tag.text)
-                result["bio"] = bio_tag.get_text(separator=" ", strip=True) if bio_tag else ""
-                result["link"] = link_tag["href"] if link_tag and link_tag.has_attr("href") else ""
-                result["name"] = soup.title.string.replace(" on TikTok", "").strip() if soup.title else ""
-        finally:
-            await browser.close()
+async def _scrape_tiktok_profile(username, retries):
+    url = f"{config.TIKTOK_BASE_URL}/@{username}"
 
-    # Remove file if data was successfully extracted
-    if result.get("followers"):
-        try:
-            os.remove(html_file)
-        except Exception:
-            pass
+    async def attempt(number, is_last):
+        async with get_pool().lease_page("tiktok", setup=_setup_page) as page:
+            with span("tiktok", "goto"):
+                await page.goto(url, timeout=60000, wait_until="domcontentloaded")
+            # The state script is in the initial HTML: read just that instead
+            # of waiting for render and serialising the whole page
+            with span("tiktok", "extract"):
+                result = await _read_state(page)
+            if result:
+                EXTRACTIONS.inc("tiktok", "state")
+                record_snapshot("tiktok_profile", username, result)
+                return result, None
+            with span("tiktok", "wait"):
+                await wait_for_target(
+                    page, 'strong[data-e2e="likes-count"]', r"\d",
+                    fallback=lambda: page.wait_for_timeout(5000),
+                )
+            with span("tiktok", "content"):
+                html_content = await page.content()
 
-    return result
+        # Parsing megabytes of HTML is CPU bound; keep it off the pool loop
+        loop = asyncio.get_running_loop()
+        with span("tiktok", "parse"):
+            result = await loop.run_in_executor(None, parse_profile_html, html_content)
+        if result.get("followers"):
+            record_snapshot("tiktok_profile", username, result)
+            return result, None
+
+        capture_id = capture_html("tiktok", username, html_content, reason="no profile data", url=url)
+        if capture_id:
+            print(f"No profile data for {username}; page captured as {capture_id}")
+        return result, f"No profile data found for {username}."
+
+    # Failures count towards the TikTok breaker so a blocked run stops launching pages
+    return await retry_async("tiktok", attempt, RetryPolicy(attempts=retries))
 
 if __name__ == "__main__":
     username = input("Enter TikTok username (without @): ").strip()
-    data = asyncio.run(scrape_profile_data(username))
-    if data:
-        print(json.dumps(data, indent=2))
+    data, error = asyncio.run(scrape_tiktok_profile(username))
+    if error:
+        print(f"{error} See /api/captures for the captured page.")
     else:
-        print("No profile data found. Check tiktok_page.html for debugging.")
+        print(json.dumps(data, indent=2))
@@ -0,0 +1,56 @@
+import asyncio
+import re
+import time
+
+from playwright.async_api import Error as PlaywrightError
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+
+import config
+
+# Evaluated in the page: true once any element matching ``selector`` has an
+# attribute (or text, when no attribute is given) matching ``pattern``.
+_MATCH_JS = """({selector, attribute, pattern, flags}) => {
+    const re = pattern ? new RegExp(pattern, flags) : null;
+    for (const el of document.querySelectorAll(selector)) {
+        const value = attribute ? el.getAttribute(attribute) : el.textContent;
+        if (value && (!re || re.test(value))) return true;
+    }
+    return false;
+}"""
+
+
+async def wait_for_target(page, selector, pattern=None, attribute=None, timeout=None, fallback=None):
+    """Wait until the extractor's target is in the DOM, then return at once.
+
+    ``pattern`` is a compiled regex (or string) that must match the element's
+    ``attribute`` or text. If nothing matches within ``timeout`` ms (default
+    ``WAIT_MAX_MS``) the ``fallback`` coroutine function is awaited instead,
+    so callers keep their old wait behaviour for pages that never match.
+    Returns True when the target matched.
+    """
+    timeout = config.WAIT_MAX_MS if timeout is None else timeout
+    arg = {
+        "selector": selector,
+        "attribute": attribute,
+        "pattern": getattr(pattern, "pattern", pattern),
+        "flags": "i" if getattr(pattern, "flags", 0) & re.IGNORECASE else "",
+    }
+    deadline = time.monotonic() + timeout / 1000
+    while True:
+        remaining = (deadline - time.monotonic()) * 1000
+        if remaining <= 0:
+            break
+        try:
+            await page.wait_for_function(_MATCH_JS, arg=arg, polling=config.WAIT_POLL_MS, timeout=remaining)
+            return True
+        except PlaywrightTimeoutError:
+            break
+        except PlaywrightError as e:
+            # Redirects tear down the execution context; keep waiting on the new document
+            if "context was destroyed" not in str(e) and "navigation" not in str(e).lower():
+                raise
+            await asyncio.sleep(config.WAIT_POLL_MS / 1000)
+
+    if fallback:
+        await fallback()
+    return False
@@ -0,0 +1,316 @@
+import logging
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import config
+from rate_limiter import get_limiter
+from result_cache import normalize_identifier
+from snapshot_store import get_snapshot_store
+
+logger = logging.getLogger(__name__)
+
+WATCH_TYPES = ("profile", "reel", "tiktok_profile")
+PLATFORMS = {"profile": "instagram", "reel": "instagram", "tiktok_profile": "tiktok"}
+# Field whose movement decides how often an entry is refreshed
+TRACKED_FIELDS = {"profile": "Followers", "reel": "Likes", "tiktok_profile": "followers"}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS watchlist (
+    type TEXT NOT NULL,
+    identifier TEXT NOT NULL,
+    interval REAL NOT NULL,
+    added_at REAL NOT NULL,
+    last_refreshed REAL,
+    next_due REAL NOT NULL,
+    last_value REAL,
+    refreshes INTEGER NOT NULL DEFAULT 0,
+    failures INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    lease_until REAL,
+    PRIMARY KEY (type, identifier)
+);
+CREATE INDEX IF NOT EXISTS watchlist_due ON watchlist (next_due);
+CREATE TABLE IF NOT EXISTS watchlist_pace (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    next_start REAL NOT NULL
+);
+INSERT OR IGNORE INTO watchlist_pace (id, next_start) VALUES (0, 0);
+"""
+_COLUMNS = ("type", "identifier", "interval", "added_at", "last_refreshed", "next_due", "last_value",
+            "refreshes", "failures", "last_error")
+
+
+class Watchlist:
+    """Tracked accounts and reels, refreshed most-overdue first.
+
+    The SQLite file is the only copy of the list, so every worker process
+    sharing it sees the same entries. An entry is due at its last refresh
+    plus an adaptive interval: it halves when the tracked count moved by
+    more than ``WATCHLIST_CHANGE_THRESHOLD`` and grows by half when it did
+    not, within ``WATCHLIST_MIN_INTERVAL``..``WATCHLIST_MAX_INTERVAL``.
+
+    Each process runs a scheduler that claims due entries with a lease in a
+    ``BEGIN IMMEDIATE`` transaction, like the job queue. The claim also
+    checks the shared pace and the number of live leases, so
+    ``WATCHLIST_MAX_RPS`` and ``WATCHLIST_CONCURRENCY`` hold for the whole
+    host whatever the worker count. Refreshes are held back while live
+    requests are waiting on the platform's rate limiter.
+    """
+
+    def __init__(self, runner, path=None, max_rps=None, concurrency=None):
+        self.runner = runner
+        self.path = path or config.WATCHLIST_DB_PATH
+        self.max_rps = max_rps or config.WATCHLIST_MAX_RPS
+        self.concurrency = concurrency or config.WATCHLIST_CONCURRENCY
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="watchlist")
+        self._thread = None
+        self._stopping = False
+        self.refreshed = 0
+        self.failed = 0
+        self.deferred = 0
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(watchlist)")}
+        if columns and "lease_until" not in columns:
+            # Files written before entries were leased
+            self._conn.execute("ALTER TABLE watchlist ADD COLUMN lease_until REAL")
+        self._conn.executescript(_SCHEMA)
+
+    def _transaction(self, work):
+        """Run ``work()`` in a write transaction; the caller holds ``self._lock``."""
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            result = work()
+            self._conn.execute("COMMIT")
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        return result
+
+    # -- API -----------------------------------------------------------------
+
+    def add(self, watch_type, identifiers, interval=None):
+        """Track identifiers; returns how many were new.
+
+        New entries with a stored snapshot are first due one interval after
+        it; the rest are due at once. Existing entries only get the new
+        interval.
+        """
+        if watch_type not in WATCH_TYPES:
+            raise ValueError(f"Unknown watch type: {watch_type}")
+        interval = float(interval or config.WATCHLIST_INTERVAL)
+        now = time.time()
+        names = [normalize_identifier(watch_type, identifier) for identifier in identifiers]
+        latest = get_snapshot_store().latest(watch_type, names) if config.SNAPSHOT_ENABLED else {}
+
+        def insert():
+            added = 0
+            for name in names:
+                snapshot = latest.get(name)
+                last_refreshed = snapshot["ts"] if snapshot else None
+                inserted = self._conn.execute(
+                    "INSERT INTO watchlist (type, identifier, interval, added_at, last_refreshed, next_due, last_value) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?) ON CONFLICT (type, identifier) DO NOTHING",
+                    (watch_type, name, interval, now, last_refreshed,
+                     last_refreshed + interval if last_refreshed else now,
+                     _tracked_value(watch_type, snapshot["data"]) if snapshot else None),
+                ).rowcount
+                if not inserted:
+                    self._conn.execute("UPDATE watchlist SET interval = ? WHERE type = ? AND identifier = ?",
+                                       (interval, watch_type, name))
+                added += inserted
+            return added
+
+        with self._wakeup:
+            added = self._transaction(insert)
+            self._wakeup.notify()
+        return added
+
+    def remove(self, watch_type, identifiers):
+        """Stop tracking identifiers; returns how many were removed."""
+        keys = [(watch_type, normalize_identifier(watch_type, identifier)) for identifier in identifiers]
+        with self._lock:
+            return self._transaction(lambda: sum(
+                self._conn.execute("DELETE FROM watchlist WHERE type = ? AND identifier = ?", key).rowcount
+                for key in keys))
+
+    def list(self, watch_type=None, offset=0, limit=100):
+        """Entries ordered by next due time."""
+        sql = f"SELECT {', '.join(_COLUMNS)} FROM watchlist"
+        params = ()
+        if watch_type is not None:
+            sql += " WHERE type = ?"
+            params = (watch_type,)
+        with self._lock:
+            rows = self._conn.execute(sql + " ORDER BY next_due LIMIT ? OFFSET ?",
+                                      params + (limit, offset)).fetchall()
+        return [dict(zip(_COLUMNS, row)) for row in rows]
+
+    def stats(self):
+        now = time.time()
+        with self._lock:
+            total, due, oldest, in_flight = self._conn.execute(
+                "SELECT COUNT(*), "
+                "COALESCE(SUM(next_due <= :now AND (lease_until IS NULL OR lease_until <= :now)), 0), "
+                "MIN(CASE WHEN next_due <= :now AND (lease_until IS NULL OR lease_until <= :now) "
+                "THEN next_due END), "
+                "COALESCE(SUM(lease_until > :now), 0) FROM watchlist",
+                {"now": now},
+            ).fetchone()
+        return {
+            "entries": total,
+            "due": due,
+            "in_flight": in_flight,
+            "lag_seconds": round(now - oldest, 1) if oldest is not None else 0,
+            "refreshed": self.refreshed,
+            "failed": self.failed,
+            "deferred": self.deferred,
+            "max_rps": self.max_rps,
+            "concurrency": self.concurrency,
+            "running": self._thread is not None,
+        }
+
+    # -- scheduler -----------------------------------------------------------
+
+    def start(self):
+        """Start the scheduler thread (idempotent)."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._stopping = False
+            self._thread = threading.Thread(target=self._schedule_loop, name="watchlist-scheduler", daemon=True)
+            self._thread.start()
+        logger.info("Watchlist scheduler started")
+
+    def stop(self, timeout=5):
+        with self._wakeup:
+            self._stopping = True
+            self._wakeup.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _claim(self):
+        """Lease the most overdue entry if the host-wide pace and concurrency allow.
+
+        Returns ``(row, wait)``: the claimed ``(type, identifier)`` or None,
+        and how long to sleep before trying again.
+        """
+        now = time.time()
+        in_flight = self._conn.execute(
+            "SELECT COUNT(*) FROM watchlist WHERE lease_until > ?", (now,)).fetchone()[0]
+        if in_flight >= self.concurrency:
+            return None, config.WATCHLIST_POLL_INTERVAL
+        next_start = self._conn.execute("SELECT next_start FROM watchlist_pace WHERE id = 0").fetchone()[0]
+        if next_start > now:
+            return None, next_start - now
+        row = self._conn.execute(
+            "SELECT type, identifier, next_due FROM watchlist "
+            "WHERE next_due <= ? AND (lease_until IS NULL OR lease_until <= ?) ORDER BY next_due LIMIT 1",
+            (now, now),
+        ).fetchone()
+        if row is None:
+            upcoming = self._conn.execute(
+                "SELECT MIN(next_due) FROM watchlist WHERE lease_until IS NULL OR lease_until <= ?",
+                (now,)).fetchone()[0]
+            return None, upcoming - now if upcoming is not None else config.WATCHLIST_POLL_INTERVAL
+        if get_limiter(PLATFORMS[row[0]]).waiting():
+            # Live requests are queued on this platform; let them go first
+            self.deferred += 1
+            return None, config.WATCHLIST_POLL_INTERVAL
+        self._conn.execute("UPDATE watchlist SET lease_until = ? WHERE type = ? AND identifier = ?",
+                           (now + config.WATCHLIST_LEASE_SECONDS, row[0], row[1]))
+        self._conn.execute("UPDATE watchlist_pace SET next_start = ? WHERE id = 0",
+                           (max(next_start, now) + 1 / self.max_rps,))
+        return row[:2], 0
+
+    def _schedule_loop(self):
+        while True:
+            with self._wakeup:
+                if self._stopping:
+                    return
+                try:
+                    claimed, wait = self._transaction(self._claim)
+                except sqlite3.Error as e:
+                    logger.error("Watchlist claim failed: %s", e)
+                    claimed, wait = None, config.WATCHLIST_POLL_INTERVAL
+                if claimed is None:
+                    self._wakeup.wait(min(max(wait, 0.01), config.WATCHLIST_POLL_INTERVAL))
+                    continue
+            self._executor.submit(self._refresh, *claimed)
+
+    def _refresh(self, watch_type, identifier):
+        try:
+            data, error = self.runner(watch_type, identifier)
+        except Exception as e:
+            data, error = None, str(e)
+
+        def save():
+            row = self._conn.execute(
+                "SELECT interval, last_value FROM watchlist WHERE type = ? AND identifier = ?",
+                (watch_type, identifier),
+            ).fetchone()
+            if row is None:
+                return  # removed while it was refreshing
+            interval, last_value = row
+            now = time.time()
+            if error:
+                self._conn.execute(
+                    "UPDATE watchlist SET failures = failures + 1, last_error = ?, next_due = ?, lease_until = NULL "
+                    "WHERE type = ? AND identifier = ?",
+                    (error, now + min(interval, config.WATCHLIST_MIN_INTERVAL), watch_type, identifier),
+                )
+                return
+            value = _tracked_value(watch_type, data)
+            interval = _adapt_interval(interval, last_value, value)
+            self._conn.execute(
+                "UPDATE watchlist SET interval = ?, refreshes = refreshes + 1, last_error = NULL, last_value = ?, "
+                "last_refreshed = ?, next_due = ?, lease_until = NULL WHERE type = ? AND identifier = ?",
+                (interval, value, now, now + interval, watch_type, identifier),
+            )
+
+        try:
+            with self._wakeup:
+                self._transaction(save)
+                if error:
+                    self.failed += 1
+                else:
+                    self.refreshed += 1
+                self._wakeup.notify()
+        except Exception as e:
+            logger.error("Watchlist refresh of %s failed: %s", identifier, e)
+
+
+def _tracked_value(watch_type, data):
+    value = (data or {}).get(TRACKED_FIELDS[watch_type])
+    return float(value) if isinstance(value, (int, float)) else None
+
+
+def _adapt_interval(interval, before, after):
+    """Shorten the interval for entries whose tracked count moves, lengthen it otherwise."""
+    if before is None or after is None:
+        return interval
+    change = abs(after - before) / max(before, 1)
+    if change > config.WATCHLIST_CHANGE_THRESHOLD:
+        interval /= 2
+    else:
+        interval *= 1.5
+    return min(config.WATCHLIST_MAX_INTERVAL, max(config.WATCHLIST_MIN_INTERVAL, interval))
+
+
+_watchlist = None
+_watchlist_lock = threading.Lock()
+
+
+def get_watchlist(runner):
+    """Return the process-wide watchlist (its scheduler is started separately)."""
+    global _watchlist
+    with _watchlist_lock:
+        if _watchlist is None:
+            _watchlist = Watchlist(runner)
+        return _watchlist